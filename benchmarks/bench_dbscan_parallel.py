@@ -0,0 +1,51 @@
+"""
+Benchmark of the parallel neighborhood precomputation of dbscan_labels: the time of the neighbors phase
+(radius graph built by n_jobs worker processes) and of the expansion phase, against the sequential path,
+where the neighborhoods are searched during the expansion.
+
+Usage: python benchmarks/bench_dbscan_parallel.py [--n 1000000] [--jobs 1 2 4 8 16 32]
+"""
+import argparse
+import os
+
+import numpy as np
+
+from clustviz.dbscan import dbscan_labels
+
+
+def make_data(n: int, seed: int = 0) -> np.ndarray:
+    """Uniform points in a square whose side grows with n, so that the density stays constant."""
+    rng = np.random.RandomState(seed)
+    return rng.uniform(0, np.sqrt(n), size=(n, 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--eps", type=float, default=1.0)
+    parser.add_argument("--minpts", type=int, default=5)
+    parser.add_argument("--neighbor-index", default="kdtree")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    X = make_data(args.n)
+    print(f"n = {args.n}, cpus = {os.cpu_count()}")
+    print("{:>10} {:>12} {:>12} {:>12} {:>10}".format("n_jobs", "neighbors", "expansion", "total", "speedup"))
+
+    timings = {}
+    expected = dbscan_labels(X, args.eps, args.minpts, neighbor_index=args.neighbor_index, timings=timings)
+    base = sum(timings.values())
+    print("{:>10} {:>11.2f}s {:>11.2f}s {:>11.2f}s {:>9.2f}x".format(
+        "-", timings["neighbors"], timings["expansion"], base, 1.0))
+
+    for n_jobs in args.jobs:
+        labels = dbscan_labels(X, args.eps, args.minpts, neighbor_index=args.neighbor_index, n_jobs=n_jobs,
+                               timings=timings)
+        assert np.array_equal(labels, expected)
+        total = sum(timings.values())
+        print("{:>10} {:>11.2f}s {:>11.2f}s {:>11.2f}s {:>9.2f}x".format(
+            n_jobs, timings["neighbors"], timings["expansion"], total, base / total))
+
+
+if __name__ == "__main__":
+    main()
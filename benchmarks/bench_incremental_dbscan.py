@@ -0,0 +1,65 @@
+"""
+Benchmark of IncrementalDBSCAN on a sliding window: at every step the newest batch of points is inserted
+and the oldest batch is deleted. The cost per update (insert + delete, and labels on top of it) is
+compared with a full rerun of dbscan_labels on the window.
+
+Usage: python benchmarks/bench_incremental_dbscan.py [--window 20000] [--batches 10 100 1000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from clustviz.dbscan import IncrementalDBSCAN, dbscan_labels
+
+
+def make_stream(n: int, seed: int = 0) -> np.ndarray:
+    """Positions drifting around a few moving centers, as for a stream of sensor positions."""
+    rng = np.random.RandomState(seed)
+    centers = rng.uniform(0, 50, (10, 2)) + np.linspace(0, 20, n)[:, None, None]
+    return centers[np.arange(n), rng.randint(0, 10, n)] + rng.normal(0, 2, (n, 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--window", type=int, default=20_000)
+    parser.add_argument("--batches", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--eps", type=float, default=0.5)
+    parser.add_argument("--minpts", type=int, default=5)
+    args = parser.parse_args()
+
+    print("{:>8} {:>12} {:>12} {:>12} {:>10}".format("batch", "update", "+labels", "rerun", "speedup"))
+
+    for batch in args.batches:
+        stream = make_stream(args.window + batch * args.steps)
+        model = IncrementalDBSCAN(args.eps, args.minpts)
+        window = list(model.insert(stream[: args.window]))
+
+        t_update = t_labels = t_rerun = 0.0
+
+        for step in range(args.steps):
+            start = args.window + step * batch
+
+            t = time.perf_counter()
+            model.delete(window[:batch])
+            window = window[batch:] + list(model.insert(stream[start: start + batch]))
+            t_update += time.perf_counter() - t
+
+            t = time.perf_counter()
+            labels = model.labels()
+            t_labels += time.perf_counter() - t
+
+            t = time.perf_counter()
+            expected = dbscan_labels(stream[start + batch - args.window: start + batch], args.eps, args.minpts)
+            t_rerun += time.perf_counter() - t
+
+            assert np.array_equal(labels, expected)
+
+        t_update, t_labels, t_rerun = t_update / args.steps, t_labels / args.steps, t_rerun / args.steps
+        print("{:>8} {:>11.4f}s {:>11.4f}s {:>11.4f}s {:>9.1f}x".format(
+            batch, t_update, t_update + t_labels, t_rerun, t_rerun / t_update))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark of the eps-neighborhood queries performed by DBSCAN: the brute force scan of
+scan_neigh1_mod against the neighborhood indexes of clustviz.neighbors, both for the queries alone
+and end to end, running DBSCAN (dict engine) with every index.
+
+The brute force path is timed on a random sample of queries and scaled to the whole dataset,
+since running all of its n queries is quadratic and unfeasible for the largest sizes; the same
+estimate is a lower bound of the time of DBSCAN without an index.
+
+Usage: python benchmarks/bench_neighbors.py [--sizes 1000 10000 100000 1000000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from clustviz.dbscan import DBSCAN, scan_neigh1_mod
+from clustviz.neighbors import build_neighbor_index
+
+
+def make_data(n: int, seed: int = 0) -> np.ndarray:
+    """Uniform points in a square whose side grows with n, so that the density stays constant."""
+    rng = np.random.RandomState(seed)
+    return rng.uniform(0, np.sqrt(n), size=(n, 2))
+
+
+def time_brute(X: np.ndarray, eps: float, n_queries: int = 20) -> float:
+    """Time the brute force scan on a sample of queries and scale it to len(X) queries."""
+    X_dict = dict(zip([str(i) for i in range(len(X))], X))
+    sample = np.random.RandomState(1).choice(len(X), min(n_queries, len(X)), replace=False)
+
+    start = time.perf_counter()
+    for i in sample:
+        scan_neigh1_mod(X_dict, X[i], eps)
+
+    return (time.perf_counter() - start) / len(sample) * len(X)
+
+
+def time_index(X: np.ndarray, eps: float, method: str) -> float:
+    """Time the construction of the index and the neighborhood queries of every point."""
+    start = time.perf_counter()
+    index = build_neighbor_index(X, eps, method=method)
+    index.query_all()
+
+    return time.perf_counter() - start
+
+
+def time_dbscan(X: np.ndarray, eps: float, minPTS: int, method: str) -> float:
+    """Time DBSCAN end to end, with the neighborhoods searched through the index."""
+    start = time.perf_counter()
+    DBSCAN(X, eps, minPTS, neighbor_index=method)
+
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--eps", type=float, default=1.0)
+    parser.add_argument("--minpts", type=int, default=5)
+    parser.add_argument("--methods", nargs="+", default=["grid", "kdtree", "balltree"])
+    args = parser.parse_args()
+
+    header = "{:>10} {:>14}".format("n", "brute (est.)") + "".join("{:>12}".format(m) for m in args.methods)
+
+    print("neighborhood queries")
+    print(header)
+    brute = {}
+    for n in args.sizes:
+        X = make_data(n)
+        brute[n] = time_brute(X, args.eps)
+        row = "{:>10} {:>13.2f}s".format(n, brute[n])
+        for method in args.methods:
+            row += "{:>11.2f}s".format(time_index(X, args.eps, method))
+        print(row)
+
+    print("DBSCAN end to end")
+    print(header)
+    for n in args.sizes:
+        X = make_data(n)
+        row = "{:>10} {:>13.2f}s".format(n, brute[n])
+        for method in args.methods:
+            row += "{:>11.2f}s".format(time_dbscan(X, args.eps, args.minpts, method))
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
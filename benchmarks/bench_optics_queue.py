@@ -0,0 +1,90 @@
+"""
+Benchmark of the seed queue of OPTICS: the former dictionary, popped with min(Seed, key=Seed.get),
+against SeedQueue, on the same sequence of insertions, decrease-keys and pops.
+
+For the dictionary the time per operation grows linearly with n, for SeedQueue logarithmically:
+the last column (time / (n log2 n)) stays roughly constant.
+
+Usage: python benchmarks/bench_optics_queue.py [--sizes 1000 10000 100000 1000000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from clustviz.optics import SeedQueue
+
+
+def make_operations(n: int, seed: int = 0) -> list:
+    """Random workload: every key is inserted, then lowered with probability 1/2, pops are interleaved."""
+    rng = np.random.RandomState(seed)
+    reach = rng.uniform(0, 1, n)
+    ops = []
+
+    for i in range(n):
+        ops.append(("push", str(i), reach[i]))
+        if rng.rand() < 0.5:
+            ops.append(("push", str(rng.randint(0, i + 1)), reach[i] * rng.rand()))
+        if i % 2 == 1:
+            ops.append(("pop", None, None))
+
+    ops.extend([("pop", None, None)] * n)
+
+    return ops
+
+
+def run_dict(ops: list) -> float:
+    Seed = {}
+    popped = set()
+    start = time.perf_counter()
+
+    for op, key, reach in ops:
+        if op == "push":
+            if key in popped:
+                continue
+            if key in Seed:
+                if reach < Seed[key]:
+                    Seed[key] = reach
+            else:
+                Seed[key] = reach
+        elif len(Seed) > 0:
+            o = min(Seed, key=Seed.get)
+            del Seed[o]
+            popped.add(o)
+
+    return time.perf_counter() - start
+
+
+def run_heap(ops: list) -> float:
+    Seed = SeedQueue()
+    popped = set()
+    start = time.perf_counter()
+
+    for op, key, reach in ops:
+        if op == "push":
+            if key not in popped:
+                Seed.push(key, reach)
+        elif len(Seed) > 0:
+            popped.add(Seed.pop()[0])
+
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-dict-size", type=int, default=30_000,
+                        help="sizes above this value skip the dictionary queue")
+    args = parser.parse_args()
+
+    print("{:>10} {:>12} {:>12} {:>20}".format("n", "dict", "SeedQueue", "SeedQueue/(n log n)"))
+
+    for n in args.sizes:
+        ops = make_operations(n)
+        t_dict = "{:>11.3f}s".format(run_dict(ops)) if n <= args.max_dict_size else "{:>12}".format("-")
+        t_heap = run_heap(ops)
+        print("{:>10} {} {:>11.3f}s {:>17.3e}ns".format(n, t_dict, t_heap, t_heap / (n * np.log2(n)) * 1e9))
+
+
+if __name__ == "__main__":
+    main()
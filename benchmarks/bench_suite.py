@@ -0,0 +1,290 @@
+"""
+Benchmark suite of the clustviz algorithms, to track speed and memory regressions.
+
+Every algorithm runs in headless mode (see clustviz.set_headless) on synthetic blob, moon and anisotropic datasets of increasing
+size; wall time (best of --repeat runs) and peak memory (traced by tracemalloc in a separate run, so
+that tracing does not slow down the timed runs) are stored as JSON. The slowest algorithms are skipped
+above their max size (see ALGORITHMS), which --max-size overrides.
+
+Usage: python benchmarks/bench_suite.py run [--sizes 100 1000 10000 100000] [--algorithms DBSCAN OPTICS]
+                                            [--datasets blobs moons anisotropic] [--output results.json]
+       python benchmarks/bench_suite.py compare base.json new.json [--threshold 1.2]
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_blobs, make_moons
+
+from clustviz import headless
+
+N_CLUSTERS = 3
+
+
+def _standardize(X: np.ndarray) -> np.ndarray:
+    return (X - X.mean(axis=0)) / X.std(axis=0)
+
+
+def blobs(n: int, seed: int = 0) -> np.ndarray:
+    """Isotropic gaussian blobs."""
+    return _standardize(make_blobs(n, centers=N_CLUSTERS, random_state=seed)[0])
+
+
+def moons(n: int, seed: int = 0) -> np.ndarray:
+    """Two interleaving half circles."""
+    return _standardize(make_moons(n, noise=0.05, random_state=seed)[0])
+
+
+def anisotropic(n: int, seed: int = 0) -> np.ndarray:
+    """Gaussian blobs stretched by a linear transformation."""
+    X = make_blobs(n, centers=N_CLUSTERS, random_state=seed)[0]
+    return _standardize(X @ np.array([[0.6, -0.6], [-0.4, 0.8]]))
+
+
+DATASETS = {"blobs": blobs, "moons": moons, "anisotropic": anisotropic}
+
+
+def _eps(n: int) -> float:
+    """Radius keeping the mean number of neighbors roughly constant, for standardized data."""
+    return 8 / np.sqrt(n)
+
+
+def run_dbscan(X):
+    from clustviz.dbscan import DBSCAN
+    DBSCAN(X, eps=_eps(len(X)), minPTS=5, plotting=False)
+
+
+def run_optics(X):
+    from clustviz.optics import OPTICS
+    OPTICS(X, eps=_eps(len(X)), minPTS=5, plot=False)
+
+
+def run_agg_clust(X):
+    from clustviz.agglomerative import agg_clust
+    agg_clust(X, "average", plotting=False)
+
+
+def run_cure(X):
+    from clustviz.cure import cure
+    cure(X, k=N_CLUSTERS, c=3, alpha=0.3, plotting=False)
+
+
+def run_cure_sample_part(X):
+    from clustviz.cure import cure_sample_part
+    cure_sample_part(X, k=N_CLUSTERS, c=3, alpha=0.3, plotting=False)
+
+
+def run_denclue(X):
+    from clustviz.denclue import DENCLUE
+    threshold = max(2, len(X) / 50)
+    DENCLUE(X, s=0.3, xi=threshold, xi_c=threshold, plotting=False)
+
+
+def run_clara(X):
+    from clustviz.clara import ClaraClustering
+    ClaraClustering(max_iter=100).clara(pd.DataFrame(X), N_CLUSTERS, "fast_euclidean")
+
+
+def run_kmedoids(X):
+    from clustviz.pam import KMedoids
+    KMedoids(n_cluster=N_CLUSTERS).fit(X.tolist())
+
+
+def run_clarans(X):
+    from clustviz.clarans import clarans
+    clarans(X.tolist(), N_CLUSTERS, 2, 4).process(plotting=False)
+
+
+def run_birch(X):
+    from clustviz.birch import birch
+    birch(X.tolist(), N_CLUSTERS).process(plotting=False)
+
+
+def run_chameleon(X):
+    from clustviz.chameleon.chameleon import cluster
+    cluster(pd.DataFrame(X), N_CLUSTERS, knn=10, m=30, plot=False, verbose2=False)
+
+
+def run_chameleon2(X):
+    from clustviz.chameleon.chameleon2 import cluster2
+    cluster2(pd.DataFrame(X), N_CLUSTERS, m=30, plot=False, verbose1=False, verbose2=False)
+
+
+# name: (function running the algorithm on a data array, max size run by default)
+ALGORITHMS = {
+    "DBSCAN": (run_dbscan, 1_000),
+    "OPTICS": (run_optics, 1_000),
+    "agg_clust": (run_agg_clust, 10_000),
+    "cure": (run_cure, 1_000),
+    "cure_sample_part": (run_cure_sample_part, 1_000),
+    "DENCLUE": (run_denclue, 100),
+    "ClaraClustering.clara": (run_clara, 10_000),
+    "KMedoids.fit": (run_kmedoids, 1_000),
+    "clarans.process": (run_clarans, 100),
+    "birch.process": (run_birch, 100_000),
+    "cluster": (run_chameleon, 1_000),
+    "cluster2": (run_chameleon2, 1_000),
+}
+
+
+def _silent_call(fn, X):
+    """
+    Call fn(X) in headless mode, discarding anything still printed to stdout and stderr (e.g. by
+    pyclustering), and closing any figure.
+    """
+    with headless(), contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        fn(X)
+    plt.close("all")
+
+
+def measure(fn, X: np.ndarray, repeat: int = 1, memory: bool = True) -> dict:
+    """Best wall time of repeat runs of fn(X) and, if memory is True, peak memory allocated by a traced run."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _silent_call(fn, X)
+        times.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            _silent_call(fn, X)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {"time": min(times), "peak_memory": peak}
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+    }
+
+
+def _format_memory(peak) -> str:
+    return "-" if peak is None else "{:.1f}MiB".format(peak / 2 ** 20)
+
+
+def run(args) -> int:
+    results = []
+    print("{:<22} {:<12} {:>8} {:>10} {:>12}  {}".format("algorithm", "dataset", "n", "time", "peak memory",
+                                                         "status"))
+
+    for name in args.algorithms:
+        fn, max_size = ALGORITHMS[name]
+        max_size = args.max_size or max_size
+
+        for dataset in args.datasets:
+            for n in args.sizes:
+                record = {"algorithm": name, "dataset": dataset, "n": n, "time": None, "peak_memory": None}
+
+                if n > max_size:
+                    record["status"] = "skipped"
+                else:
+                    try:
+                        record.update(measure(fn, DATASETS[dataset](n), args.repeat, not args.no_memory))
+                        record["status"] = "ok"
+                    except ImportError as e:
+                        record["status"] = f"unavailable: {e}"
+                    except Exception as e:
+                        record["status"] = f"error: {type(e).__name__}: {e}"
+
+                results.append(record)
+                time_str = "-" if record["time"] is None else "{:.3f}s".format(record["time"])
+                print("{:<22} {:<12} {:>8} {:>10} {:>12}  {}".format(name, dataset, n, time_str,
+                                                                     _format_memory(record["peak_memory"]),
+                                                                     record["status"]))
+
+    with open(args.output, "w") as f:
+        json.dump({"metadata": metadata(), "results": results}, f, indent=2)
+    print(f"results written to {args.output}")
+
+    return 0
+
+
+def _ratio(new, base):
+    return None if new is None or base is None or base == 0 else new / base
+
+
+def compare(args) -> int:
+    """Print time and memory ratios new / base of the benchmarks run in both files; return 1 on regressions."""
+    with open(args.base) as f:
+        base = {(r["algorithm"], r["dataset"], r["n"]): r for r in json.load(f)["results"]}
+    with open(args.new) as f:
+        new = {(r["algorithm"], r["dataset"], r["n"]): r for r in json.load(f)["results"]}
+
+    print("{:<22} {:<12} {:>8} {:>10} {:>10} {:>8} {:>12} {:>12} {:>8}".format(
+        "algorithm", "dataset", "n", "base", "new", "ratio", "base mem", "new mem", "ratio"))
+    regressions = 0
+
+    for key in [k for k in base if k in new]:
+        b, r = base[key], new[key]
+        if b["time"] is None or r["time"] is None:
+            continue
+
+        time_ratio = _ratio(r["time"], b["time"])
+        memory_ratio = _ratio(r["peak_memory"], b["peak_memory"])
+        slower = time_ratio > args.threshold or (memory_ratio is not None and memory_ratio > args.threshold)
+        regressions += slower
+
+        print("{:<22} {:<12} {:>8} {:>9.3f}s {:>9.3f}s {:>7.2f}x {:>12} {:>12} {:>8}{}".format(
+            *key, b["time"], r["time"], time_ratio, _format_memory(b["peak_memory"]),
+            _format_memory(r["peak_memory"]), "-" if memory_ratio is None else "{:.2f}x".format(memory_ratio),
+            "  REGRESSION" if slower else ""))
+
+    print(f"{regressions} regression(s) above {args.threshold}x")
+
+    return 1 if regressions > 0 else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks and store the results as JSON")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    run_parser.add_argument("--algorithms", nargs="+", choices=list(ALGORITHMS), default=list(ALGORITHMS),
+                            metavar="ALGORITHM")
+    run_parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), default=list(DATASETS))
+    run_parser.add_argument("--repeat", type=int, default=1, help="number of timed runs, the best is kept")
+    run_parser.add_argument("--max-size", type=int, default=None,
+                            help="run every algorithm up to this size, instead of its own max size")
+    run_parser.add_argument("--no-memory", action="store_true", help="skip the traced run measuring memory")
+    run_parser.add_argument("--output", default="bench_results.json")
+
+    compare_parser = subparsers.add_parser("compare", help="compare two JSON files of results")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=1.2,
+                                help="time or memory ratio new / base above which a result is a regression")
+
+    args = parser.parse_args()
+    sys.exit(run(args) if args.command == "run" else compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1 @@
-import matplotlib.pyplot as plt
-plt.style.use('ggplot')
+from clustviz.utils import set_headless, is_headless, headless
@@ -1,10 +1,13 @@
+import heapq
+
 import numpy as np
-import matplotlib.pyplot as plt
 import pandas as pd
-from typing import Tuple, Iterable
+from scipy.spatial import cKDTree
+from typing import Iterable, Iterator, Optional, Tuple, Union
 
-from clustviz.utils import convert_colors, dist1, cluster_points, \
-    COLOR_DICT, FONTSIZE_BIGGER, annotate_points, build_initial_matrices, draw_rectangle_or_encircle
+from clustviz.kernels import BLOCK_SIZE, cdist, cdist_blocks
+from clustviz.utils import plt, is_headless, convert_colors, dist1, cluster_points, \
+    COLOR_DICT, FONTSIZE_BIGGER, annotate_points, draw_rectangle_or_encircle, ClusterMembership
 
 
 def update_mat(mat: pd.DataFrame, i: int, j: int, linkage: str) -> pd.DataFrame:
@@ -104,7 +107,205 @@ def point_plot_mod(X: np.ndarray, distance_matrix: pd.DataFrame, level_txt: floa
     plt.show()
 
 
-def dist_mat(df: pd.DataFrame, linkage: str) -> pd.DataFrame:
+LINKAGES = ("single", "complete", "average")
+
+
+def condensed_dist(X: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Pairwise euclidean distances of the rows of X in condensed form, i.e. the upper triangle of the
+    distance matrix read row by row, as scipy.spatial.distance.pdist: the distance between the points
+    i < j is at position n * i - i * (i + 1) / 2 + j - i - 1 (see condensed_index). The distances are
+    computed in blocks of rows, exactly as dist1.
+
+    :param X: input data array.
+    :param out: if not None, array of length n * (n - 1) / 2 (e.g. a float32 numpy.memmap) where the
+                distances are written.
+    :return: condensed distance array of length n * (n - 1) / 2, of dtype float64 unless out is given.
+    """
+    X = np.asarray(X, dtype=float)
+    n = len(X)
+    out = np.empty(n * (n - 1) // 2) if out is None else out
+
+    for start, end, D in cdist_blocks(X, X, block_size=BLOCK_SIZE):
+
+        for i in range(start, end):
+            offset = n * i - i * (i + 1) // 2
+            out[offset: offset + n - i - 1] = D[i - start, i + 1:]
+
+    return out
+
+
+def condensed_index(n: int, i: Union[int, np.ndarray], j: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+    """
+    Position of the distance between the points i and j (i != j, in any order) in a condensed distance
+    array of n points; i and j can be arrays.
+
+    :param n: number of points.
+    :param i: index of the first point.
+    :param j: index of the second point.
+    :return: position in the condensed array.
+    """
+    i, j = np.minimum(i, j), np.maximum(i, j)
+
+    return n * i - i * (i + 1) // 2 + j - i - 1
+
+
+def condensed_pair(n: int, p: Union[int, np.ndarray]) -> Tuple[Union[int, np.ndarray], Union[int, np.ndarray]]:
+    """
+    Inverse of condensed_index: the points (i, j), with i < j, whose distance is at position p of a
+    condensed distance array of n points.
+
+    :param n: number of points.
+    :param p: position in the condensed array.
+    :return: indices i and j of the points.
+    """
+    p = np.asarray(p, dtype=np.int64)
+    i = n - 2 - np.floor(np.sqrt(-8 * p + 4 * n * (n - 1) - 7) / 2 - 0.5).astype(np.int64)
+    j = p + i + 1 - n * (n - 1) // 2 + (n - i) * (n - i - 1) // 2
+
+    if p.ndim == 0:
+        return int(i), int(j)
+
+    return i, j
+
+
+STORAGES = ("square", "condensed")
+
+
+def distance_storage(X: np.ndarray, storage: str = "square", dtype: Optional[type] = None,
+                     path: Optional[str] = None) -> np.ndarray:
+    """
+    Distance matrix of the points, on which the merge engines work in place. The square storage is an
+    (n, n) float64 array with np.inf on the diagonal. The condensed storage keeps only the
+    n * (n - 1) / 2 distances between different points (see condensed_index), by default as float32,
+    i.e. 8 times less memory, and it can be a numpy.memmap on a local file, so that the largest
+    hierarchies spill to disk.
+
+    :param X: input data array.
+    :param storage: square or condensed.
+    :param dtype: dtype of the condensed storage, by default float32.
+    :param path: if not None, file backing the condensed storage as a numpy.memmap.
+    :return: distance matrix, as a 2-dimensional (square) or 1-dimensional (condensed) array.
+    """
+    if storage not in STORAGES:
+        raise ValueError(f'Input storage {storage} is invalid. Possible storages: {", ".join(STORAGES)}')
+
+    n = len(X)
+
+    if storage == "square":
+        return condensed_to_square(condensed_dist(X), n)
+
+    dtype = np.float32 if dtype is None else dtype
+    m = n * (n - 1) // 2
+
+    if path is not None:
+        D = np.memmap(path, dtype=dtype, mode="w+", shape=(max(m, 1),))[:m]
+    else:
+        D = np.empty(m, dtype=dtype)
+
+    return condensed_dist(X, out=D)
+
+
+def _distance_row(D: np.ndarray, n: int, a: int) -> np.ndarray:
+    """Distances of cluster a from all the clusters, np.inf for a itself, from a square or condensed storage."""
+    if D.ndim == 2:
+        return D[a]
+
+    row = np.full(n, np.inf)
+    others = np.flatnonzero(np.arange(n) != a)
+    row[others] = D[condensed_index(n, a, others)]
+
+    return row
+
+
+def _distance(D: np.ndarray, n: int, i: int, j: int) -> float:
+    """Distance between the clusters i != j, from a square or condensed storage."""
+    return float(D[i, j] if D.ndim == 2 else D[condensed_index(n, i, j)])
+
+
+def condensed_to_square(d: np.ndarray, n: int, symmetric: bool = True) -> np.ndarray:
+    """
+    Square form of a condensed distance array, with np.inf on the diagonal.
+
+    :param d: condensed distance array.
+    :param n: number of points.
+    :param symmetric: if False, the lower triangle is filled with np.inf, as in dist_mat.
+    :return: square distance matrix.
+    """
+    square = np.full((n, n), np.inf)
+    rows, cols = np.triu_indices(n, k=1)
+    square[rows, cols] = d
+
+    if symmetric is True:
+        square[cols, rows] = d
+
+    return square
+
+
+def cluster_coordinates(df: pd.DataFrame) -> list:
+    """
+    Points of every cluster of a dataframe built by agg_clust, as arrays of shape (m, 2). As in the
+    original chunking of the rows, only the first len(df) // 2 coordinate pairs of a row are read,
+    and the pairs with missing or infinite coordinates are discarded.
+
+    :param df: input dataframe, whose rows list the x and y coordinates of the points of each cluster.
+    :return: list of arrays of points.
+    """
+    values = df.values.astype(float)
+    n_points = min(len(df), values.shape[1]) // 2
+    points = values[:, : 2 * n_points].reshape(len(df), n_points, 2)
+
+    return [p[np.isfinite(p).all(axis=1)] for p in points]
+
+
+def linkage_dist(clusters: list, linkage: str) -> np.ndarray:
+    """
+    Linkage distances between all the pairs of clusters in condensed form, with the same values as
+    sl_dist, cl_dist and avg_dist: the distances between the points are computed once, and reduced
+    cluster by cluster.
+
+    :param clusters: list of arrays of points, one for each cluster.
+    :param linkage: linkage method; can be single, complete, average.
+    :return: condensed array of the linkage distances between the clusters.
+    """
+    if linkage not in LINKAGES:
+        raise ValueError(f'Input linkage parameter {linkage} is invalid. '
+                         'Possible linkage parameters: "single", "complete", "average"')
+
+    n = len(clusters)
+    sizes = np.array([len(c) for c in clusters])
+
+    # clusters of a single point: the linkage distance is the distance between the points
+    if (sizes == 1).all():
+        return condensed_dist(np.vstack(clusters)) if n > 0 else np.empty(0)
+
+    points = np.vstack(clusters)
+    D = condensed_to_square(condensed_dist(points), len(points))
+    np.fill_diagonal(D, 0)
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+    out = np.empty(n * (n - 1) // 2)
+    pos = 0
+
+    for i in range(n):
+        rows = D[bounds[i]: bounds[i + 1]]
+
+        for j in range(i + 1, n):
+            block = rows[:, bounds[j]: bounds[j + 1]].ravel()
+
+            if len(block) == 0:
+                out[pos] = np.inf if linkage == "single" else np.nan
+            elif linkage == "single":
+                out[pos] = np.min(block)
+            elif linkage == "complete":
+                out[pos] = np.max(block)
+            else:
+                out[pos] = np.mean(block)
+            pos += 1
+
+    return out
+
+
+def dist_mat(df: pd.DataFrame, linkage: str, as_frame: bool = True) -> pd.DataFrame:
     """
     Take as input the dataframe created by agg_clust and output the distance matrix.
     It is actually an upper triangular matrix, the symmetrical values are replaced with np.inf.
@@ -112,79 +313,425 @@ def dist_mat(df: pd.DataFrame, linkage: str) -> pd.DataFrame:
     :param df: input dataframe, with the first column corresponding to x-coordinates and
                the second column corresponding to y-coordinates of data points.
     :param linkage: linkage method; can be single, complete, average.
+    :param as_frame: if False, the condensed float64 array of distances (see condensed_dist) is returned
+                     instead of the dataframe.
     :return: distance matrix.
     """
-    even_num = [i for i in range(2, len(df) + 1) if i % 2 == 0]
-    distance_matrix = pd.DataFrame()
-    ind = list(df.index)
-    k = 0
-    for i in ind:
-        for j in ind[k:]:
-            if i != j:
-
-                a = df.loc[i].values
-                b = df.loc[j].values
-                z1 = [i for i in even_num if i <= len(a)]
-                z2 = [i for i in even_num if i <= len(b)]
-                a = [a[: z1[0]]] + [
-                    a[z1[i]: z1[i + 1]] for i in range(len(z1) - 1)
-                ]
-                b = [b[: z2[0]]] + [
-                    b[z2[i]: z2[i + 1]] for i in range(len(z2) - 1)
-                ]
-
-                if linkage == "single":
-                    distance_matrix.loc[i, j] = sl_dist(a, b)
-                elif linkage == "complete":
-                    distance_matrix.loc[i, j] = cl_dist(a, b)
-                elif linkage == "average":
-                    distance_matrix.loc[i, j] = avg_dist(a, b)
-                else:
-                    raise ValueError(f'Input linkage parameter {linkage} is invalid. '
-                                     'Possible linkage parameters: "single", "complete", "average"')
-            else:
+    d = linkage_dist(cluster_coordinates(df), linkage)
+
+    if as_frame is False:
+        return d
 
-                distance_matrix.loc[i, j] = np.inf
+    ind = list(df.index)
 
-        k += 1
+    return pd.DataFrame(condensed_to_square(d, len(ind), symmetric=False), index=ind, columns=ind)
 
-    distance_matrix = distance_matrix.fillna(np.inf)
 
-    return distance_matrix
+def dist_mat_gen(df: pd.DataFrame, as_frame: bool = True) -> pd.DataFrame:
+    """Variation of dist_mat, uses only single_linkage method and returns the symmetric matrix."""
+    d = linkage_dist(cluster_coordinates(df), "single")
 
+    if as_frame is False:
+        return d
 
-def dist_mat_gen(df: pd.DataFrame) -> pd.DataFrame:
-    """Variation of dist_mat, uses only single_linkage method."""
-    even_num = [i for i in range(2, len(df) + 1) if i % 2 == 0]
-    distance_matrix = pd.DataFrame()
     ind = list(df.index)
-    k = 0
-    for i in ind:
-        for j in ind[k:]:
-            if i != j:
-
-                a = df.loc[i].values
-                b = df.loc[j].values
-                z1 = [i for i in even_num if i <= len(a)]
-                z2 = [i for i in even_num if i <= len(b)]
-                a = [a[: z1[0]]] + [
-                    a[z1[i]: z1[i + 1]] for i in range(len(z1) - 1)
-                ]
-                b = [b[: z2[0]]] + [
-                    b[z2[i]: z2[i + 1]] for i in range(len(z2) - 1)
-                ]
-
-                distance_matrix.loc[i, j] = sl_dist(a, b)
-                distance_matrix.loc[j, i] = sl_dist(a, b)
-            else:
 
-                distance_matrix.loc[i, j] = np.inf
+    return pd.DataFrame(condensed_to_square(d, len(ind)), index=ind, columns=ind)
+
+
+def lance_williams_update(D: np.ndarray, sizes: np.ndarray, active: np.ndarray, i: int, j: int,
+                          linkage: str) -> None:
+    """
+    Merge cluster j into cluster i, updating in place the distances of i from the other active clusters
+    with the Lance-Williams recurrences, with the conventions of scipy.cluster.hierarchy.linkage on
+    euclidean distances (ward, centroid and median work on the squared distances). Row and column j are
+    filled with np.inf and j is removed from the active clusters.
+
+    :param D: square distance matrix of the clusters, with np.inf on the diagonal, or condensed distance
+              array (see distance_storage).
+    :param sizes: number of points of every cluster.
+    :param active: boolean mask of the current clusters.
+    :param i: index of the first cluster, which becomes the merged cluster.
+    :param j: index of the second cluster.
+    :param linkage: linkage method; can be single, complete, average, ward, centroid or median.
+    """
+    if linkage not in LINKAGE_ENGINES["lance_williams"]:
+        raise ValueError(f'Input linkage parameter {linkage} is invalid. Possible linkage parameters: '
+                         f'{", ".join(LINKAGE_ENGINES["lance_williams"])}')
+
+    n = len(sizes)
+    active[i] = active[j] = False
+    k = np.flatnonzero(active)
+
+    if D.ndim == 2:
+        d_ki, d_kj, d_ij = D[i, k], D[j, k], D[i, j]
+    else:
+        pos_i, pos_j = condensed_index(n, i, k), condensed_index(n, j, k)
+        d_ki, d_kj, d_ij = D[pos_i].astype(float), D[pos_j].astype(float), float(D[condensed_index(n, i, j)])
+    n_i, n_j, n_k = sizes[i], sizes[j], sizes[k]
 
-        k += 1
+    if linkage == "single":
+        new = np.minimum(d_ki, d_kj)
+    elif linkage == "complete":
+        new = np.maximum(d_ki, d_kj)
+    elif linkage == "average":
+        new = (n_i * d_ki + n_j * d_kj) / (n_i + n_j)
+    elif linkage == "ward":
+        new = np.sqrt(((n_i + n_k) * d_ki ** 2 + (n_j + n_k) * d_kj ** 2 - n_k * d_ij ** 2) / (n_i + n_j + n_k))
+    elif linkage == "centroid":
+        new = np.sqrt(np.maximum((n_i * d_ki ** 2 + n_j * d_kj ** 2) / (n_i + n_j)
+                                 - n_i * n_j * d_ij ** 2 / (n_i + n_j) ** 2, 0))
+    else:
+        # median
+        new = np.sqrt(np.maximum(d_ki ** 2 / 2 + d_kj ** 2 / 2 - d_ij ** 2 / 4, 0))
+
+    if D.ndim == 2:
+        D[i, k] = new
+        D[k, i] = new
+        D[j, :] = np.inf
+        D[:, j] = np.inf
+    else:
+        D[pos_i] = new
+        D[condensed_index(n, j, np.flatnonzero(np.arange(n) != j))] = np.inf
 
-    distance_matrix = distance_matrix.fillna(np.inf)
+    sizes[i] += sizes[j]
+    active[i] = True
 
-    return distance_matrix
+
+def lance_williams_merges(X: np.ndarray, linkage: str, storage: str = "square",
+                          path: Optional[str] = None) -> Iterator[Tuple[int, int, float]]:
+    """
+    Agglomerate the points of X, yielding the merges one at a time. The distance matrix is allocated once
+    and updated in place by lance_williams_update; at every step the closest pair of active clusters is
+    merged, the merged cluster taking the lower index. Ties are broken in row-major order.
+
+    :param X: input data array.
+    :param linkage: linkage method; can be single, complete, average, ward, centroid or median.
+    :param storage: square or condensed storage of the distances (see distance_storage).
+    :param path: if not None, file backing the condensed storage as a numpy.memmap.
+    :return: generator of (i, j, distance), with i < j the indices of the merged clusters.
+    """
+    n = len(X)
+    D = distance_storage(X, storage, path=path)
+    sizes = np.ones(n, dtype=np.int64)
+    active = np.ones(n, dtype=bool)
+
+    for _ in range(n - 1):
+        if D.ndim == 2:
+            (i, j) = np.unravel_index(D.argmin(), D.shape)
+            (i, j) = (int(min(i, j)), int(max(i, j)))
+        else:
+            (i, j) = condensed_pair(n, D.argmin())
+        distance = _distance(D, n, i, j)
+
+        lance_williams_update(D, sizes, active, i, j, linkage)
+
+        yield int(i), int(j), float(distance)
+
+
+def nn_chain_merges(X: np.ndarray, linkage: str, storage: str = "square", path: Optional[str] = None) -> list:
+    """
+    Agglomerate the points of X with the nearest-neighbor chain algorithm, in O(n^2) time: a chain of
+    nearest neighbors is grown until two clusters are each other's nearest neighbor, and they are merged
+    with lance_williams_update. It is exact for the reducible linkages (single, complete, average, ward),
+    but the merges are not found in order of distance.
+
+    :param X: input data array.
+    :param linkage: linkage method; can be single, complete, average or ward.
+    :param storage: square or condensed storage of the distances (see distance_storage).
+    :param path: if not None, file backing the condensed storage as a numpy.memmap.
+    :return: list of (i, j, distance), with i < j the indices of the merged clusters.
+    """
+    if linkage not in ("single", "complete", "average", "ward"):
+        raise ValueError(f'Input linkage parameter {linkage} is invalid. '
+                         'Possible linkage parameters: "single", "complete", "average", "ward"')
+
+    n = len(X)
+    D = distance_storage(X, storage, path=path)
+    sizes = np.ones(n, dtype=np.int64)
+    active = np.ones(n, dtype=bool)
+    chain = []
+    merges = []
+
+    while len(merges) < n - 1:
+
+        if len(chain) == 0:
+            chain.append(int(np.argmax(active)))
+
+        a = chain[-1]
+        row = _distance_row(D, n, a)
+        b = int(row.argmin())
+
+        # the previous cluster of the chain is preferred among the nearest neighbors
+        if len(chain) > 1 and row[chain[-2]] <= row[b]:
+            b = chain[-2]
+
+        if len(chain) > 1 and b == chain[-2]:
+            chain = chain[:-2]
+            (i, j) = (min(a, b), max(a, b))
+            merges.append((i, j, float(row[b])))
+            lance_williams_update(D, sizes, active, i, j, linkage)
+        else:
+            chain.append(b)
+
+    return merges
+
+
+def mst_merges(X: np.ndarray) -> list:
+    """
+    Single linkage merges as the edges of the minimum spanning tree of the points, found with Prim's
+    algorithm in O(n^2) time and O(n) memory: the distances are computed one row at a time, without
+    storing the distance matrix.
+
+    :param X: input data array.
+    :return: list of (i, j, distance) edges of the minimum spanning tree.
+    """
+    X = np.asarray(X, dtype=float)
+    n = len(X)
+    in_tree = np.zeros(n, dtype=bool)
+    closest = np.full(n, np.inf)
+    parent = np.zeros(n, dtype=np.int64)
+    merges = []
+    current = 0
+
+    for _ in range(n - 1):
+        in_tree[current] = True
+        d = np.sqrt(np.sum((X - X[current]) ** 2, axis=1))
+
+        better = (d < closest) & ~in_tree
+        closest[better] = d[better]
+        parent[better] = current
+        closest[current] = np.inf
+
+        current = int(closest.argmin())
+        merges.append((int(parent[current]), current, float(closest[current])))
+
+    return merges
+
+
+def ward_merges(X: np.ndarray) -> Iterator[Tuple[int, int, float]]:
+    """
+    Ward agglomeration in closed form: every cluster keeps its size and centroid, and the increase in
+    total within-cluster variance of merging A and B is |A||B| / (|A| + |B|) * ||c_A - c_B||^2. The
+    nearest partner of every cluster is kept in a heap; since Ward linkage is reducible, after a merge
+    only the clusters whose nearest partner was one of the merged clusters need a new search. No
+    distance matrix is stored.
+
+    :param X: input data array.
+    :return: generator of (i, j, increment) in order of merge, with i < j the indices of the merged
+             clusters (the merged cluster takes the index i) and increment the increase in total
+             within-cluster variance.
+    """
+    centroids = np.array(X, dtype=float)
+    n = len(centroids)
+    sizes = np.ones(n, dtype=np.int64)
+    active = np.ones(n, dtype=bool)
+
+    if n < 2:
+        return
+
+    def nearest(a: int) -> Tuple[int, float]:
+        costs = sizes * sizes[a] / (sizes + sizes[a]) * np.sum((centroids - centroids[a]) ** 2, axis=1)
+        costs[~active] = np.inf
+        costs[a] = np.inf
+        b = int(costs.argmin())
+        return b, float(costs[b])
+
+    # nearest partners of the single points, from a KD-tree
+    _, idx = cKDTree(centroids).query(centroids, k=2)
+    nn = np.where(idx[:, 0] == np.arange(n), idx[:, 1], idx[:, 0])
+    nn_cost = np.sum((centroids - centroids[nn]) ** 2, axis=1) / 2
+    heap = list(zip(nn_cost.tolist(), range(n), nn.tolist()))
+    heapq.heapify(heap)
+
+    for _ in range(n - 1):
+
+        # skip the outdated candidates
+        while True:
+            (cost, a, b) = heapq.heappop(heap)
+            if active[a] and nn[a] == b and nn_cost[a] == cost:
+                break
+
+        (i, j) = (min(a, b), max(a, b))
+
+        centroids[i] = (sizes[i] * centroids[i] + sizes[j] * centroids[j]) / (sizes[i] + sizes[j])
+        sizes[i] += sizes[j]
+        active[j] = False
+
+        # the merged cluster and the clusters whose nearest partner has been merged look for a new one
+        affected = active & ((nn == i) | (nn == j))
+        affected[i] = active.sum() > 1
+
+        for c in np.flatnonzero(affected).tolist():
+            nn[c], nn_cost[c] = nearest(c)
+            heapq.heappush(heap, (nn_cost[c], c, int(nn[c])))
+
+        yield i, j, cost
+
+
+def merges_to_linkage(merges: Iterable[Tuple[int, int, float]], n: int, sort: bool = True) -> np.ndarray:
+    """
+    Build the linkage matrix of scipy.cluster.hierarchy from a list of merges of point (or cluster slot)
+    indices: the merges are sorted by distance (stably) and every cluster is relabelled as in scipy,
+    the one created at step k taking the label n + k.
+
+    :param merges: iterable of (i, j, distance), where i and j are any points of the merged clusters.
+    :param n: number of points.
+    :param sort: if False, the merges are kept in their order, which must be the order in which they
+                 happened; needed by centroid and median linkages, whose distances are not monotonic.
+    :return: linkage matrix of shape (n - 1, 4): the labels of the merged clusters, their distance and
+             the number of points of the new cluster.
+    """
+    merges = np.array(list(merges), dtype=float).reshape(-1, 3)
+    if sort is True:
+        merges = merges[np.argsort(merges[:, 2], kind="mergesort")]
+
+    parent = np.arange(n)
+    label = np.arange(n)
+    size = np.ones(n, dtype=np.int64)
+    Z = np.empty((len(merges), 4))
+
+    def find(x: int) -> int:
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for k, (i, j, distance) in enumerate(merges):
+        root_i, root_j = find(int(i)), find(int(j))
+        Z[k] = (min(label[root_i], label[root_j]), max(label[root_i], label[root_j]), distance,
+                size[root_i] + size[root_j])
+
+        parent[root_j] = root_i
+        size[root_i] += size[root_j]
+        label[root_i] = n + k
+
+    return Z
+
+
+LINKAGE_ENGINES = {
+    "lance_williams": ("single", "complete", "average", "ward", "centroid", "median"),
+    "nn_chain": ("single", "complete", "average", "ward"),
+    "mst": ("single",),
+    "ward": ("ward",),
+}
+
+
+def linkage_matrix(X: np.ndarray, linkage: str, engine: Optional[str] = None, storage: str = "square",
+                   path: Optional[str] = None) -> np.ndarray:
+    """
+    Full hierarchy of the agglomerative clustering of X, as the linkage matrix of scipy.cluster.hierarchy.
+    By default the engine is picked from the linkage: mst for single and nn_chain for complete and average,
+    both in O(n^2) time, the closed form ward engine, without distance matrix, for ward, and lance_williams,
+    in O(n^3) time, for centroid and median.
+
+    :param X: input data array.
+    :param linkage: linkage method; can be single, complete, average, ward, centroid or median.
+    :param engine: lance_williams, nn_chain, mst or ward, or None to pick it automatically.
+    :param storage: square or condensed storage of the distances of the lance_williams and nn_chain engines
+                    (see distance_storage); the mst and ward engines store no distances.
+    :param path: if not None, file backing the condensed storage as a numpy.memmap.
+    :return: linkage matrix of shape (n - 1, 4).
+    """
+    if engine is None:
+        engine = {"single": "mst", "complete": "nn_chain", "average": "nn_chain", "ward": "ward"}.get(
+            linkage, "lance_williams")
+
+    if engine not in LINKAGE_ENGINES:
+        raise ValueError(f'Input engine {engine} is invalid. Possible engines: {", ".join(LINKAGE_ENGINES)}')
+
+    if linkage not in LINKAGE_ENGINES[engine]:
+        raise ValueError(f'Input linkage parameter {linkage} is invalid for the {engine} engine. '
+                         f'Possible linkage parameters: {", ".join(LINKAGE_ENGINES[engine])}')
+
+    if engine == "mst":
+        return merges_to_linkage(mst_merges(X), len(X))
+
+    if engine == "nn_chain":
+        return merges_to_linkage(nn_chain_merges(X, linkage, storage, path), len(X))
+
+    if engine == "ward":
+        # the ward distance of scipy is sqrt(2 * increment)
+        return merges_to_linkage(((i, j, np.sqrt(2 * cost)) for i, j, cost in ward_merges(X)), len(X))
+
+    # the merges are found in order: they are not sorted, as in scipy, for centroid and median
+    return merges_to_linkage(lance_williams_merges(X, linkage, storage, path), len(X), sort=False)
+
+
+def _cut_at_steps(Z: np.ndarray, steps: np.ndarray) -> np.ndarray:
+    """
+    Flat labels of the points after the first steps[c] merges of the linkage matrix, for every c, in a
+    single pass over the merges: the parents of the nodes of the hierarchy are set incrementally and the
+    roots of the points are found by pointer doubling on the parent array. Clusters are numbered in order
+    of their first point.
+    """
+    n = len(Z) + 1
+    parent = np.arange(2 * n - 1)
+    labels = np.empty((len(steps), n), dtype=np.int64)
+    done = 0
+
+    for c in np.argsort(steps, kind="stable"):
+        new_nodes = np.arange(n + done, n + steps[c])
+        parent[Z[done: steps[c], 0].astype(np.int64)] = new_nodes
+        parent[Z[done: steps[c], 1].astype(np.int64)] = new_nodes
+        done = steps[c]
+
+        # pointer doubling: every node ends up pointing to its root, and the compressed parents are kept
+        # for the next cuts, as the merges only add parents to the current roots
+        while True:
+            up = parent[parent]
+            if np.array_equal(up, parent):
+                break
+            parent = up
+
+        roots = parent[:n]
+        _, first, inverse = np.unique(roots, return_index=True, return_inverse=True)
+        rank = np.empty(len(first), dtype=np.int64)
+        rank[np.argsort(first, kind="stable")] = np.arange(len(first))
+        labels[c] = rank[inverse.ravel()]
+
+    return labels
+
+
+def cut_at_k(Z: np.ndarray, k: Union[int, Iterable[int]]) -> np.ndarray:
+    """
+    Cut the hierarchy in k clusters, for many k in one pass.
+
+    :param Z: linkage matrix, as returned by agg_clust or linkage_matrix.
+    :param k: number of clusters, or iterable of numbers of clusters, between 1 and the number of points.
+    :return: array of cluster labels of shape (len(k), n), clusters numbered in order of their first point;
+             a 1-dimensional array if k is a scalar.
+    """
+    n = len(Z) + 1
+    ks = np.asarray(k, dtype=np.int64)
+
+    if ks.size > 0 and (ks.min() < 1 or ks.max() > n):
+        raise ValueError(f"k: {k} must be between 1 and the number of points: {n}")
+
+    labels = _cut_at_steps(Z, n - ks.reshape(-1))
+
+    return labels[0] if ks.ndim == 0 else labels
+
+
+def cut_at_height(Z: np.ndarray, height: Union[float, Iterable[float]]) -> np.ndarray:
+    """
+    Cut the hierarchy at the given heights, for many heights in one pass: the clusters are the ones formed
+    by the merges at a distance <= height. For centroid and median linkages, whose merge distances can
+    decrease, the merges after the first one above the height are not performed.
+
+    :param Z: linkage matrix, as returned by agg_clust or linkage_matrix.
+    :param height: height, or iterable of heights, of the cut.
+    :return: array of cluster labels of shape (len(height), n), clusters numbered in order of their first
+             point; a 1-dimensional array if height is a scalar.
+    """
+    heights = np.asarray(height, dtype=float)
+    steps = np.searchsorted(np.maximum.accumulate(Z[:, 2]), heights.reshape(-1), side="right")
+
+    labels = _cut_at_steps(Z, steps)
+
+    return labels[0] if heights.ndim == 0 else labels
 
 
 def compute_var(X: np.ndarray, df: pd.DataFrame) -> Tuple[pd.DataFrame, float]:
@@ -254,7 +801,9 @@ def compute_var_sing(df: pd.DataFrame, centroids: pd.DataFrame) -> list:
 def compute_ward_ij(data: np.ndarray, df: pd.DataFrame) -> Tuple[Tuple, float, float]:
     """
     Compute difference in total within-cluster variance, with squared euclidean
-    distance, and finds the best cluster according to Ward criterion.
+    distance, and finds the best cluster according to Ward criterion. The increase of merging the
+    clusters A and B is computed in closed form, as |A||B| / (|A| + |B|) * ||c_A - c_B||^2, from the
+    sizes and centroids of the clusters.
 
     :param data: input data array.
     :param df:  input dataframe built by agg_clust, listing the cluster and the x and y
@@ -263,161 +812,105 @@ def compute_ward_ij(data: np.ndarray, df: pd.DataFrame) -> Tuple[Tuple, float, f
              new_summ: new total intra-cluster variance
              par_var: increment in total intra-cluster variance, i.e. minimum increase in total intra-cluster variance
     """
-    even_num = [i for i in range(2, len(data) + 1) if i % 2 == 0]
-
-    (centroids, summ) = compute_var(data, df)
-    variances = {}
-    k = 0
+    data = np.asarray(data, dtype=float)
     ind = list(df.index)
+    members = [data[[int(p) for p in cluster_points(i)]] for i in ind]
+
+    sizes = np.array([len(m) for m in members])
+    centroids = np.array([m.mean(axis=0) for m in members])
+    summ = np.sum([np.sum((m - c) ** 2) for m, c in zip(members, centroids)])
+
+    # increase in total within-cluster variance for every pair, upper triangle in row-major order
+    rows, cols = np.triu_indices(len(ind), k=1)
+    partial_var = sizes[rows] * sizes[cols] / (sizes[rows] + sizes[cols]) * np.sum(
+        (centroids[rows] - centroids[cols]) ** 2, axis=1
+    )
+
+    best = int(partial_var.argmin())
+    par_var = partial_var[best]
 
-    partial_var = {}
-
-    for i in ind:
-        for j in ind[k:]:
-            if i != j:
-                az = df.loc[i].values
-                bz = df.loc[j].values
-                z1 = [i for i in even_num if i <= len(az)]
-                z2 = [i for i in even_num if i <= len(bz)]
-                az = [az[: z1[0]]] + [
-                    az[z1[i]: z1[i + 1]] for i in range(len(z1) - 1)
-                ]
-                bz = [bz[: z2[0]]] + [
-                    bz[z2[i]: z2[i + 1]] for i in range(len(z2) - 1)
-                ]
-                d = az + bz
-                valid = [
-                    el for el in d if np.isinf(el).sum() != 2
-                ]
-                # print(valid)
-                centroid = np.mean(valid, axis=0)
-                var_int_par = []
-                for el in valid:
-                    var_int_par.append(dist1(el, centroid) ** 2)
-                var_intz = np.sum(var_int_par)
-                partial_var[(i, j)] = (
-                        var_intz
-                        - centroids.loc[i]["var"]
-                        - centroids.loc[j]["var"]
-                )
-
-                var_new = summ + partial_var[(i, j)]
-                variances[(i, j)] = var_new
-        k += 1
-
-    (i, j) = min(variances, key=variances.get)
-    new_summ = np.min(list(variances.values()))
-    par_var = partial_var[(i, j)]
-
-    return (i, j), new_summ, par_var
+    return (ind[rows[best]], ind[cols[best]]), summ + par_var, par_var
 
 
 def sl_dist(a: Iterable, b: Iterable) -> float:
     """Distance for single_linkage method, i.e. min[dist(x,y)] for x in a & y in b."""
-    distances = []
-    for i in a:
-        for j in b:
-            distances.append(dist1(i, j))
-    distances = [i for i in distances if np.isnan(i) == False]
-    return np.min(distances)
+    distances = cdist(list(a), list(b))
+    return np.min(distances[~np.isnan(distances)])
 
 
 def cl_dist(a: Iterable, b: Iterable) -> float:
     """Distance for complete_linkage method, i.e. max[dist(x,y)] for x in a & y in b."""
-    distances = []
-    for i in a:
-        for j in b:
-            distances.append(dist1(i, j))
-    distances = [
-        i
-        for i in distances
-        if (np.isnan(i) == False) and (np.isinf(i) == False)
-    ]
-    return np.max(distances)
+    distances = cdist(list(a), list(b))
+    return np.max(distances[np.isfinite(distances)])
 
 
 def avg_dist(a: Iterable, b: Iterable) -> float:
     """Distance for average_linkage method, i.e. mean[dist(x, y)] for x in a & y in b."""
-    distances = []
-    for i in a:
-        for j in b:
-            distances.append(dist1(i, j))
-    distances = [
-        i
-        for i in distances
-        if (np.isnan(i) == False) and (np.isinf(i) == False)
-    ]
-    return np.mean(distances)
+    distances = cdist(list(a), list(b))
+    return np.mean(distances[np.isfinite(distances)])
 
 
-def agg_clust(X: np.ndarray, linkage: str, plotting: bool = True) -> None:
+def agg_clust(X: np.ndarray, linkage: str, plotting: bool = True, storage: str = "square",
+              path: Optional[str] = None) -> np.ndarray:
     """
     Perform hierarchical agglomerative clustering with the provided linkage method, plotting every step
-    of cluster aggregation.
+    of cluster aggregation. Without plots, the hierarchy is computed by the fastest engine of linkage_matrix.
 
     :param X: input data array.
-    :param linkage: linkage method; can be single, complete, average or ward.
+    :param linkage: linkage method; can be single, complete, average, ward, centroid or median.
     :param plotting: if True, execute plots.
+    :param storage: square (float64) or condensed (float32, n * (n - 1) / 2 values) storage of the distance
+                    matrix, see distance_storage.
+    :param path: if not None, file backing the condensed storage as a numpy.memmap.
+    :return: linkage matrix of the full merge history, in the format of scipy.cluster.hierarchy: for every
+             merge the labels of the merged clusters, the merge height (the ward distance of scipy,
+             sqrt(2 * increment in variance), for ward linkage) and the size of the new cluster;
+             see cut_at_k and cut_at_height for flat labels.
     """
+    plotting = plotting and not is_headless()
+    if plotting is False:
+        return linkage_matrix(X, linkage, storage=storage, path=path)
+
     levels = []
     levels2 = []
     ind_list = []
+    heights = []
+
+    # membership of the points in the clusters; names and plotting frames are derived from it
+    membership = ClusterMembership(len(X))
 
-    # build matrix df, used to store points of clusters with their coordinates
-    df, df_nonan = build_initial_matrices(X)
+    # merges in order, computed in closed form for ward and in place on the distance matrix otherwise
+    merges = ward_merges(X) if linkage == "ward" else lance_williams_merges(X, linkage, storage, path)
 
-    # initial distance matrix
-    distance_matrix = dist_mat_gen(df_nonan)
     var_sum = 0
     levels.append(var_sum)
     levels2.append(var_sum)
 
     # until the desired number of clusters is reached
-    while len(df) > 1:
+    while len(membership) > 1:
 
         if linkage == "ward":
-            # find indexes corresponding to the minimum increase in total intra-cluster variance
-            df_nonan = df.dropna(axis=1, how="all")
-            df_nonan = df_nonan.fillna(np.inf)
-            ((i, j), var_sum, par_var) = compute_ward_ij(X, df_nonan)
+            # find the clusters with the minimum increase in total intra-cluster variance
+            (i, j, par_var) = next(merges)
+            var_sum += par_var
 
             levels.append(var_sum)
             levels2.append(par_var)
-            ind_list.append((i, j))
-            new_clust = df.loc[[i, j], :]
 
         else:
-            # find indexes corresponding to the minimum distance
-            (i, j) = np.unravel_index(
-                np.array(distance_matrix).argmin(), np.array(distance_matrix).shape
-            )
-            levels.append(np.min(np.array(distance_matrix)))
-            ind_list.append((i, j))
-            new_clust = df.iloc[[i, j], :]
-
-            # update distance matrix
-            distance_matrix = update_mat(distance_matrix, i, j, linkage)
-
-        df = df.drop([new_clust.iloc[0].name], 0)
-        df = df.drop([new_clust.iloc[1].name], 0)
-
-        shift_dim = int(new_clust.iloc[0].notna().sum())
-
-        new_cluster_name = (
-                "("
-                + new_clust.iloc[0].name
-                + ")-("
-                + new_clust.iloc[1].name
-                + ")"
-        )
-
-        df.loc[new_cluster_name, :] = new_clust.iloc[0].fillna(
-            0
-        ) + new_clust.iloc[1].shift(shift_dim, fill_value=0)
+            # find the clusters at minimum distance, and update the distance matrix
+            (i, j, distance) = next(merges)
+            levels.append(distance)
+
+        ind_list.append((i, j))
+        membership.union(i, j)
+        heights.append(np.sqrt(2 * par_var) if linkage == "ward" else distance)
 
         if plotting is True:
 
             if linkage != "ward":
-                point_plot_mod(X, df, levels[-1])
+                point_plot_mod(X, membership.frame(), levels[-1])
             else:
-                point_plot_mod(X, df, levels[-2], levels2[-1])
+                point_plot_mod(X, membership.frame(), levels[-2], levels2[-1])
+
+    return merges_to_linkage(((i, j, h) for (i, j), h in zip(ind_list, heights)), len(X), sort=False)
@@ -2,12 +2,11 @@ import numpy as np
 from pyclustering.cluster.agglomerative import agglomerative, type_link
 from pyclustering.cluster.encoder import cluster_encoder, type_encoding
 from pyclustering.cluster.birch import birch as birch_pyclustering
-from pyclustering.cluster import cluster_visualizer
 
 from pyclustering.container.cftree import leaf_node, non_leaf_node, cfnode_type, measurement_type
 from pyclustering.container.cftree import cftree as cftree_pyclustering
 
-from clustviz.utils import COLOR_DICT, annotate_points
+from clustviz.utils import COLOR_DICT, annotate_points, is_headless, report
 
 
 class cftree(cftree_pyclustering):
@@ -18,9 +17,9 @@ class cftree(cftree_pyclustering):
 
         :param entry: clustering feature that should be inserted.
         """
-        print("insert entry")
+        report("cftree.insert", "insert entry")
         if self.__root is None:
-            print("first time")
+            report("cftree.first_insert", "first time")
             node = leaf_node(entry, None, [entry])
 
             self.__root = node
@@ -31,10 +30,10 @@ class cftree(cftree_pyclustering):
             self.__amount_nodes += 1
             self.__height += 1  # root has successor now
         else:
-            print("recursive insert")
+            report("cftree.recursive_insert", "recursive insert")
             child_node_updation = self.__recursive_insert(entry, self.__root)
             if child_node_updation is True:
-                print("try merge_nearest_successors")
+                report("cftree.merge_nearest_successors", "try merge_nearest_successors")
                 # Splitting has been finished, check for possibility to merge (at least we have already two children).
                 if self.__merge_nearest_successors(self.__root) is True:
                     self.__amount_nodes -= 1
@@ -52,12 +51,12 @@ class cftree(cftree_pyclustering):
         """
         # Non-leaf node
         if search_node.type == cfnode_type.CFNODE_NONLEAF:
-            print("insert for non-leaf")
+            report("cftree.insert_non_leaf", "insert for non-leaf")
             return self.__insert_for_noneleaf_node(entry, search_node)
 
         # Leaf is reached
         else:
-            print("insert for leaf")
+            report("cftree.insert_leaf", "insert for leaf")
             return self.__insert_for_leaf_node(entry, search_node)
 
     def __insert_for_leaf_node(self, entry, search_node):
@@ -78,20 +77,21 @@ class cftree(cftree_pyclustering):
         )
         nearest_entry = search_node.entries[index_nearest_entry]
         merged_entry = nearest_entry + entry
-        print("index_nearest_entry", index_nearest_entry)
-        print("nearest entry", nearest_entry)
+        report("cftree.nearest_entry", "index_nearest_entry", index_nearest_entry, "\nnearest entry", nearest_entry,
+               index=index_nearest_entry, entry=nearest_entry)
 
-        print("diam:", merged_entry.get_diameter())
+        diameter = merged_entry.get_diameter()
+        report("cftree.diameter", "diam:", diameter, diameter=diameter)
         # Otherwise try to add new entry
-        if merged_entry.get_diameter() > self.__threshold:
-            print("diam greater than threshold")
+        if diameter > self.__threshold:
+            report("cftree.diameter_exceeded", "diam greater than threshold")
             # If it's not exceeded append entity and update feature of the leaf node.
             search_node.insert_entry(entry)
 
             # Otherwise current node should be splitted
 
             if len(search_node.entries) > self.__max_entries:
-                print("node has to split")
+                report("cftree.node_split", "node has to split")
                 self.__split_procedure(search_node)
                 node_amount_updation = True
 
@@ -99,7 +99,7 @@ class cftree(cftree_pyclustering):
             self.__amount_entries += 1
 
         else:
-            print("diam ok")
+            report("cftree.diameter_ok", "diam ok")
             search_node.entries[index_nearest_entry] = merged_entry
             search_node.feature += entry
 
@@ -120,8 +120,9 @@ class cftree(cftree_pyclustering):
             search_node, self.__type_measurement
         )
         nearest_child_node = min(search_node.successors, key=min_key)
-        print("nearestchildnode: ", nearest_child_node)
-        print("recursive insert in !!!insert_for_nonleaf!!!")
+        report("cftree.nearest_child_node",
+               "nearestchildnode: {0}\nrecursive insert in !!!insert_for_nonleaf!!!".format(nearest_child_node),
+               node=nearest_child_node)
         child_node_updation = self.__recursive_insert(
             entry, nearest_child_node
         )
@@ -131,11 +132,11 @@ class cftree(cftree_pyclustering):
 
         # Check branch factor, probably some leaf has been splitted and threshold has been exceeded.
         if len(search_node.successors) > self.__branch_factor:
-            print("over branch_factor ")
+            report("cftree.branch_factor_exceeded", "over branch_factor ")
 
             # Check if it's aleady root then new root should be created (height is increased in this case).
             if search_node is self.__root:
-                print("height increases")
+                report("cftree.height_increase", "height increases")
                 self.__root = non_leaf_node(
                     search_node.feature, None, [search_node]
                 )
@@ -145,7 +146,7 @@ class cftree(cftree_pyclustering):
                 self.__amount_nodes += 1
                 self.__height += 1
 
-            print("split non-leaf node")
+            report("cftree.split_non_leaf", "split non-leaf node")
             [new_node1, new_node2] = self.__split_nonleaf_node(search_node)
 
             # Update parent list of successors
@@ -196,9 +197,9 @@ class cftree(cftree_pyclustering):
                 merging_result = True
 
         if merging_result is True:
-            print("merging successful")
+            report("cftree.merge", "merging successful", merged=True)
         else:
-            print("merging not successful")
+            report("cftree.merge", "merging not successful", merged=False)
         return merging_result
 
     def __split_leaf_node(self, node):
@@ -212,13 +213,13 @@ class cftree(cftree_pyclustering):
         @warning Splitted node is transformed to non_leaf.
 
         """
-        print("split leaf")
+        report("cftree.split_leaf", "split leaf")
         # search farthest pair of entries
         [farthest_entity1, farthest_entity2] = node.get_farthest_entries(
             self.__type_measurement
         )
-        print("farthest1 ", farthest_entity1)
-        print("farthest2 ", farthest_entity2)
+        report("cftree.farthest_entries", "farthest1", farthest_entity1, "\nfarthest2", farthest_entity2,
+               entries=(farthest_entity1, farthest_entity2))
 
         # create new nodes
         new_node1 = leaf_node(
@@ -245,8 +246,7 @@ class cftree(cftree_pyclustering):
                 else:
                     new_node2.insert_entry(entity)
 
-        print("new_node1 ", new_node1)
-        print("new_node2 ", new_node2)
+        report("cftree.new_nodes", "new_node1", new_node1, "\nnew_node2", new_node2, nodes=(new_node1, new_node2))
 
         return [new_node1, new_node2]
 
@@ -259,6 +259,8 @@ class cftree(cftree_pyclustering):
          if it not specified than feature will be displayed only.
 
          """
+        from pyclustering.cluster import cluster_visualizer
+
         visualizer = cluster_visualizer()
 
         print("amount of nodes: ", self.__amount_nodes)
@@ -304,11 +306,11 @@ class birch(birch_pyclustering):
         @see get_clusters()
 
         """
-        self.__insert_data(plotting=plotting)
-        print("extracting features")
+        self.__insert_data(plotting=plotting and not is_headless())
+        report("birch.extract_features", "extracting features")
         self.__extract_features()
 
-        print("features: ", self.__features)
+        report("birch.features", "features: ", self.__features, amount=len(self.__features))
 
         cf_data = [feature.get_centroid() for feature in self.__features]
 
@@ -339,14 +341,12 @@ class birch(birch_pyclustering):
                 plot_tree_fin(self.__tree)
                 plot_birch_leaves(self.__tree, data=self.__pointer_data)
 
-            print("\n\n")
-            print("index: {}".format(index_point))
             point = self.__pointer_data[index_point]
-            print("point {}".format(point))
+            report("birch.insert_point", "\n\n\nindex:", index_point, "\npoint", point, index=index_point, point=point)
             self.__tree.insert_point(point)
 
             if self.__tree.amount_entries > self.__entry_size_limit:
-                print("rebuilding tree")
+                report("birch.rebuild_tree", "rebuilding tree", index=index_point)
                 self.__tree = self.__rebuild_tree(index_point)
 
     def __rebuild_tree(self, index_point):
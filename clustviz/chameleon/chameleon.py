@@ -8,6 +8,7 @@ from typing import List, Tuple, Union
 
 from clustviz.chameleon.graphtools import bisection_weights, connecting_edges, get_weights, get_cluster, knn_graph, \
     plot2d_graph, pre_part_graph, plot2d_data
+from clustviz.utils import is_headless
 
 NxGraph = nx.Graph
 
@@ -201,6 +202,9 @@ def cluster(df: pd.DataFrame, k: int, knn: int = 10, m: int = 30, alpha: float =
     :param plot: if True, show plots.
     :return: dataframe with cluster labels and dictionary of merging scores (similarities).
     """
+    if is_headless():
+        verbose0 = verbose1 = verbose2 = plot = False
+
     if k is None:
         k = 1
 
@@ -8,6 +8,7 @@ from typing import List, Union, Tuple, Generator, Dict
 
 from clustviz.chameleon.graphtools import connecting_edges, get_weights, plot2d_data, plot2d_graph, knn_graph, \
     pre_part_graph
+from clustviz.utils import is_headless, report
 from clustviz.chameleon.chameleon import (
     internal_closeness,
     get_cluster,
@@ -209,6 +210,9 @@ def cluster2(df: pd.DataFrame, k: int = None, knn: int = None, m: int = 30, alph
     :param auto_extract: if True, try to extract the optimal number of clusters and print it.
     :return: dataframe with cluster labels and dictionary of merging scores (similarities).
     """
+    if is_headless():
+        verbose = verbose1 = verbose2 = plot = False
+
     if knn is None:
         knn = int(round(2 * np.log(len(df))))
 
@@ -358,7 +362,8 @@ def flood_fill(preprocessed_graph: NxGraph, knn_graph: NxGraph, df: pd.DataFrame
             r_dict[k] = [i for i in restr_dict[k] if i in points]
 
         cc_list = list(connected_components(r_dict))
-        print("cluster_label: {0}, #_connected_components: {1}".format(num, len(cc_list)))
+        report("chameleon.flood_fill", "cluster_label:", num, "#_connected_components:", len(cc_list), cluster=num,
+               n_components=len(cc_list))
         if len(cc_list) == 1:
             continue
         elif len(cc_list) == 0:
@@ -366,7 +371,7 @@ def flood_fill(preprocessed_graph: NxGraph, knn_graph: NxGraph, df: pd.DataFrame
         else:
             # skip the first
             for component in cc_list[1:]:
-                print(f"new index for the component: {new_cl_ind}")
+                report("chameleon.new_component", "new index for the component:", new_cl_ind, index=new_cl_ind)
                 for el in component:
                     cl_dict[el] = new_cl_ind
                 new_cl_ind += 1
@@ -465,11 +470,12 @@ def extract_optimal_n_clust(merging_similarities: Dict[int, float], m: int, f: f
     dh = dendrogram_height(merging_similarities, m)
 
     if len(dh) <= 3:
-        print("Insufficient merging steps to perform auto_extract; decrease k and/or increase m.")
+        report("chameleon.optimal_n_clusters",
+               "Insufficient merging steps to perform auto_extract; decrease k and/or increase m.", n_clusters=None)
         return
 
     fjc = first_jump_cutoff(dh, f, eta, m)
 
     opt_n_clust = find_nearest_height(dh, fjc)
 
-    print(f"Optimal number of clusters: {opt_n_clust}")
+    report("chameleon.optimal_n_clusters", "Optimal number of clusters:", opt_n_clust, n_clusters=opt_n_clust)
@@ -3,10 +3,10 @@ import pandas as pd
 import networkx as nx
 from tqdm.auto import tqdm
 from collections import OrderedDict, Counter
-import matplotlib.pyplot as plt
 import metispy as metis
 from typing import Tuple, List, Optional
-from clustviz.utils import euclidean_distance, COLOR_DICT
+from clustviz.kernels import cdist_blocks
+from clustviz.utils import plt, COLOR_DICT
 
 NxGraph = nx.Graph
 
@@ -25,23 +25,26 @@ def knn_graph(df: pd.DataFrame, k: int, symmetrical: bool, verbose: bool = False
     g = nx.Graph()
     for i in range(0, len(points)):
         g.add_node(i)
+
+    # second through kth closest of every point, from blocks of rows of the distance matrix
+    closests = np.empty((len(points), min(k, max(len(points) - 1, 0))), dtype=np.int64)
+    distances = np.empty(closests.shape)
+    for start, end, block in cdist_blocks(points, points):
+        closests[start:end] = np.argsort(block, axis=1)[:, 1: k + 1]
+        distances[start:end] = np.take_along_axis(block, closests[start:end], axis=1)
+
     iterpoints = (
         tqdm(enumerate(points), total=len(points)) if verbose else enumerate(points)
     )
     for i, p in iterpoints:
-        distances = list(map(lambda x: euclidean_distance(p, x), points))
-        closests = np.argsort(distances)[1: k + 1]  # second through kth closest
-        for c in closests:
-            if symmetrical is True:
-                distances2 = list(map(lambda x: euclidean_distance(points[c], x), points))
-                closests2 = np.argsort(distances2)[1: k + 1]
-                if i not in closests2:
-                    continue
+        for c, d in zip(closests[i], distances[i]):
+            if symmetrical is True and i not in closests[c]:
+                continue
             g.add_edge(
                 i,
                 c,
-                weight=1.0 / distances[c],
-                similarity=int(1.0 / distances[c] * 1e4),
+                weight=1.0 / d,
+                similarity=int(1.0 / d * 1e4),
             )
         g.nodes[i]["pos"] = p
     g.graph["edge_weight_attr"] = "similarity"
@@ -6,8 +6,7 @@ from typing import Tuple, Union, Dict, Any, Iterable
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from clustviz.utils import COLOR_DICT, annotate_points
+from clustviz.utils import plt, COLOR_DICT, annotate_points, is_headless, report
 
 
 class ClaraClustering:
@@ -48,13 +47,12 @@ class ClaraClustering:
         best_results = {}
 
         for j in range(runs):  # usually 5 times
-            print("\n")
-            print("run number: ", j)
+            report("clara.run", "\n\nrun number: ", j, run=j)
             # take 40+_k*2 random indexes from input data
             sampling_idx = random.sample([i for i in range(size)], 40 + _k * 2)
             # take the corresponding rows from input dataframe _df
             prov_dic = {i: sampling_idx[i] for i in range(40 + _k * 2)}
-            print(prov_dic)
+            report("clara.sample", prov_dic, sample=sampling_idx)
             sampling_data = []
             for idx in sampling_idx:
                 sampling_data.append(_df.iloc[idx])
@@ -66,37 +64,38 @@ class ClaraClustering:
             pre_cost, pre_choice, pre_medoids = self.k_medoids(
                 sampled_df, _k, _fn, niter
             )
-            plot_pam_mod(sampled_df, pre_medoids, _df)
-            print("RESULTS OF K-MEDOIDS")
-            print("pre_cost: ", pre_cost)
-            print("pre_choice: ", pre_choice)
-            print("pre_medoids: ", pre_medoids)
+            if not is_headless():
+                plot_pam_mod(sampled_df, pre_medoids, _df)
+            report("clara.sample_result",
+                   "RESULTS OF K-MEDOIDS\npre_cost:", pre_cost, "\npre_choice:", pre_choice, "\npre_medoids:",
+                   pre_medoids,
+                   cost=pre_cost, choice=pre_choice, medoids=pre_medoids)
 
             # compute average cost and clusters of whole input dataframe
             tmp_avg_cost, tmp_medoids = self.average_cost(_df, _fn, pre_choice)
 
-            print("RESULTS OF WHOLE DATASET EVALUATION")
-            print("tmp_avg_cost: ", tmp_avg_cost)
-            print("tmp_medoids: ", tmp_medoids)
+            report("clara.dataset_result",
+                   "RESULTS OF WHOLE DATASET EVALUATION\ntmp_avg_cost:", tmp_avg_cost, "\ntmp_medoids:", tmp_medoids,
+                   cost=tmp_avg_cost, medoids=tmp_medoids)
             # if the new cost is lower
             if tmp_avg_cost < min_avg_cost:
-                print(
-                    "new_cost is lower, from {0} to {1}".format(
-                        round(min_avg_cost, 4), round(tmp_avg_cost, 4)
-                    )
+                report(
+                    "clara.lower_cost",
+                    "new_cost is lower, from", round(min_avg_cost, 4), "to", round(tmp_avg_cost, 4),
+                    cost=tmp_avg_cost
                 )
                 min_avg_cost = tmp_avg_cost
                 best_choices = list(pre_choice)
                 best_results = dict(tmp_medoids)
 
             elif tmp_avg_cost == min_avg_cost:
-                print("new_cost is equal")
+                report("clara.equal_cost", "new_cost is equal", cost=tmp_avg_cost)
             else:
-                print("new_cost is higher")
+                report("clara.higher_cost", "new_cost is higher", cost=tmp_avg_cost)
 
-        print("\n")
-        print("FINAL RESULT:")
-        plot_pam_mod(_df, best_results, _df)
+        report("clara.result", "\n\nFINAL RESULT:", cost=min_avg_cost, medoids=best_choices)
+        if not is_headless():
+            plot_pam_mod(_df, best_results, _df)
 
         return min_avg_cost, best_choices, best_results
 
@@ -120,11 +119,11 @@ class ClaraClustering:
         """
         # Do some smarter setting of initial cost configuration
         _, medoids_sample = self.cheat_at_sampling(_df, _k, _fn, 17)
-        print("initial medoids sample: ", medoids_sample)
+        report("clara.initial_medoids", "initial medoids sample: ", medoids_sample, medoids=medoids_sample)
         prior_cost, medoids = self.compute_cost(_df, _fn, medoids_sample)
 
         current_cost = prior_cost
-        print("current_cost: ", current_cost)
+        report("clara.cost", "current_cost: ", current_cost, cost=current_cost)
         iter_count = 0
         best_choices = []
         best_results = {}
@@ -157,23 +156,25 @@ class ClaraClustering:
 
             iter_count += 1
             if best_choices == medoids_sample:
-                print("Best configuration found! best_choices: ", best_choices)
+                report("clara.best_configuration", "Best configuration found! best_choices: ", best_choices,
+                       medoids=best_choices)
                 break
 
             if current_cost <= prior_cost:
                 if current_cost < prior_cost:
-                    print(
-                        "Better configuration found! curr_cost:{0}, prior_cost:{1}".format(
-                            round(current_cost, 2), round(prior_cost, 2)
-                        )
+                    report(
+                        "clara.better_configuration",
+                        "Better configuration found! curr_cost:", round(current_cost, 2), "prior_cost:",
+                        round(prior_cost, 2),
+                        cost=current_cost
                     )
                 else:
-                    print("Equal cost")
+                    report("clara.equal_cost", "Equal cost", cost=current_cost)
                 prior_cost = current_cost
                 medoids = best_results
                 medoids_sample = best_choices
 
-            print("new_medoids: ", best_choices)
+            report("clara.iteration", "new_medoids: ", best_choices, iteration=iter_count, medoids=best_choices)
 
         return current_cost, best_choices, best_results
 
@@ -251,7 +252,7 @@ class ClaraClustering:
         """
         # this function tries _nsamp different configurations of initial medoids and chooses the one with the lowest
         # cost
-        print("cheating at sampling")
+        report("clara.cheat_at_sampling", "cheating at sampling")
         score_holder = []
         medoid_holder = []
         for _ in range(_nsamp):  # 17 by default
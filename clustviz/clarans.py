@@ -7,6 +7,7 @@ import graphviz
 import numpy as np
 import pandas as pd
 from clustviz.pam import plot_pam
+from clustviz.utils import is_headless, report
 
 from pyclustering.utils import euclidean_distance_square
 from pyclustering.cluster.clarans import clarans as clarans_pyclustering
@@ -25,11 +26,12 @@ class clarans(clarans_pyclustering):
 
         """
         random.seed()
+        plotting = plotting and not is_headless()
 
         # loop for a numlocal number of times
         for _ in range(0, self.__numlocal):
 
-            print("numlocal: ", _)
+            report("clarans.local_search", "numlocal: ", _, local_search=_)
             # set (current) random medoids
             self.__current = random.sample(
                 range(0, len(self.__pointer_data)), self.__number_clusters
@@ -44,10 +46,10 @@ class clarans(clarans_pyclustering):
             # obtain cost of current cluster configuration and compare it with the best obtained
             estimation = self.__calculate_estimation()
             if estimation < self.__optimal_estimation:
-                print(
-                    "Better configuration found with medoids: {0} and cost: {1}".format(
-                        self.__current[:], estimation
-                    )
+                report(
+                    "clarans.better_configuration",
+                    "Better configuration found with medoids:", self.__current, "and cost:", estimation,
+                    medoids=self.__current[:], cost=estimation
                 )
                 self.__optimal_medoids = self.__current[:]
                 self.__optimal_estimation = estimation
@@ -60,10 +62,10 @@ class clarans(clarans_pyclustering):
                     )
 
             else:
-                print(
-                    "Configuration found does not improve current best one because its cost is {0}".format(
-                        estimation
-                    )
+                report(
+                    "clarans.worse_configuration",
+                    "Configuration found does not improve current best one because its cost is", estimation,
+                    medoids=self.__current[:], cost=estimation
                 )
                 if plotting is True:
                     self.__update_clusters(self.__current[:])
@@ -188,7 +190,7 @@ class clarans(clarans_pyclustering):
 
                 index_neighbor += 1
 
-        print("Medoid set changed {0} times".format(counter))
+        report("clarans.medoid_changes", "Medoid set changed", counter, "times", changes=counter)
 
 
 def compute_cost_clarans(data: pd.DataFrame, _cur_choice: list) -> Tuple[float, Dict[Any, list]]:
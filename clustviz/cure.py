@@ -1,16 +1,22 @@
+import heapq
 import math
-from typing import Optional
+import multiprocessing
+from typing import List, Optional, Tuple
 
 import numpy as np
-import matplotlib.pyplot as plt
 import pandas as pd
+from scipy.spatial import cKDTree
 from clustviz.agglomerative import dist_mat_gen
+from clustviz.kernels import cdist, farthest_points
 from collections import Counter, OrderedDict
 from copy import deepcopy
 import random
 
-from clustviz.utils import dist1, convert_colors, chernoffBounds, flatten_list, cluster_points, \
-    COLOR_DICT, CURE_REPS_COLORS, FONTSIZE_BIGGER, annotate_points, build_initial_matrices, draw_rectangle_or_encircle
+from clustviz.utils import plt, report, is_headless, dist1, convert_colors, chernoffBounds, flatten_list, cluster_points, \
+    COLOR_DICT, CURE_REPS_COLORS, FONTSIZE_BIGGER, annotate_points, build_initial_matrices, draw_rectangle_or_encircle, \
+    ClusterMembership, _effective_n_jobs
+
+CURE_ENGINES = ("matrix", "heap", "kdtree")
 
 
 def point_plot_mod2(
@@ -273,11 +279,7 @@ def dist_clust_cure(rep_u: list, rep_v: list) -> float:
     """
     rep_u = np.array(rep_u)
     rep_v = np.array(rep_v)
-    distances = []
-    for i in rep_u:
-        for j in rep_v:
-            distances.append(dist1(i, j))
-    return np.min(distances)
+    return np.min(cdist(rep_u.reshape(len(rep_u), -1), rep_v.reshape(len(rep_v), -1)))
 
 
 def update_mat_cure(mat: pd.DataFrame, i: int, j: int, rep_new: dict, name: str) -> pd.DataFrame:
@@ -316,6 +318,28 @@ def update_mat_cure(mat: pd.DataFrame, i: int, j: int, rep_new: dict, name: str)
     return mat
 
 
+def shrunk_representatives(points, com: np.ndarray, c: int, alpha: float) -> np.ndarray:
+    """
+    Pick c representatives among the points of a cluster with farthest_points (the first one is the farthest
+    from the centroid, the others the farthest from the already selected representatives) and shrink them
+    toward the centroid; if there are c points or less, all of them are shrunk.
+
+    :param points: points of the cluster, or previously computed representatives.
+    :param com: centroid of the cluster.
+    :param c: number of representatives we want to extract.
+    :param alpha: 0<=float<=1, it determines how much the representative points are moved
+                 toward the centroid: 0 means they aren't modified, 1 means that all points
+                 collapse to the centroid.
+    :return: array of representative points, of shape (min(c, len(points)), d).
+    """
+    points = np.asarray(points, dtype=float)
+
+    if len(points) > c:
+        points = points[farthest_points(points, c, com)]
+
+    return points + alpha * (com - points)
+
+
 def sel_rep(clusters: dict, name: str, c: int, alpha: float) -> list:
     """
     Select c representatives of the clusters: first one is the farthest from the centroid,
@@ -330,60 +354,9 @@ def sel_rep(clusters: dict, name: str, c: int, alpha: float) -> list:
                  collapse to the centroid.
     :return: list of representative points.
     """
-    # if the cluster has c points or less, just take all of them as representatives and shrink them
-    # according to the parameter alpha
-    if len(clusters[name]) <= c:
-
-        others = clusters[name]
-        com = np.mean(clusters[name], axis=0)
-
-        for i in range(len(others)):
-            others[i] = others[i] + alpha * (com - others[i])
-
-        return others
-
-    # if the cluster has more than c points, use the procedure described in the documentation to pick
-    # the representative points
-    else:
-
-        others = []  # the representatives
-        indexes = (
-            []
-        )  # their indexes, to avoid picking one point multiple times
-
-        points = clusters[name]
-        com = np.mean(points, axis=0)
-
-        # compute distances from the centroid
-        distances_com = {i: dist1(p, com) for i, p in enumerate(points)}
-        index = max(distances_com, key=distances_com.get)
-
-        indexes.append(index)
-        others.append(
-            np.array(points[index])
-        )  # first point is the farthest from the centroid
-
-        # selecting the other c-1 points
-        for _ in range(min(c - 1, len(points) - 1)):
-            # here we store the distances of the current point from the alredy selected representatives
-            partial_distances = {str(i): [] for i in range(len(points))}
-            for i, p in enumerate(points):
-                if i not in indexes:
-                    for other in others:
-                        partial_distances[str(i)].append([dist1(p, np.array(other))])
-            partial_distances = dict(
-                (k, [np.sum(v)]) for k, v in partial_distances.items()
-            )
-            index2 = max(partial_distances, key=partial_distances.get)
-            indexes.append(int(index2))
-            # other points are the farthest from the already selected representatives
-            others.append(points[int(index2)])
-
-        # perform the shrinking according to the parameter alpha
-        for i in range(len(others)):
-            others[i] = others[i] + alpha * (com - others[i])
+    com = np.mean(clusters[name], axis=0)
 
-        return others
+    return list(shrunk_representatives(clusters[name], com, c, alpha))
 
 
 def sel_rep_fast(prec_reps: list, clusters: dict, name: str, c: int, alpha: float) -> list:
@@ -402,57 +375,7 @@ def sel_rep_fast(prec_reps: list, clusters: dict, name: str, c: int, alpha: floa
     """
     com = np.mean(clusters[name], axis=0)
 
-    # if the cluster has c points or less, just take all of them as representatives and shrink them
-    # according to the parameter alpha
-    if len(prec_reps) <= c:
-
-        others = prec_reps
-        for i in range(len(others)):
-            others[i] = others[i] + alpha * (com - others[i])
-
-        return others
-
-    # if the cluster has more than c points, use the procedure described in the documentation to pick
-    # the representative points
-    else:
-
-        others = []  # the representatives
-        indexes = (
-            []
-        )  # their indexes, to avoid picking one point multiple times
-
-        points = prec_reps  # use old representatives
-
-        distances_com = {i: dist1(p, com) for i, p in enumerate(points)}
-        index = max(distances_com, key=distances_com.get)
-
-        indexes.append(index)
-        others.append(np.array(points[index]))  # first point
-
-        # selecting the other c-1 points
-        for step in range(min(c - 1, len(points) - 1)):
-            # here we store the distances of the current point from the alredy selected representatives
-            partial_distances = {str(i): [] for i in range(len(points))}
-            for i in range(len(points)):
-                if i not in indexes:
-                    for other in others:
-                        partial_distances[str(i)].append(
-                            [dist1(points[i], np.array(other))]
-                        )
-            partial_distances = dict(
-                (k, [np.sum(v)]) for k, v in partial_distances.items()
-            )
-            index2 = max(partial_distances, key=partial_distances.get)
-            indexes.append(int(index2))
-            others.append(
-                points[int(index2)]
-            )  # other points are the farthest from the already selected representatives
-
-        # perform the shrinking according to the parameter alpha
-        for i in range(len(others)):
-            others[i] = others[i] + alpha * (com - others[i])
-
-        return others
+    return list(shrunk_representatives(prec_reps, com, c, alpha))
 
 
 def form_new_cluster(clusters: dict, u: str, u_cl: str) -> list:
@@ -485,6 +408,358 @@ def form_new_cluster(clusters: dict, u: str, u_cl: str) -> list:
     return new_cluster
 
 
+def _closest(row: np.ndarray, position: np.ndarray) -> int:
+    """Index of the minimum of row; ties are broken by the smallest position, i.e. the oldest cluster."""
+    candidates = np.flatnonzero(row == row.min())
+
+    return int(candidates[np.argmin(position[candidates])])
+
+
+def _cluster_dist(reps: np.ndarray, R: np.ndarray) -> np.ndarray:
+    """
+    Distances of CURE between a cluster and many clusters, as dist_clust_cure.
+
+    :param reps: representatives of the cluster, of shape (c, d).
+    :param R: representatives of the clusters, of shape (m, n_reps, d), padded with np.inf.
+    :return: array of the m distances.
+    """
+    if len(R) == 0:
+        return np.empty(0)
+
+    return cdist(reps, R.reshape(-1, R.shape[2])).reshape(len(reps), len(R), R.shape[1]).min(axis=(0, 2))
+
+
+class RepresentativeIndex:
+    """
+    KD-tree (scipy's cKDTree) over the representatives of the clusters of CURE, answering closest-cluster
+    queries with the representatives of a cluster. The clusters created after the last build of the tree
+    are compared one by one, and the tree is rebuilt on the current representatives when they are more
+    than the square root of the number of clusters.
+
+    :param R: representatives of every cluster, of shape (n, n_reps, d), padded with np.inf; shared with
+              the caller, which calls update after changing the representatives of a cluster.
+    :param count: number of representatives of every cluster.
+    :param active: mask of the current clusters, shared with the caller.
+    """
+
+    def __init__(self, R: np.ndarray, count: np.ndarray, active: np.ndarray):
+        self.R = R
+        self.count = count
+        self.active = active
+        self.build()
+
+    def build(self) -> None:
+        """Build the tree on the representatives of the current clusters."""
+        clusters = np.flatnonzero(self.active)
+        mask = np.arange(self.R.shape[1])[None, :] < self.count[clusters][:, None]
+
+        self.owner = np.repeat(clusters, self.count[clusters])
+        self.tree = cKDTree(self.R[clusters][mask])
+        self.built = self.active.copy()
+
+    def update(self, i: int) -> None:
+        """Take note of the new representatives of cluster i, rebuilding the tree if necessary."""
+        self.built[i] = False
+        n_fresh = np.count_nonzero(self.active & ~self.built)
+
+        if n_fresh > max(16, np.sqrt(np.count_nonzero(self.active))):
+            self.build()
+
+    def _valid(self, owner: np.ndarray, i: int) -> np.ndarray:
+        """Mask of the representatives of the tree belonging to current clusters other than i."""
+        return self.active[owner] & self.built[owner] & (owner != i)
+
+    def _fresh(self, i: int) -> np.ndarray:
+        """Current clusters other than i which are not in the tree."""
+        fresh = np.flatnonzero(self.active & ~self.built)
+
+        return fresh[fresh != i]
+
+    def within(self, i: int, radius: float) -> np.ndarray:
+        """
+        Clusters having a representative within radius from a representative of cluster i, and the
+        clusters which are not in the tree.
+
+        :param i: index of the cluster.
+        :param radius: maximum distance.
+        :return: array of indices of clusters, not including i.
+        """
+        reps = self.R[i, :self.count[i]]
+        near = self.tree.query_ball_point(reps, radius * (1 + 1e-9))
+        owner = np.unique(self.owner[np.concatenate([np.asarray(n, dtype=np.int64) for n in near])])
+
+        return np.concatenate([self._fresh(i), owner[self._valid(owner, i)]])
+
+    def closest(self, i: int, position: np.ndarray) -> Tuple[int, float]:
+        """
+        Closest cluster to cluster i and their distance, computed as dist_clust_cure.
+
+        :param i: index of the cluster.
+        :param position: creation order of the clusters; ties are broken by the oldest cluster.
+        :return: index of the closest cluster and distance, (i, np.inf) if there are no other clusters.
+        """
+        reps = self.R[i, :self.count[i]]
+        best = np.min(_cluster_dist(reps, self.R[self._fresh(i)]), initial=np.inf)
+
+        # nearest representatives of valid clusters, i.e. current, in the tree and different from i
+        n_neighbors = min(self.tree.n, 4 * self.R.shape[1])
+        while True:
+            dist, ind = self.tree.query(reps, k=np.arange(1, n_neighbors + 1))
+            valid = self._valid(self.owner[ind], i)
+            best = np.min(dist[valid], initial=best)
+
+            # a representative without valid neighbors can still have a closer one farther in the tree
+            if n_neighbors == self.tree.n or not np.any(~valid.any(axis=1) & (dist[:, -1] < best)):
+                break
+            n_neighbors = min(2 * n_neighbors, self.tree.n)
+
+        if np.isinf(best):
+            return i, np.inf
+
+        # exact distances of all the clusters at the minimum distance, up to the rounding of the tree
+        candidates = self.within(i, best)
+        dist = _cluster_dist(reps, self.R[candidates])
+        j = _closest(dist, position[candidates])
+
+        return int(candidates[j]), float(dist[j])
+
+
+def heap_merges(points: list, reps: list, k: int, c: int = 3, alpha: float = 0.1,
+                D: Optional[np.ndarray] = None) -> list:
+    """
+    Agglomerate the clusters of CURE with a min-heap of the clusters keyed by the distance from their closest
+    cluster, as in the original paper: after a merge only the clusters whose closest cluster was merged look
+    for a new one, and the others are compared with the new cluster, for a total O(n^2 log n) time. The
+    closest clusters are looked up in the distance matrix D if given, or in a RepresentativeIndex otherwise,
+    storing no distances. The merges, the representatives and the tie-breaking (the oldest cluster first)
+    are the same of the matrix engine of cure.
+
+    :param points: points of every initial cluster, a single point or a list of points as in the clusters
+                   dictionary of cure; updated in place, the merged cluster takes the index of the first
+                   cluster and the second one becomes None.
+    :param reps: list of representatives of every initial cluster; updated in place as points.
+    :param k: desired number of clusters.
+    :param c: number of representatives for each cluster.
+    :param alpha: parameter that regulates the shrinking of representative points toward the centroid.
+    :param D: if not None, square distance matrix of the initial clusters, with np.inf on the diagonal;
+              updated in place.
+    :return: list of (u, v, distance), with u the cluster closest to its closest cluster v.
+    """
+    n = len(points)
+    n_reps = max([c] + [len(r) for r in reps])
+    dim = len(reps[0][0])
+
+    # representatives of every cluster padded with np.inf, whose distance from any point is np.inf
+    R = np.full((n, n_reps, dim), np.inf)
+    count = np.array([len(r) for r in reps])
+    for i, r in enumerate(reps):
+        R[i, :len(r)] = r
+
+    active = np.ones(n, dtype=bool)
+    # creation order of the clusters, the order of the rows of the distance matrix of the matrix engine
+    position = np.arange(n)
+    stamp = np.zeros(n, dtype=np.int64)
+
+    if D is None:
+        index = RepresentativeIndex(R, count, active)
+        closest, closest_dist = map(np.array, zip(*[index.closest(i, position) for i in range(n)]))
+    else:
+        closest = np.argmin(D, axis=1)
+        closest_dist = D[np.arange(n), closest]
+
+    # entries (distance, position, cluster, stamp) are invalidated lazily by the stamp of the cluster
+    heap = [(closest_dist[i], i, i, 0) for i in range(n)]
+    heapq.heapify(heap)
+    merges = []
+
+    while n - len(merges) > k:
+        (distance, _, u, s) = heapq.heappop(heap)
+        if not active[u] or s != stamp[u]:
+            continue
+
+        v = int(closest[u])
+        merges.append((u, v, float(distance)))
+
+        points[u] = form_new_cluster(points, u, v)
+        reps[u] = sel_rep_fast(reps[u] + reps[v], points, u, c, alpha)
+        points[v] = None
+        reps[v] = None
+        active[v] = False
+        position[u] = n + len(merges)
+
+        R[u] = np.inf
+        R[u, :len(reps[u])] = reps[u]
+        R[v] = np.inf
+        count[u] = len(reps[u])
+        count[v] = 0
+
+        # distances of the new cluster: minimum distance between its representatives and the others'
+        if D is None:
+            index.update(u)
+            # a cluster can only become closer to the new cluster than to its closest cluster if one of its
+            # representatives is within the largest distance of a cluster from its closest cluster
+            near = index.within(u, np.max(closest_dist[active]))
+            row = np.full(n, np.inf)
+            row[near] = _cluster_dist(R[u, :count[u]], R[near])
+        else:
+            row = _cluster_dist(R[u, :count[u]], R)
+            row[u] = np.inf
+            D[u] = row
+            D[:, u] = row
+            D[v] = np.inf
+            D[:, v] = np.inf
+
+        # the clusters whose closest cluster was merged look for a new one, the others can only get closer
+        # to the new cluster
+        stale = active & ((closest == u) | (closest == v))
+        nearer = active & ~stale & (row < closest_dist)
+        closest[nearer] = u
+        closest_dist[nearer] = row[nearer]
+
+        for i in np.flatnonzero(stale):
+            if D is None:
+                closest[i], closest_dist[i] = index.closest(i, position)
+            else:
+                closest[i] = _closest(D[i], position)
+                closest_dist[i] = D[i, closest[i]]
+
+        for i in np.flatnonzero(stale | nearer):
+            stamp[i] += 1
+            heapq.heappush(heap, (closest_dist[i], position[i], i, stamp[i]))
+
+    return merges
+
+
+def _leaves(membership: ClusterMembership, root: int) -> List[int]:
+    """Initial clusters of the cluster of root, in the order of the merges: first cluster, then second."""
+    leaves = []
+    stack = [int(membership.node[root])]
+
+    while len(stack) > 0:
+        node = stack.pop()
+        if node < membership.n:
+            leaves.append(node)
+        else:
+            left, right = membership.children[node - membership.n]
+            stack.extend([int(right), int(left)])
+
+    return leaves
+
+
+def _initial_clusters(X: np.ndarray, preprocessed_data=None, partial_index=None) -> tuple:
+    """
+    Initial clusters of cure as lists indexed by cluster: names, points (as in the clusters dictionary),
+    representatives and coordinates of the points (as in the rows of CURE_df, without NaNs), together with
+    the columns and dtypes of CURE_df.
+    """
+    if preprocessed_data is None:
+        names = [str(i) for i in range(len(X))] if partial_index is None else list(partial_index)
+        points = [np.array(p) for p in X] if partial_index is None else list(X)
+        reps = [[p] for p in X]
+
+        columns = [str(i) + xy for i in range(len(X)) for xy in ("x", "y")]
+        rows = [np.asarray(p, dtype=float) for p in X]
+        dtypes = {col: (float if col in ("0x", "0y") else object) for col in columns}
+
+    else:
+        clusters, rep, CURE_df, X_dist = preprocessed_data
+        names = list(X_dist.index)
+        points = [clusters[name] for name in names]
+        reps = [list(rep[name]) for name in names]
+
+        columns = list(CURE_df.columns)
+        values = CURE_df.to_numpy(dtype=float)[CURE_df.index.get_indexer(names)]
+        rows = [row[~np.isnan(row)] for row in values]
+        dtypes = CURE_df.dtypes.to_dict()
+
+    return names, points, reps, rows, columns, dtypes
+
+
+def _cure_results(names: list, merges: list, points: list, reps: list, rows: list, columns: list,
+                  dtypes: dict) -> Tuple[dict, dict, pd.DataFrame]:
+    """
+    Outputs of cure (clusters, representatives and CURE_df) from the merges (u, v) of the initial clusters
+    and from the points and representatives of the clusters as left by heap_merges.
+    """
+    membership = ClusterMembership(len(names), names)
+    for u, v in merges:
+        membership.union(u, v)
+
+    clusters = {}
+    rep = {}
+    values = np.full((len(membership), len(columns)), np.nan)
+
+    for i, root in enumerate(membership.roots()):
+        # the merged clusters are stored at the index of the first cluster of their last merge
+        created = membership.created[root]
+        index = merges[created][0] if created >= 0 else root
+
+        name = membership.name(root)
+        clusters[name] = points[index]
+        rep[name] = reps[index]
+
+        # coordinates of the points, in the order of the merges
+        row = np.concatenate([rows[leaf] for leaf in _leaves(membership, root)])[:len(columns)]
+        values[i, :len(row)] = row
+
+    CURE_df = pd.DataFrame(values, index=list(clusters), columns=columns).astype(dtypes)
+
+    return clusters, rep, CURE_df
+
+
+def _cure_heap(X: np.ndarray, k: int, c: int, alpha: float, preprocessed_data=None, partial_index=None,
+               engine: str = "heap") -> Tuple[dict, dict, pd.DataFrame]:
+    """CURE without plots on the heap or kdtree engine, with the same outputs of cure."""
+    names, points, reps, rows, columns, dtypes = _initial_clusters(X, preprocessed_data, partial_index)
+    D = None
+
+    if engine == "heap" and preprocessed_data is None:
+        D = cdist(X, X)
+        np.fill_diagonal(D, np.inf)
+    elif engine == "heap":
+        D = preprocessed_data[3].values.astype(float)
+
+    merges = heap_merges(points, reps, k, c, alpha, D)
+
+    return _cure_results(names, [(u, v) for u, v, _ in merges], points, reps, rows, columns, dtypes)
+
+
+def _cure_partition(task: Tuple[np.ndarray, int, int, float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Cluster a partition of cure_sample_part with the kdtree engine in a worker process.
+
+    :param task: points of the partition, k, c and alpha.
+    :return: array of the merges (u, v), array of the representatives of the final clusters and array of
+             the index of their cluster.
+    """
+    X, k, c, alpha = task
+    points = list(X)
+    reps = [[p] for p in X]
+
+    merges = heap_merges(points, reps, k, c, alpha)
+    final = [i for i, r in enumerate(reps) if r is not None]
+
+    return (np.array([(u, v) for u, v, _ in merges], dtype=np.int64).reshape(-1, 2),
+            np.concatenate([np.asarray(reps[i], dtype=float) for i in final]),
+            np.repeat(final, [len(reps[i]) for i in final]))
+
+
+def _partition_results(X: np.ndarray, partial_index, merges: np.ndarray, rep_points: np.ndarray,
+                       rep_clusters: np.ndarray) -> Tuple[dict, dict, pd.DataFrame]:
+    """Outputs of cure on a partition of cure_sample_part from the arrays returned by _cure_partition."""
+    names, points, reps, rows, columns, dtypes = _initial_clusters(X, partial_index=partial_index)
+
+    # the points of the clusters are merged again, to keep their order
+    for u, v in merges:
+        points[u] = form_new_cluster(points, u, v)
+        points[v] = None
+
+    for i in np.unique(merges[:, 0]):
+        reps[i] = list(rep_points[rep_clusters == i])
+
+    return _cure_results(names, merges.tolist(), points, reps, rows, columns, dtypes)
+
+
 def cure(
     X: np.ndarray,
     k: int,
@@ -496,10 +771,14 @@ def cure(
     n_rep_finalclust=None,
     not_sampled=None,
     not_sampled_ind=None,
+    engine: Optional[str] = None,
 ):
     """
     CURE algorithm: hierarchical agglomerative clustering using representatives. The parameters which default to
-    None are used for the large dataset variation of CURE.
+    None are used for the large dataset variation of CURE. Without plots, the clusters are merged by the kdtree
+    engine, which looks for the closest clusters in a KD-tree of the representatives, or by the heap engine,
+    which keeps the distance matrix (see heap_merges); both give the same results of the matrix engine, which
+    scans the whole distance matrix at every merge.
 
     :param X: input data array.
     :param k: desired number of clusters.
@@ -511,8 +790,23 @@ def cure(
     :param n_rep_finalclust: the final representative points used to classify the not_sampled points.
     :param not_sampled: points not sampled in the initial phase.
     :param not_sampled_ind: indexes of not_sampled points.
+    :param engine: matrix, heap or kdtree, or None to pick kdtree without plots; plots require the matrix engine.
     :return, rep, a): returns the clusters dictionary, the dictionary of representatives, the matrix a
     """
+    plotting = plotting and not is_headless()
+
+    if engine is None:
+        engine = "matrix" if plotting is True else "kdtree"
+
+    if engine not in CURE_ENGINES:
+        raise ValueError(f'Input engine {engine} is invalid. Possible engines: {", ".join(CURE_ENGINES)}')
+
+    if engine != "matrix":
+        if plotting is True:
+            raise ValueError("Plotting requires the matrix engine.")
+
+        return _cure_heap(X, k, c, alpha, preprocessed_data, partial_index, engine)
+
     # starting from raw data
     if preprocessed_data is None:
         # building a dataframe storing the x and y coordinates of input data points
@@ -679,27 +973,58 @@ def dist_mat_gen_cure(reps: dict) -> pd.DataFrame:
                        between clusters.
     :return: distance matrix as dataframe
     """
-    distance_matrix = pd.DataFrame()
     ind = list(reps.keys())
-    k = 0
-    for i in ind:
-        for j in ind[k:]:
-            if i != j:
+    if len(ind) == 0:
+        return pd.DataFrame()
 
-                a = reps[i]
-                b = reps[j]
+    # representatives of every cluster padded with np.inf, as in heap_merges
+    points = [np.array(r) for r in reps.values()]
+    points = [r.reshape(len(r), -1) for r in points]
+    R = np.full((len(points), max(len(r) for r in points), points[0].shape[1]), np.inf)
+    for i, r in enumerate(points):
+        R[i, :len(r)] = r
 
-                distance_matrix.loc[i, j] = dist_clust_cure(a, b)
-                distance_matrix.loc[j, i] = distance_matrix.loc[i, j]
-            else:
+    distance_matrix = np.array([_cluster_dist(r, R) for r in points])
+    np.fill_diagonal(distance_matrix, np.inf)
 
-                distance_matrix.loc[i, j] = np.inf
+    return pd.DataFrame(distance_matrix, index=ind, columns=ind)
 
-        k += 1
 
-    distance_matrix = distance_matrix.fillna(np.inf)
+def assign_labels(X: np.ndarray, clusters: dict, rep: dict, n_rep: Optional[int] = None,
+                  chunk_size: int = 2 ** 16) -> np.ndarray:
+    """
+    Labels of all the points after cure_sample_part: the sampled points get the label of their cluster, and
+    the others the label of the cluster of their nearest representative, found by querying a KD-tree of the
+    representatives with chunks of points, so that memory is bounded by chunk_size whatever the size of X
+    (e.g. a numpy.memmap).
+
+    :param X: input data array of cure_sample_part.
+    :param clusters: clusters dictionary returned by cure_sample_part, whose names list the indices of the
+                     sampled points.
+    :param rep: dictionary of representatives returned by cure_sample_part.
+    :param n_rep: number of representatives of each cluster used for the assignment, the first ones
+                  selected; by default all of them.
+    :param chunk_size: number of points queried at once.
+    :return: array of the labels, i.e. the positions of the clusters in clusters.
+    """
+    labels = np.full(len(X), -1, dtype=np.int64)
 
-    return distance_matrix
+    for label, name in enumerate(clusters):
+        labels[[int(i) for i in cluster_points(name)]] = label
+
+    reps = [np.asarray(rep[name][:n_rep], dtype=float) for name in clusters]
+    tree = cKDTree(np.concatenate(reps))
+    rep_labels = np.repeat(np.arange(len(reps)), [len(r) for r in reps])
+
+    for start in range(0, len(X), chunk_size):
+        end = min(start + chunk_size, len(X))
+        not_sampled = start + np.flatnonzero(labels[start:end] == -1)
+
+        if len(not_sampled) > 0:
+            _, nearest = tree.query(np.asarray(X[not_sampled], dtype=float))
+            labels[not_sampled] = rep_labels[nearest]
+
+    return labels
 
 
 def cure_sample_part(
@@ -714,12 +1039,15 @@ def cure_sample_part(
     q: Optional[int] = None,
     n_rep_finalclust: Optional[int] = None,
     plotting: bool = True,
+    n_jobs: Optional[int] = None,
+    return_labels: bool = False,
 ):
     """
     CURE algorithm variation for large datasets.
     Partition the sample space into p partitions, each of size len(X)/p, then partially cluster each
     partition until the final number of clusters in each partition reduces to n/(pq). Then run a second
-    clustering pass on the n/q partial clusters for all the partitions.
+    clustering pass on the n/q partial clusters for all the partitions. Finally, the points which have
+    not been sampled can be assigned to the cluster of their nearest representative (see assign_labels).
 
     :param X: input data array.
     :param k: desired number of clusters.
@@ -732,11 +1060,20 @@ def cure_sample_part(
     :param q: the number >1 such that each partition reduces to n/(pq) clusters.
     :param n_rep_finalclust: number of representatives to use in the final assignment phase.
     :param plotting: if True, plots all intermediate steps.
-    :return, rep, mat_a): returns the clusters dictionary, the dictionary of representatives, the matrix a.
+    :param n_jobs: number of worker processes among which the partitions are clustered without plots; -1 means
+                   all the CPUs. By default the partitions are clustered one after another in the calling process.
+                   At most p workers are used, and the p chosen by default is 2: pass a larger p (with q) to use
+                   more workers. The final clustering of the partial clusters is not parallel.
+    :param return_labels: if True, the array of the labels of all the points of X is also returned.
+    :return, rep, mat_a): returns the clusters dictionary, the dictionary of representatives, the matrix a,
+                          and the labels if return_labels is True.
     """
+    plotting = plotting and not is_headless()
     if ((p is None) and (q is not None)) or ((q is None) and (p is not None)):
         raise ValueError("p and q must be both specified if not None.")
 
+    n_jobs = _effective_n_jobs(n_jobs)
+
     # choose the parameters suggested by the paper if the user doesnt provide input parameters
     if u_min is None:
         u_min = round(len(X) / k)
@@ -744,12 +1081,12 @@ def cure_sample_part(
     if n_rep_finalclust is None:
         n_rep_finalclust = c
 
-    _, df_nonan = build_initial_matrices(X)
+    # the coordinates of the points, indexed by their position as string, as in build_initial_matrices
+    df_nonan = pd.DataFrame({"0x": X[:, 0], "0y": X[:, 1]}, index=[str(i) for i in range(len(X))])
 
     # this is done to ensure that the algorithm starts even when input params are bad
     while True:
-        print("new f: ", f)
-        print("new d: ", d)
+        report("cure.sample_parameters", "new f:", f, "\nnew d:", d, f=f, d=d)
         n = math.ceil(chernoffBounds(u_min=u_min, f=f, N=len(X), k=k, d=d))
 
         if n <= len(df_nonan):
@@ -762,9 +1099,7 @@ def cure_sample_part(
             else:
                 d = d * 2
 
-    b_notsampled = df_nonan.loc[
-        [str(i) for i in range(len(df_nonan)) if str(i) not in b_sampled.index], :
-    ]
+    b_notsampled = df_nonan.drop(b_sampled.index)
 
     # find the best p and q according to the paper
     if (p is None) and (q is None):
@@ -778,14 +1113,13 @@ def cure_sample_part(
             for j in range(2, 15):
                 results[(i, j)] = g([i, j])
         p, q = max(results, key=results.get)
-        print("p: ", p)
-        print("q: ", q)
+        report("cure.partitions", "p:", p, "\nq:", q, p=p, q=q)
 
     if (n / (p * q)) < 2 * k:
-        print("n/pq is less than 2k, results could be wrong.")
+        report("cure.warning", "n/pq is less than 2k, results could be wrong.")
 
     if k * d >= 1:
-        print("k*d is greater or equal to 1, results could be wrong.")
+        report("cure.warning", "k*d is greater or equal to 1, results could be wrong.")
 
     # form the partitions
     lin_sp = np.linspace(0, n, p + 1, dtype="int")
@@ -804,17 +1138,31 @@ def cure_sample_part(
     partial_rep = []
     partial_CURE_df = []
 
+    if plotting is False and n_jobs is not None and n_jobs > 1:
+        # the workers send back the merges and the representatives as arrays, from which the outputs of
+        # cure are rebuilt
+        tasks = [(b_partitions[i].values, k_prov, c, alpha) for i in range(p)]
+        with multiprocessing.Pool(min(n_jobs, p)) as pool:
+            partial_results = pool.map(_cure_partition, tasks)
+
+        partial_results = [_partition_results(b_partitions[i].values, b_partitions[i].index, *res)
+                           for i, res in enumerate(partial_results)]
+    else:
+        partial_results = None
+
     for i in range(p):
-        print("\n")
-        print(i)
-        clusters, rep, CURE_df = cure(
-            b_partitions[i].values,
-            k=k_prov,
-            c=c,
-            alpha=alpha,
-            plotting=plotting,
-            partial_index=b_partitions[i].index,
-        )
+        report("cure.partition", "\n\n", i, partition=i)
+        if partial_results is not None:
+            clusters, rep, CURE_df = partial_results[i]
+        else:
+            clusters, rep, CURE_df = cure(
+                b_partitions[i].values,
+                k=k_prov,
+                c=c,
+                alpha=alpha,
+                plotting=plotting,
+                partial_index=b_partitions[i].index,
+            )
         partial_clust.append(clusters)
         partial_rep.append(rep)
         partial_CURE_df.append(CURE_df)
@@ -834,13 +1182,24 @@ def cure_sample_part(
 
     bad_ind = [k for k, v in diz.items() if v != num_freq]
 
-    for ind in bad_ind:
-        partial_CURE_df[ind]["{0}x".format(diz[ind])] = [np.nan] * k_prov
-        partial_CURE_df[ind]["{0}y".format(diz[ind])] = [np.nan] * k_prov
-
-    CURE_df_tot = partial_CURE_df[0].append(partial_CURE_df[1])
-    for i in range(1, len(partial_CURE_df) - 1):
-        CURE_df_tot = CURE_df_tot.append(partial_CURE_df[i + 1])
+    # the partitions of unusual size are padded with an empty point, then the rows are stacked on the
+    # union of the columns, in order of appearance: a column is of object dtype if it is so in a partition
+    dtypes = {}
+    for i, df in enumerate(partial_CURE_df):
+        pad = ["{0}{1}".format(diz[i], xy) for xy in ("x", "y")] if i in bad_ind else []
+        for col, dtype in list(df.dtypes.items()) + [(col, np.dtype(float)) for col in pad]:
+            if dtypes.get(col) != np.dtype(object):
+                dtypes[col] = dtype
+
+    columns = pd.Index(list(dtypes))
+    values = np.full((sum(len(df) for df in partial_CURE_df), len(columns)), np.nan)
+    start = 0
+    for df in partial_CURE_df:
+        values[start: start + len(df), columns.get_indexer(df.columns)] = df.to_numpy(dtype=float)
+        start += len(df)
+
+    index = [name for df in partial_CURE_df for name in df.index]
+    CURE_df_tot = pd.DataFrame(values, index=index, columns=columns).astype(dtypes)
 
     # mat Xdist
     X_dist_tot = dist_mat_gen_cure(rep_tot)
@@ -860,6 +1219,9 @@ def cure_sample_part(
         not_sampled_ind=b_notsampled.index,
     )
 
+    if return_labels is True:
+        return clusters, rep, CURE_df, assign_labels(X, clusters, rep, n_rep_finalclust)
+
     return clusters, rep, CURE_df
 
 
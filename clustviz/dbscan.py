@@ -1,11 +1,16 @@
-from typing import Dict, Optional
+import itertools
+import os
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from collections import OrderedDict
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from collections import OrderedDict, deque
 import random
-from clustviz.utils import dist1, DBSCAN_COLOR_DICT, annotate_points
+from clustviz.utils import plt, is_headless, dist1, DBSCAN_COLOR_DICT, annotate_points
+from clustviz.neighbors import NeighborIndex, RadiusGraph, MemmapGridIndex, build_neighbor_index, radius_graph
 
 
 def scan_neigh1_mod(data: Dict[str, np.ndarray], point: np.ndarray, eps: float) -> Dict[str, np.ndarray]:
@@ -30,6 +35,24 @@ def scan_neigh1_mod(data: Dict[str, np.ndarray], point: np.ndarray, eps: float)
     return neigh
 
 
+def scan_neigh_index(data: Dict[str, np.ndarray], point: str, index: Optional[NeighborIndex],
+                     eps: float) -> Dict[str, np.ndarray]:
+    """
+    Neighborhood search for a point of a given dataset-dictionary (data), using the neighborhood index
+    if provided, otherwise falling back to scan_neigh1_mod; the output is the same as scan_neigh1_mod.
+
+    :param data: input dataset.
+    :param point: key of the point whose neighborhood is to be examined.
+    :param index: neighborhood index built on the input dataset, or None.
+    :param eps: radius of search.
+    :return: neighborhood points.
+    """
+    if index is None:
+        return scan_neigh1_mod(data, data[point], eps)
+
+    return {str(i): data[str(i)] for i in index.query(data[point])}
+
+
 def point_plot_mod(X: np.ndarray, X_dict: Dict[str, np.ndarray], point, eps: float, ClustDict: dict) -> None:
     """
     Plots a scatter plot of points, where the point (x,y) is light black and
@@ -176,21 +199,158 @@ def plot_clust_DB(X: np.ndarray, ClustDict: Dict[str, int], eps: float, circle_c
     plt.show()
 
 
-def DBSCAN(data: np.ndarray, eps: float, minPTS: int, plotting: bool = False,
-           print_details: bool = False) -> Dict[str, int]:
+def expand_clusters(n: int, minPTS: int, neighborhood: Callable[[int], np.ndarray]) -> np.ndarray:
+    """
+    Array version of the cluster expansion of DBSCAN: points are tracked through int32 index arrays,
+    a boolean visited mask and a deque frontier, so that every point is visited and enqueued at most
+    once per cluster. Points are labelled exactly as DBSCAN does.
+
+    :param n: number of points.
+    :param minPTS: minimum number of neighbors for a point to be considered a core point.
+    :param neighborhood: function returning the indices of the eps-neighborhood of a point (itself included).
+    :return: array of cluster labels, -1 denoting noise.
+    """
+    labels = np.full(n, -1, dtype=np.int32)
+    visited = np.zeros(n, dtype=bool)
+    # id of the last cluster whose frontier a point has been put into
+    enqueued = np.full(n, -1, dtype=np.int32)
+
+    clust_id = -1
+
+    for point in range(n):
+
+        if visited[point]:
+            continue
+
+        visited[point] = True
+        N = neighborhood(point)
+
+        # noise, unless it is reached later by a cluster
+        if len(N) < minPTS:
+            continue
+
+        clust_id += 1
+        labels[point] = clust_id
+        enqueued[N] = clust_id
+        enqueued[point] = clust_id
+
+        frontier = deque(N[N != point].astype(np.int32).tolist())
+
+        while len(frontier) > 0:
+
+            q = frontier.popleft()
+
+            if not visited[q]:
+                visited[q] = True
+                N_2 = neighborhood(q)
+
+                # if it is a core point, add its new neighbors to the frontier
+                if len(N_2) >= minPTS:
+                    new = N_2[enqueued[N_2] != clust_id]
+                    enqueued[new] = clust_id
+                    frontier.extend(new.astype(np.int32).tolist())
+
+            # noise points and unlabelled points join the current cluster
+            if labels[q] == -1:
+                labels[q] = clust_id
+
+    return labels
+
+
+def dbscan_labels(data: Union[np.ndarray, RadiusGraph], eps: float, minPTS: int,
+                  neighbor_index: str = "kdtree", n_jobs: Optional[int] = None,
+                  timings: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Array-native DBSCAN: same clusters as DBSCAN, returned as an array of labels.
+
+    :param data: input array, or precomputed radius graph (see clustviz.neighbors.radius_graph) built with
+                 a radius >= eps.
+    :param eps: radius of a point within which to search for minPTS points.
+    :param minPTS: minimum number of neighbors for a point to be considered a core point.
+    :param neighbor_index: kind of neighborhood index; can be brute, grid, kdtree or balltree.
+    :param n_jobs: if not None, the neighborhoods are precomputed as a radius graph by n_jobs worker
+                   processes (-1 means all the CPUs), and the clusters are expanded on it.
+    :param timings: if a dictionary is given, the time in seconds of the neighbors phase and of the
+                    expansion phase is stored in it, under the keys neighbors and expansion.
+    :return: array of cluster labels, -1 denoting noise.
+    """
+    start = time.perf_counter()
+
+    if isinstance(data, RadiusGraph):
+        data.check_eps(eps)
+        graph = data
+
+    elif n_jobs is not None:
+        graph = radius_graph(data, eps, neighbor_index=neighbor_index, n_jobs=n_jobs)
+
+    else:
+        X = np.asarray(data, dtype=float)
+        index = build_neighbor_index(X, eps, method=neighbor_index)
+        neighbors_time = time.perf_counter() - start
+
+        labels = expand_clusters(len(X), minPTS, lambda i: index.query(X[i]))
+
+        if timings is not None:
+            # the neighborhoods are searched during the expansion, the neighbors phase only builds the index
+            timings.update(neighbors=neighbors_time, expansion=time.perf_counter() - start - neighbors_time)
+
+        return labels
+
+    neighbors_time = time.perf_counter() - start
+
+    if n_jobs is not None:
+        # the whole adjacency is available: expand the clusters as connected components
+        within = graph.distances <= eps
+        rows = np.repeat(np.arange(len(graph)), np.diff(graph.indptr))[within]
+        labels = component_labels(len(graph), rows, graph.indices[within], graph.degrees(eps) >= minPTS)
+    else:
+        labels = expand_clusters(len(graph), minPTS, lambda i: graph.neighbors(i, eps))
+
+    if timings is not None:
+        timings.update(neighbors=neighbors_time, expansion=time.perf_counter() - start - neighbors_time)
+
+    return labels
+
+
+def labels_to_dict(labels: np.ndarray) -> Dict[str, int]:
+    """Convert an array of cluster labels to the dictionary of the form point_index:cluster_label of DBSCAN."""
+    return {str(i): int(label) for i, label in enumerate(labels)}
+
+
+def DBSCAN(data: Union[np.ndarray, RadiusGraph], eps: float, minPTS: int, plotting: bool = False,
+           print_details: bool = False, neighbor_index: Optional[str] = None,
+           engine: str = "dict") -> Dict[str, int]:
     """
     DBSCAN algorithm.
 
-    :param data: input array.
+    :param data: input array, or precomputed radius graph (see clustviz.neighbors.radius_graph) built with
+                 a radius >= eps, which is always processed by the array engine.
     :param eps: radius of a point within which to search for minPTS points.
     :param minPTS: minimum number of neighbors for a point to be considered a core point.
     :param plotting: if True, executes point_plot_mod, plotting every time a points is
                      added to a clusters.
     :param print_details: if True, prints the length of the "external" NearestNeighborhood
                           and of the "internal" one (in the while loop).
+    :param neighbor_index: if not None, the kind of neighborhood index (brute, grid, kdtree or balltree)
+                           built once and queried for every eps-neighborhood; if None, every neighborhood
+                           is found scanning the whole dataset with scan_neigh1_mod (or using the kdtree
+                           index, with the array engine).
+    :param engine: "dict" runs the step-by-step version, which supports plotting and printing; "array"
+                   runs dbscan_labels and converts its labels with labels_to_dict, and is the one to use
+                   for large inputs.
     :return: dictionary of the form point_index:cluster_label.
 
     """
+    plotting, print_details = (False, False) if is_headless() else (plotting, print_details)
+    if engine == "array" or isinstance(data, RadiusGraph):
+        if plotting is True:
+            raise ValueError("Plotting is only available with the dict engine and raw coordinates.")
+
+        return labels_to_dict(dbscan_labels(data, eps, minPTS, neighbor_index=neighbor_index or "kdtree"))
+
+    elif engine != "dict":
+        raise ValueError(f'Input engine {engine} is invalid. Possible engines: "dict", "array"')
+
     # initialize dictionary of clusters
     ClustDict = {}
 
@@ -198,7 +358,12 @@ def DBSCAN(data: np.ndarray, eps: float, minPTS: int, plotting: bool = False,
 
     X = dict(zip([str(i) for i in range(len(data))], data))
 
-    processed = []
+    if neighbor_index is not None:
+        index = build_neighbor_index(np.asarray(data), eps, method=neighbor_index)
+    else:
+        index = None
+
+    processed = set()
 
     # for every point in the dataset
     for point in X:
@@ -206,9 +371,9 @@ def DBSCAN(data: np.ndarray, eps: float, minPTS: int, plotting: bool = False,
         # if it hasnt been visited
         if point not in processed:
             # mark it as visited
-            processed.append(point)
+            processed.add(point)
             # scan its neighborhood
-            N = scan_neigh1_mod(X, X[point], eps)
+            N = scan_neigh_index(X, point, index, eps)
 
             if print_details is True:
                 print("len(N): ", len(N))
@@ -229,7 +394,7 @@ def DBSCAN(data: np.ndarray, eps: float, minPTS: int, plotting: bool = False,
                 if plotting is True:
                     point_plot_mod(data, X, point, eps, ClustDict)
                 # add it to the temporary processed list
-                processed_list = [point]
+                processed_list = {point}
                 # remove it from the neighborhood N
                 del N[point]
                 # until the neighborhood is empty
@@ -243,15 +408,15 @@ def DBSCAN(data: np.ndarray, eps: float, minPTS: int, plotting: bool = False,
                     while n in processed_list:
                         n = random.choice(list(N.keys()))
                     # put it in processed_list
-                    processed_list.append(n)
+                    processed_list.add(n)
                     # remove it from the neighborhood
                     del N[n]
                     # if it hasnt been visited
                     if n not in processed:
                         # mark it as visited
-                        processed.append(n)
+                        processed.add(n)
                         # scan its neighborhood
-                        N_2 = scan_neigh1_mod(X, X[n], eps)
+                        N_2 = scan_neigh_index(X, n, index, eps)
 
                         if print_details is True:
                             print("len N2: ", len(N_2))
@@ -272,3 +437,525 @@ def DBSCAN(data: np.ndarray, eps: float, minPTS: int, plotting: bool = False,
                         point_plot_mod(data, X, n, eps, ClustDict)
 
     return ClustDict
+
+
+def component_labels(n: int, rows: np.ndarray, cols: np.ndarray, core: np.ndarray) -> np.ndarray:
+    """
+    Derive the DBSCAN labels from the edges (rows[k], cols[k]) of the eps-neighborhood graph and from the
+    core mask: clusters are the connected components of the core points, numbered in order of their
+    smallest core point, and every border point joins the cluster with the lowest label among the ones
+    of its core neighbors, exactly as in DBSCAN.
+
+    :param n: number of points.
+    :param rows: first end of each edge.
+    :param cols: second end of each edge.
+    :param core: boolean mask of the core points.
+    :return: array of cluster labels, -1 denoting noise.
+    """
+    labels = np.full(n, -1, dtype=np.int32)
+    core_idx = np.flatnonzero(core)
+
+    if len(core_idx) == 0:
+        return labels
+
+    core_edges = core[rows] & core[cols]
+    adjacency = csr_matrix(
+        (np.ones(core_edges.sum(), dtype=np.int8), (rows[core_edges], cols[core_edges])), shape=(n, n)
+    )
+    _, comp = connected_components(adjacency, directed=False)
+
+    # number the components of the core points according to their smallest core point
+    first = np.full(comp.max() + 1, n, dtype=np.int64)
+    np.minimum.at(first, comp[core_idx], core_idx)
+    core_comps = np.flatnonzero(first < n)
+    rank = np.full(len(first), -1, dtype=np.int32)
+    rank[core_comps[np.argsort(first[core_comps], kind="stable")]] = np.arange(len(core_comps))
+
+    labels[core_idx] = rank[comp[core_idx]]
+
+    # border points
+    border_edges = ~core[rows] & core[cols]
+    border = np.full(n, np.iinfo(np.int32).max, dtype=np.int32)
+    np.minimum.at(border, rows[border_edges], labels[cols[border_edges]])
+    reached = border < np.iinfo(np.int32).max
+    labels[reached] = border[reached]
+
+    return labels
+
+
+def dbscan_sweep(data: Union[np.ndarray, RadiusGraph], eps_values: Iterable[float], minpts_values: Iterable[int],
+                 neighbor_index: str = "kdtree", n_jobs: Optional[int] = None
+                 ) -> Tuple[Dict[Tuple[float, int], np.ndarray], pd.DataFrame]:
+    """
+    Run DBSCAN on the whole grid of eps and minPTS values at once: the neighborhood distances are computed
+    a single time, with the largest eps, and every labelling is derived from them.
+
+    :param data: input array, or precomputed radius graph built with a radius >= max(eps_values).
+    :param eps_values: values of eps to try.
+    :param minpts_values: values of minPTS to try.
+    :param neighbor_index: kind of neighborhood index used to build the radius graph.
+    :param n_jobs: number of worker processes among which the radius graph construction is split.
+    :return: dictionary of the form (eps, minPTS):array of cluster labels, and dataframe with the number
+             of core points, the fraction of noise points and the number of clusters of every setting.
+    """
+    eps_values = list(eps_values)
+    minpts_values = list(minpts_values)
+
+    if len(eps_values) == 0:
+        raise ValueError("eps_values must contain at least one value")
+
+    if len(minpts_values) == 0:
+        raise ValueError("minpts_values must contain at least one value")
+
+    if isinstance(data, RadiusGraph):
+        graph = data
+        graph.check_eps(max(eps_values))
+    else:
+        graph = radius_graph(np.asarray(data, dtype=float), max(eps_values), neighbor_index=neighbor_index,
+                             n_jobs=n_jobs)
+
+    n = len(graph)
+    all_rows = np.repeat(np.arange(n), np.diff(graph.indptr))
+
+    results = {}
+    summary = []
+
+    for eps in eps_values:
+        within = graph.distances <= eps
+        rows, cols = all_rows[within], graph.indices[within]
+        counts = np.bincount(rows, minlength=n)
+
+        for minPTS in minpts_values:
+            labels = component_labels(n, rows, cols, counts >= minPTS)
+            results[(eps, minPTS)] = labels
+            summary.append(
+                dict(
+                    eps=eps,
+                    minPTS=minPTS,
+                    n_core=int((counts >= minPTS).sum()),
+                    noise_fraction=float((labels == -1).mean()) if n > 0 else 0.0,
+                    n_clusters=int(labels.max()) + 1 if n > 0 else 0,
+                )
+            )
+
+    return results, pd.DataFrame(summary)
+
+
+# number of edges between core points collected before joining them, in dbscan_memmap
+BATCH_EDGES = 2**22
+
+
+def _flatten(parent: np.ndarray) -> None:
+    """Flatten the union-find forest in place by pointer doubling, so that every point points to its root."""
+    while True:
+        up = parent[parent]
+        if np.array_equal(up, parent):
+            break
+        parent[:] = up
+
+
+def _union(parent: np.ndarray, a: np.ndarray, b: np.ndarray) -> None:
+    """
+    Vectorized union of union-find: join the sets of a[i] and b[i] for every i, smaller roots win. The
+    forest is kept flat, pointer doubling after every hook, so that parent[x] is always the root of x.
+    """
+    while True:
+        ra, rb = parent[a], parent[b]
+        diff = ra != rb
+        if not diff.any():
+            break
+        a, b = a[diff], b[diff]
+        np.minimum.at(parent, np.maximum(ra[diff], rb[diff]), np.minimum(ra[diff], rb[diff]))
+        _flatten(parent)
+
+
+def dbscan_memmap(data: Union[np.ndarray, str, os.PathLike, MemmapGridIndex], eps: float, minPTS: int,
+                  tile_size: int = 1_000_000, cache_cells: int = 4096,
+                  out: Optional[Union[str, os.PathLike]] = None) -> np.ndarray:
+    """
+    Out-of-core DBSCAN, for inputs that do not fit in memory: the points are read from a numpy.memmap
+    (or a .npy file) through a MemmapGridIndex, that keeps in memory only the coordinates of the active
+    cells. Three sweeps over the cells count the neighbors, join the core points within eps from each
+    other with a union-find structure, and assign the border points; the labels are the same as
+    dbscan_labels. Besides the index, it takes about 16 bytes per point.
+
+    :param data: input array, numpy.memmap, path to a .npy file, or MemmapGridIndex built with eps.
+    :param eps: radius of a point within which to search for minPTS points.
+    :param minPTS: minimum number of neighbors for a point to be considered a core point.
+    :param tile_size: number of points read at once when building the index.
+    :param cache_cells: maximum number of cells whose coordinates are kept in memory.
+    :param out: if not None, path of the .npy file where the labels are written as a memory-mapped array.
+    :return: array of cluster labels, -1 denoting noise.
+    """
+    if isinstance(data, MemmapGridIndex):
+        index = data
+        if index.eps != eps:
+            raise ValueError(f"eps: {eps} must be equal to the eps of the index: {index.eps}")
+    else:
+        index = MemmapGridIndex(data, eps, tile_size=tile_size, cache_cells=cache_cells)
+
+    n = len(index)
+
+    if out is not None:
+        labels = np.lib.format.open_memmap(out, mode="w+", dtype=np.int32, shape=(n,))
+        labels[:] = -1
+    else:
+        labels = np.full(n, -1, dtype=np.int32)
+
+    # first sweep: number of points in the eps-neighborhood of each point
+    core = np.zeros(n, dtype=bool)
+    for c in range(index.n_cells):
+        ids, _, blocks = index.cell_distances(c)
+        for rows, D in blocks:
+            core[ids[rows]] = (D <= eps).sum(axis=1) >= minPTS
+
+    # second sweep: join the core points within eps from each other, flushing the edges in batches; the
+    # union-find forest stays flat
+    parent = np.arange(n)
+    edges_a, edges_b, n_edges = [], [], 0
+    for c in range(index.n_cells):
+        ids, cand_ids, blocks = index.cell_distances(c)
+
+        if not core[ids].any():
+            continue
+
+        cand_core = core[cand_ids]
+        for rows, D in blocks:
+            r, col = np.nonzero((D <= eps) & core[ids[rows]][:, None] & cand_core[None, :])
+            a, b = ids[rows[r]], cand_ids[col]
+            edges_a.append(a[a < b])
+            edges_b.append(b[a < b])
+            n_edges += len(edges_a[-1])
+
+        if n_edges >= BATCH_EDGES:
+            _union(parent, np.concatenate(edges_a), np.concatenate(edges_b))
+            edges_a, edges_b, n_edges = [], [], 0
+
+    if n_edges > 0:
+        _union(parent, np.concatenate(edges_a), np.concatenate(edges_b))
+
+    # number the clusters in order of their smallest core point
+    core_idx = np.flatnonzero(core)
+    roots = parent[core_idx]
+    _, first, inverse = np.unique(roots, return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int32)
+    rank[np.argsort(first, kind="stable")] = np.arange(len(first))
+    labels[core_idx] = rank[inverse.ravel()]
+    del parent
+
+    # third sweep: border points join the cluster with the lowest label among their core neighbors
+    big = np.iinfo(np.int32).max
+    for c in range(index.n_cells):
+        ids, cand_ids, blocks = index.cell_distances(c)
+
+        if core[ids].all():
+            continue
+
+        cand_labels = np.where(core[cand_ids], labels[cand_ids], big)
+        for rows, D in blocks:
+            best = np.where(D <= eps, cand_labels[None, :], big).min(axis=1)
+            border = ~core[ids[rows]] & (best < big)
+            labels[ids[rows][border]] = best[border]
+
+    return labels
+
+
+class IncrementalDBSCAN:
+    """
+    DBSCAN on a changing set of points: points are inserted and deleted in batches, and only the
+    neighborhoods of the affected points are updated. The points are kept in a uniform grid of cells of
+    side eps, every point stores the size of its eps-neighborhood (itself included), and the core points
+    are grouped in clusters: an insertion can only merge the clusters of the new core points, a deletion
+    can only split the clusters of the removed or demoted core points, which are relabelled with a local
+    breadth-first search. The labels are the same as dbscan_labels on the current points, in id order.
+    Ids are never reused, while the points are stored in slots in id order: when more than half of the
+    slots belong to deleted points, the arrays are compacted, so that the memory follows the number of
+    current points on a sliding window.
+
+    :param eps: radius of a point within which to search for minPTS points.
+    :param minPTS: minimum number of neighbors for a point to be considered a core point.
+    """
+
+    def __init__(self, eps: float, minPTS: int):
+        self.eps = eps
+        self.minPTS = minPTS
+
+        # slots are indexed in order of ids, self._id maps a slot to the id of its point
+        self._X = np.empty((0, 0))
+        self._offsets = np.empty((0, 0), dtype=np.int64)
+        self._id = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._counts = np.zeros(0, dtype=np.int64)
+        # cluster of each core point, -1 for the other points
+        self._comp = np.zeros(0, dtype=np.int64)
+        self._members: Dict[int, set] = {}
+        self._grid: Dict[tuple, set] = {}
+        self._n_ids = 0
+        self._n_slots = 0
+        self._next_comp = 0
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Sorted ids of the current points."""
+        return self._id[np.flatnonzero(self._alive[: self._n_slots])]
+
+    def _cell(self, point: np.ndarray) -> tuple:
+        return tuple(np.floor(point / self.eps).astype(np.int64).tolist())
+
+    def _neighbors(self, i: int) -> np.ndarray:
+        """Slots of the current points within eps from the point in slot i, itself included."""
+        point = self._X[i]
+        cell = np.array(self._cell(point))
+        candidates = [c for offset in self._offsets for c in self._grid.get(tuple((cell + offset).tolist()), ())]
+        candidates = np.array(candidates, dtype=np.int64)
+        d = np.sqrt(np.sum((self._X[candidates] - point) ** 2, axis=1))
+
+        return candidates[d <= self.eps]
+
+    def _is_core(self, i: Union[int, np.ndarray]) -> Union[bool, np.ndarray]:
+        return self._alive[i] & (self._counts[i] >= self.minPTS)
+
+    def _grow(self, size: int, dim: int) -> None:
+        """Make room for size slots, doubling the capacity of the arrays."""
+        if self._X.shape[1] != dim:
+            if self._n_ids > 0:
+                raise ValueError(f"points of dimension {dim} cannot be added to points of dimension "
+                                 f"{self._X.shape[1]}")
+            self._X = np.empty((0, dim))
+            self._offsets = np.array(list(itertools.product([-1, 0, 1], repeat=dim)))
+
+        capacity = len(self._X)
+        if size <= capacity:
+            return
+
+        capacity = max(size, 2 * capacity)
+        X = np.empty((capacity, dim))
+        X[: len(self._X)] = self._X
+        self._X = X
+        self._id = np.concatenate([self._id, np.zeros(capacity - len(self._id), dtype=np.int64)])
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+        self._counts = np.concatenate([self._counts, np.zeros(capacity - len(self._counts), dtype=np.int64)])
+        self._comp = np.concatenate([self._comp, np.full(capacity - len(self._comp), -1, dtype=np.int64)])
+
+    def _compact(self) -> None:
+        """Drop the slots of the deleted points, keeping the current points in order of ids."""
+        keep = np.flatnonzero(self._alive[: self._n_slots])
+        self._n_slots = len(keep)
+
+        self._X = self._X[keep]
+        self._id = self._id[keep]
+        self._alive = self._alive[keep]
+        self._counts = self._counts[keep]
+        self._comp = self._comp[keep]
+
+        self._grid = {}
+        for i in range(self._n_slots):
+            self._grid.setdefault(self._cell(self._X[i]), set()).add(i)
+
+        self._members = {}
+        for i in np.flatnonzero(self._comp >= 0).tolist():
+            self._members.setdefault(int(self._comp[i]), set()).add(i)
+
+    def _set_comp(self, points: Iterable[int], comp: int) -> None:
+        points = list(points)
+        self._comp[points] = comp
+        self._members.setdefault(comp, set()).update(points)
+
+    def insert(self, points: np.ndarray) -> np.ndarray:
+        """
+        Insert a batch of points.
+
+        :param points: array of points to insert.
+        :return: ids assigned to the points.
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        ids = np.arange(self._n_ids, self._n_ids + len(points))
+
+        if len(points) == 0:
+            return ids
+
+        self._grow(self._n_slots + len(points), points.shape[1])
+        new = np.arange(self._n_slots, self._n_slots + len(points))
+        self._X[new] = points
+        self._id[new] = ids
+        self._alive[new] = True
+        self._n_ids += len(points)
+        self._n_slots += len(points)
+
+        for i in new.tolist():
+            self._grid.setdefault(self._cell(self._X[i]), set()).add(i)
+
+        # only the old neighbors of the new points can change their core status
+        old = []
+        for i in new.tolist():
+            N = self._neighbors(i)
+            self._counts[i] = len(N)
+            old.append(N[N < new[0]])
+        touched = np.unique(np.concatenate(old))
+        was_core = self._is_core(touched)
+
+        # update the neighbor counts: every new point is counted once by each of its neighbors
+        for N in old:
+            self._counts[N] += 1
+
+        # the new core points join, and possibly merge, the clusters of their core neighbors
+        promoted = np.union1d(touched[self._is_core(touched) & ~was_core], new[self._is_core(new)])
+        for q in promoted.tolist():
+            N = self._neighbors(q)
+            comps = set(self._comp[N[self._is_core(N) & (self._comp[N] >= 0)]].tolist())
+
+            if len(comps) == 0:
+                self._set_comp([q], self._next_comp)
+                self._next_comp += 1
+                continue
+
+            # merge the smaller clusters into the largest one
+            target = max(comps, key=lambda c: len(self._members[c]))
+            for c in comps - {target}:
+                self._set_comp(self._members.pop(c), target)
+            self._set_comp([q], target)
+
+        return ids
+
+    def delete(self, ids: Iterable[int]) -> None:
+        """
+        Delete a batch of points.
+
+        :param ids: ids of the points to delete.
+        """
+        ids = np.unique(np.asarray(list(ids), dtype=np.int64))
+
+        # ids are sorted along the slots
+        slots = np.searchsorted(self._id[: self._n_slots], ids)
+        found = slots < self._n_slots
+        found[found] = (self._id[slots[found]] == ids[found]) & self._alive[slots[found]]
+        if not found.all():
+            raise ValueError(f"ids: {ids[~found].tolist()} are not among the current points")
+
+        if len(slots) == 0:
+            return
+
+        # only the neighbors of the deleted points can change their core status
+        neighbors = [self._neighbors(i) for i in slots.tolist()]
+        touched = np.unique(np.concatenate(neighbors))
+        was_core = self._is_core(touched)
+
+        # every remaining neighbor of a deleted point loses one neighbor
+        for N in neighbors:
+            self._counts[N] -= 1
+
+        for i in slots.tolist():
+            cell = self._cell(self._X[i])
+            self._grid[cell].discard(i)
+            if len(self._grid[cell]) == 0:
+                del self._grid[cell]
+
+        self._alive[slots] = False
+        self._counts[slots] = 0
+
+        # clusters that lost core points may split: the remaining core neighbors of the lost ones are the
+        # only points where a cluster can break apart
+        lost = touched[was_core & ~self._is_core(touched)]
+        seeds: Dict[int, set] = {}
+        for i in lost.tolist():
+            c = int(self._comp[i])
+            self._members[c].discard(i)
+            N = self._neighbors(i)
+            seeds.setdefault(c, set()).update(N[self._is_core(N)].tolist())
+        self._comp[lost] = -1
+
+        for c, comp_seeds in seeds.items():
+            self._split(c, comp_seeds)
+
+        if 2 * len(self) < self._n_slots:
+            self._compact()
+
+    def _split(self, comp: int, seeds: Iterable[int]) -> None:
+        """
+        Relabel a cluster that lost some core points. A breadth-first search of the core points starts from
+        every seed, one step at a time for each search, and searches meeting each other are joined: the
+        points of a search that ends before meeting the others form a new cluster, while the last search
+        left keeps the cluster id, without visiting the rest of the cluster.
+        """
+        members = self._members[comp]
+
+        if len(members) == 0:
+            del self._members[comp]
+            return
+
+        seeds = [q for q in seeds if q in members]
+        owner = {q: g for g, q in enumerate(seeds)}
+        parent = list(range(len(seeds)))
+        fronts = {g: deque([q]) for g, q in enumerate(seeds)}
+        nodes = {g: [q] for g, q in enumerate(seeds)}
+
+        def find(g: int) -> int:
+            while parent[g] != g:
+                parent[g] = parent[parent[g]]
+                g = parent[g]
+            return g
+
+        while len(fronts) > 1:
+
+            for g in list(fronts):
+
+                if g not in fronts or len(fronts) == 1:
+                    continue
+
+                # the search ended without meeting the others: its points form a new cluster
+                if len(fronts[g]) == 0:
+                    members.difference_update(nodes[g])
+                    self._set_comp(nodes.pop(g), self._next_comp)
+                    self._next_comp += 1
+                    del fronts[g]
+                    continue
+
+                q = fronts[g].popleft()
+                N = self._neighbors(q)
+
+                for r in N[self._is_core(N)].tolist():
+                    if r not in owner:
+                        owner[r] = g
+                        nodes[g].append(r)
+                        fronts[g].append(r)
+                        continue
+
+                    h = find(owner[r])
+                    if h != g:
+                        # the searches met: join them
+                        parent[h] = g
+                        fronts[g].extend(fronts.pop(h))
+                        nodes[g].extend(nodes.pop(h))
+
+    def labels(self) -> np.ndarray:
+        """
+        Cluster labels of the current points, in the order of ids: clusters are numbered in order of their
+        smallest core point, and every border point joins the cluster with the lowest label among the ones
+        of its core neighbors, as in dbscan_labels.
+
+        :return: array of cluster labels, -1 denoting noise.
+        """
+        ids = np.flatnonzero(self._alive[: self._n_slots])
+        labels = np.full(self._n_slots, -1, dtype=np.int32)
+        core = self._is_core(np.arange(self._n_slots))
+        core_idx = np.flatnonzero(core)
+
+        if len(core_idx) == 0:
+            return labels[ids]
+
+        # number the clusters according to their smallest core point
+        comps, first = np.unique(self._comp[core_idx], return_index=True)
+        rank = np.empty(len(comps), dtype=np.int32)
+        rank[np.argsort(core_idx[first], kind="stable")] = np.arange(len(comps))
+        labels[core_idx] = rank[np.searchsorted(comps, self._comp[core_idx])]
+
+        for i in ids[~core[ids]].tolist():
+            N = self._neighbors(i)
+            N = N[core[N]]
+            if len(N) > 0:
+                labels[i] = labels[N].min()
+
+        return labels[ids]
@@ -2,16 +2,13 @@ from typing import Tuple, Dict, Union, List, Optional
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
 from math import ceil
-# hidden import for 3d plot, dont delete it
-from mpl_toolkits import mplot3d
 from tqdm.auto import tqdm
 from itertools import groupby
 from collections import OrderedDict, Counter
 
-from clustviz.utils import euclidean_distance, flatten_list, COLOR_DICT, FONTSIZE_NORMAL, SIZE_NORMAL, annotate_points
+from clustviz.kernels import one_to_many
+from clustviz.utils import plt, report, is_headless, euclidean_distance, flatten_list, COLOR_DICT, FONTSIZE_NORMAL, SIZE_NORMAL, annotate_points
 
 CubeInfo = Dict[str, Union[int, List[float], List[list]]]
 """
@@ -32,21 +29,36 @@ For example
 ``{ (0, 0): (-0.05, -0.05, 1.95, 1.95), (1, 0): (1.95, -0.05, 3.95, 1.95), ... }``.
 """
 
+GAUSSIAN_METRICS = ("euclidean", "sqeuclidean", "manhattan")
+"""
+Distances accepted by the Gaussian influence function: the ones of clustviz.kernels that are metrics, or
+their square.
+"""
+
 
 def gaussian_influence(x: np.ndarray, y: np.ndarray, s: float, dist: str = "euclidean") -> float:
     """
     Return the value of the Gaussian influence function in ``(x,y)`` with standard deviation ``s``.
 
     :param x: first point.
-    :param y: second point.
+    :param y: second point, or array of points.
     :param s: standard deviation of the Gaussian.
-    :param dist: distance to use in the Gaussian.
-    :return: value for the Gaussian in ``(x,y)`` with standard deviation ``s``.
+    :param dist: distance to use in the Gaussian, one of GAUSSIAN_METRICS; sqeuclidean is the same as
+                 euclidean, as the Gaussian takes the squared distance.
+    :return: value for the Gaussian in ``(x,y)`` with standard deviation ``s``; an array of values if ``y``
+             is an array of points.
     """
-    if dist == "euclidean":
-        return np.exp(
-            -(np.power(euclidean_distance(x, y), 2) / (2 * (s ** 2)))
-        )
+    if dist not in GAUSSIAN_METRICS:
+        raise ValueError(f'Input dist {dist} is invalid. Possible distances: {", ".join(GAUSSIAN_METRICS)}')
+
+    if dist in ("euclidean", "sqeuclidean"):
+        squared = one_to_many(x, y, "sqeuclidean")
+    else:
+        squared = one_to_many(x, y, dist) ** 2
+
+    influence = np.exp(-(squared / (2 * (s ** 2))))
+
+    return influence[0] if np.ndim(y) == 1 else influence
 
 
 def gaussian_density(x: np.ndarray, D: np.ndarray, s: float, dist: str = "euclidean") -> float:
@@ -60,11 +72,9 @@ def gaussian_density(x: np.ndarray, D: np.ndarray, s: float, dist: str = "euclid
     :return: Gaussian density at point ``x`` with respect to dataset ``D``, using a Gaussian function with
              distance dist and standard deviation ``s``.
     """
-    res = 0
-    for point in D:
-        res += gaussian_influence(x, point, s, dist)
+    D = np.asarray(D, dtype=float).reshape(-1, len(x))
 
-    return res
+    return np.sum(gaussian_influence(x, D, s, dist))
 
 
 def gradient_gaussian_density(x: np.ndarray, D: np.ndarray, s: float, dist: str = "euclidean") -> np.ndarray:
@@ -78,12 +88,9 @@ def gradient_gaussian_density(x: np.ndarray, D: np.ndarray, s: float, dist: str
     :return: gradient of the Gaussian density at point ``x`` with respect to dataset ``D``, using a Gaussian function with
              distance ``dist`` and standard deviation ``s``.
     """
-    res = np.zeros(2)
-    for point in D:
-        res += gaussian_influence(x, point, s, dist) * (
-                np.array(point) - np.array(x)
-        )
-    return res
+    D = np.asarray(D, dtype=float).reshape(-1, len(x))
+
+    return gaussian_influence(x, D, s, dist) @ (D - np.asarray(x, dtype=float))
 
 
 def square_wave_influence(x: np.ndarray, y: np.ndarray, s: float, dist: str = "euclidean") -> int:
@@ -223,7 +230,7 @@ def plot_min_bound_rect(data: np.ndarray) -> tuple:
 
     # minimal bounding rectangle
     ax.add_patch(
-        Rectangle(
+        plt.Rectangle(
             (x0, y0),
             rect_diff[0] + 0.1,
             rect_diff[1] + 0.1,
@@ -343,7 +350,7 @@ def plot_grid_rect(data: np.ndarray, s: float, cube_kind: str = "populated") ->
     for key in list(new_clusts.keys()):
         (a, b, c, d) = ckc[key]
         ax.add_patch(
-            Rectangle(
+            plt.Rectangle(
                 (a, b),
                 2 * s,
                 2 * s,
@@ -366,7 +373,7 @@ def plot_grid_rect(data: np.ndarray, s: float, cube_kind: str = "populated") ->
             color_or_not = False
 
         ax.add_patch(
-            Rectangle(
+            plt.Rectangle(
                 (a, b),
                 2 * s,
                 2 * s,
@@ -392,10 +399,10 @@ def check_border_points_rectangles(data: np.ndarray, populated_cubes: Cubes) ->
         count += v["num_points"]
 
     if count == len(data):
-        print("No points lie on the borders of rectangles")
+        report("denclue.border_points", "No points lie on the borders of rectangles", border_points=0)
     else:
         diff = len(data) - count
-        print("{0} point(s) lie(s) on the border of rectangles".format(diff))
+        report("denclue.border_points", diff, "point(s) lie(s) on the border of rectangles", border_points=diff)
 
 
 def highly_pop_cubes(pop_cub: Cubes, xi_c: float) -> Cubes:
@@ -538,6 +545,9 @@ def plot_3d_or_contour(data: np.ndarray, s: float, three: bool = False, scatter:
                     of the countour plot.
     :param prec: precision used to compute density function.
     """
+    # hidden import for 3d plot, dont delete it
+    from mpl_toolkits import mplot3d
+
     _, ax = plt.subplots(figsize=(14, 6))
 
     x_data = [data[:, 0].min(), data[:, 0].max()]
@@ -589,7 +599,7 @@ def assign_cluster(data: np.ndarray, others: np.ndarray, attractor: Optional[Tup
     :return: dictionary of clusters, i.e. points with their density attractor, and list of processed points.
     """
     if others is None or attractor is None:
-        print("None")
+        report("denclue.no_attractor", "None")
 
         return clust_dict, processed
 
@@ -683,6 +693,8 @@ def plot_3d_both(data: np.ndarray, s: float, xi: Optional[float] = None, prec: i
     :param prec: precision used to compute density function.
     """
     from matplotlib import cm
+    # hidden import for 3d plot, dont delete it
+    from mpl_toolkits import mplot3d
 
     fig = plt.figure(figsize=(16, 10))
     ax = fig.add_subplot(111, projection="3d")
@@ -835,7 +847,7 @@ def density_attractor(data: np.ndarray, x: np.ndarray, coord_dict: CubesCoords,
 
             return res, np.array(other_points)
 
-    print(f"Max iteration number {max_iter} reached!")
+    report("denclue.max_iter", "Max iteration number", max_iter, "reached!", max_iter=max_iter)
     return None, None
 
 
@@ -952,14 +964,15 @@ def DENCLUE(data: np.ndarray, s: float, xi: float = 3, xi_c: float = 3, tol: flo
     :param plotting: if ``True``, show plots.
     :return: list of cluster labels.
     """
+    plotting = plotting and not is_headless()
     clust_dict = {}
     processed = []
 
     z, d = pop_cubes(data=data, s=s)
-    print("Number of populated cubes: ", len(z))
+    report("denclue.populated_cubes", "Number of populated cubes: ", len(z), cubes=len(z))
     check_border_points_rectangles(data, z)
     hpc = highly_pop_cubes(z, xi_c=xi_c)
-    print("Number of highly populated cubes: ", len(hpc))
+    report("denclue.highly_populated_cubes", "Number of highly populated cubes: ", len(hpc), cubes=len(hpc))
     connected_cubes = find_connected_cubes(hpc, z, s=s)
     new_cubes = {**hpc, **connected_cubes}
 
@@ -984,7 +997,7 @@ def DENCLUE(data: np.ndarray, s: float, xi: float = 3, xi_c: float = 3, tol: flo
         if len((np.nonzero(points_to_process == elem))[0]) == 0:
             initial_noise.append(elem)
 
-    for point in tqdm(points_to_process):
+    for point in tqdm(points_to_process, disable=is_headless()):
         delta = 0.02
         r, o = None, None
 
@@ -1003,11 +1016,12 @@ def DENCLUE(data: np.ndarray, s: float, xi: float = 3, xi_c: float = 3, tol: flo
     try:
         coord_df = extract_cluster_labels(data, clust_dict, tol)
     except Exception as e:
-        print(
+        report(
+            "denclue.extraction_error",
             "There was an error when extracting clusters. Increase the number of points or try with a less"
-            " pathological case: look at the other plots to have an idea of why it failed."
+            " pathological case: look at the other plots to have an idea of why it failed.\n", e,
+            error=e
         )
-        print(e)
 
     if plotting is True:
         plot_clust_dict(data, coord_df)
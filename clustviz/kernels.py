@@ -0,0 +1,156 @@
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+# maximum number of distances computed at once in the vectorized blocks
+BLOCK_SIZE = 2 ** 20
+
+METRICS = ("euclidean", "sqeuclidean", "manhattan", "cosine")
+
+
+def _check_metric(metric: str):
+    if metric not in METRICS:
+        raise ValueError(f'Input metric {metric} is invalid. Possible metrics: {", ".join(METRICS)}')
+
+
+def _as_points(X, dtype: type) -> np.ndarray:
+    """Convert a point, a list of points or a dataframe to a 2-dimensional array of the given dtype."""
+    X = np.asarray(X, dtype=dtype)
+
+    return X.reshape(1, -1) if X.ndim == 1 else X
+
+
+def _block_dist(A: np.ndarray, B: np.ndarray, metric: str) -> np.ndarray:
+    """Distances between every row of A and every row of B."""
+    if metric == "cosine":
+        norms = np.sqrt(np.sum(A ** 2, axis=1))[:, None] * np.sqrt(np.sum(B ** 2, axis=1))[None, :]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return 1 - (A @ B.T) / norms
+
+    diff = A[:, None, :] - B[None, :, :]
+
+    if metric == "manhattan":
+        return np.sum(np.abs(diff), axis=2)
+
+    squared = np.sum(diff ** 2, axis=2)
+
+    return squared if metric == "sqeuclidean" else np.sqrt(squared)
+
+
+def cdist_blocks(XA, XB, metric: str = "euclidean", dtype: type = np.float64,
+                 block_size: int = BLOCK_SIZE) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    Distances between the rows of XA and the rows of XB, computed in blocks of consecutive rows of XA,
+    so that no more than block_size distances are held in memory at once.
+
+    :param XA: first array of points, of shape (n_a, d).
+    :param XB: second array of points, of shape (n_b, d).
+    :param metric: euclidean, sqeuclidean, manhattan or cosine.
+    :param dtype: dtype of the computation, e.g. np.float32 to halve memory and bandwidth.
+    :param block_size: maximum number of distances of a block.
+    :return: generator of (start, end, block), where block holds the distances of the rows
+             start, ..., end - 1 of XA from all the rows of XB.
+    """
+    _check_metric(metric)
+    XA = _as_points(XA, dtype)
+    XB = _as_points(XB, dtype)
+    step = max(1, block_size // max(len(XB), 1))
+
+    for start in range(0, len(XA), step):
+        end = min(start + step, len(XA))
+        yield start, end, _block_dist(XA[start:end], XB, metric)
+
+
+def cdist(XA, XB, metric: str = "euclidean", dtype: type = np.float64, block_size: int = BLOCK_SIZE,
+          out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Many-to-many distances between the rows of XA and the rows of XB, as scipy.spatial.distance.cdist;
+    the euclidean distances are bitwise identical to the scalar dist1 of clustviz.utils.
+
+    :param XA: first array of points, of shape (n_a, d).
+    :param XB: second array of points, of shape (n_b, d).
+    :param metric: euclidean, sqeuclidean, manhattan or cosine.
+    :param dtype: dtype of the computation and of the output.
+    :param block_size: maximum number of distances computed at once.
+    :param out: if not None, array of shape (n_a, n_b) where the distances are written.
+    :return: array of distances of shape (n_a, n_b).
+    """
+    if out is None:
+        out = np.empty((len(_as_points(XA, dtype)), len(_as_points(XB, dtype))), dtype=dtype)
+
+    for start, end, block in cdist_blocks(XA, XB, metric, dtype, block_size):
+        out[start:end] = block
+
+    return out
+
+
+def one_to_many(x, XB, metric: str = "euclidean", dtype: type = np.float64,
+                block_size: int = BLOCK_SIZE) -> np.ndarray:
+    """
+    One-to-many distances between the point x and the rows of XB.
+
+    :param x: point, of shape (d,).
+    :param XB: array of points, of shape (n_b, d).
+    :param metric: euclidean, sqeuclidean, manhattan or cosine.
+    :param dtype: dtype of the computation and of the output.
+    :param block_size: maximum number of distances computed at once.
+    :return: array of distances of shape (n_b,).
+    """
+    return cdist(x, XB, metric, dtype, block_size)[0]
+
+
+def min_dist(XA, XB, metric: str = "euclidean", dtype: type = np.float64, block_size: int = BLOCK_SIZE) -> float:
+    """
+    Minimum distance between a row of XA and a row of XB, without materializing all the distances.
+
+    :param XA: first array of points, of shape (n_a, d).
+    :param XB: second array of points, of shape (n_b, d).
+    :param metric: euclidean, sqeuclidean, manhattan or cosine.
+    :param dtype: dtype of the computation.
+    :param block_size: maximum number of distances computed at once.
+    :return: minimum distance, np.inf if XA or XB is empty.
+    """
+    best = np.inf
+
+    for _, _, block in cdist_blocks(XA, XB, metric, dtype, block_size):
+        if block.size > 0:
+            best = min(best, float(np.nanmin(block)))
+
+    return best
+
+
+def farthest_points(X, n_points: int, origin, criterion: str = "sum", metric: str = "euclidean") -> np.ndarray:
+    """
+    Farthest point sampling: the first point is the farthest from origin, and every next one is the farthest
+    from the points already picked, by the sum (as the representatives of CURE) or by the minimum of the
+    distances from them. The distances from the picked points are kept in a running array, updated with
+    one vectorized operation per pick; ties are broken by the first index.
+
+    :param X: array of points, of shape (n, d).
+    :param n_points: number of points to pick, at most n.
+    :param origin: point from which the first pick is the farthest, e.g. the centroid.
+    :param criterion: sum or min.
+    :param metric: euclidean, sqeuclidean, manhattan or cosine.
+    :return: array of the indices of the picked points, in order of picking.
+    """
+    if criterion not in ("sum", "min"):
+        raise ValueError(f'Input criterion {criterion} is invalid. Possible criteria: sum, min')
+
+    X = _as_points(X, np.float64)
+    picked = np.empty(min(n_points, len(X)), dtype=np.int64)
+    if len(picked) == 0:
+        return picked
+
+    is_picked = np.zeros(len(X), dtype=bool)
+    running = np.zeros(len(X)) if criterion == "sum" else np.full(len(X), np.inf)
+    picked[0] = np.argmax(one_to_many(origin, X, metric))
+
+    for step in range(1, len(picked)):
+        is_picked[picked[step - 1]] = True
+        dist = one_to_many(X[picked[step - 1]], X, metric)
+        running = running + dist if criterion == "sum" else np.minimum(running, dist)
+
+        # the points already picked score zero
+        picked[step] = np.argmax(np.where(is_picked, 0, running))
+
+    return picked
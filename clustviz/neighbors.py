@@ -0,0 +1,555 @@
+import itertools
+import multiprocessing
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple, Type, Union
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from clustviz.kernels import BLOCK_SIZE
+from clustviz.utils import _effective_n_jobs
+
+
+def _point_distances(candidates: np.ndarray, point: np.ndarray) -> np.ndarray:
+    """Euclidean distances of the candidates from a single point, computed exactly as dist1."""
+    return np.sqrt(np.sum((candidates - point) ** 2, axis=1))
+
+
+def _filter_candidates(X: np.ndarray, points: np.ndarray, eps: float, candidates: Iterable,
+                       return_distance: bool) -> list:
+    """Keep, for every query point, the candidates (indices of X) lying within eps from it, sorted by index."""
+    result = []
+
+    for point, cand in zip(points, candidates):
+        cand = np.sort(np.asarray(cand, dtype=np.int64))
+        d = _point_distances(X[cand], point)
+        mask = d <= eps
+        result.append((cand[mask], d[mask]) if return_distance is True else cand[mask])
+
+    return result
+
+
+class NeighborIndex:
+    """
+    Base class of the eps-neighborhood indexes: the index is built once on the input array and is
+    then queried for every neighborhood, returning the (sorted) indices of the points lying within
+    eps from the query point, the query point itself included.
+
+    :param X: input array.
+    :param eps: radius of search.
+    """
+
+    def __init__(self, X: np.ndarray, eps: float):
+        self.X = np.asarray(X, dtype=float)
+        self.eps = eps
+
+    def _candidates(self, point: np.ndarray) -> np.ndarray:
+        """Indices of the points that may lie within eps from the point; subclasses narrow them down."""
+        return np.arange(len(self.X))
+
+    def query(self, point: np.ndarray, return_distance: bool = False
+              ) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Neighborhood search for a point with a fixed eps.
+
+        :param point: point whose neighborhood is to be examined.
+        :param return_distance: if True, the distances of the neighbors are returned as well.
+        :return: sorted indices of the neighborhood points (and their distances).
+        """
+        candidates = np.sort(self._candidates(np.asarray(point)))
+        d = _point_distances(self.X[candidates], point)
+        mask = d <= self.eps
+
+        if return_distance is True:
+            return candidates[mask], d[mask]
+
+        return candidates[mask]
+
+    def query_all(self, return_distance: bool = False, rows: Optional[np.ndarray] = None) -> list:
+        """
+        Neighborhood search for every point of the input array, or for a subset of them.
+
+        :param return_distance: if True, the distances of the neighbors are returned as well.
+        :param rows: indices of the points to query, by default all of them.
+        :return: list with the output of query for every point, in the order of rows.
+        """
+        rows = np.arange(len(self.X)) if rows is None else np.asarray(rows, dtype=np.int64)
+
+        return [self.query(self.X[i], return_distance) for i in rows]
+
+
+class BruteForceIndex(NeighborIndex):
+    """Index that scans the whole input array for every query, like scan_neigh1_mod."""
+
+
+class GridIndex(NeighborIndex):
+    """
+    Uniform grid of cubic cells of side eps: the neighbors of a point can only lie in the cell of the
+    point or in the 3^d cells surrounding it. The number of cells probed grows exponentially with the
+    dimension, so the grid only pays off on low-dimensional data (d <= 3).
+    """
+
+    def __init__(self, X: np.ndarray, eps: float):
+        if eps <= 0:
+            raise ValueError(f"eps: {eps} must be positive")
+
+        super().__init__(X, eps)
+
+        self.cells = np.floor(self.X / eps).astype(np.int64)
+        self.offsets = np.array(list(itertools.product([-1, 0, 1], repeat=self.X.shape[1])))
+
+        # group the point indices by cell
+        keys, inverse = np.unique(self.cells, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.cumsum(np.bincount(inverse, minlength=len(keys)))[:-1]
+
+        self.grid: Dict[tuple, np.ndarray] = {
+            tuple(key): idx for key, idx in zip(keys.tolist(), np.split(order, bounds))
+        }
+
+    def _adjacent(self, cell: np.ndarray) -> np.ndarray:
+        """Indices of the points lying in the cell or in the cells surrounding it."""
+        found = [self.grid.get(tuple(c)) for c in (cell + self.offsets).tolist()]
+        found = [f for f in found if f is not None]
+
+        if len(found) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        return np.concatenate(found)
+
+    def _candidates(self, point: np.ndarray) -> np.ndarray:
+        return self._adjacent(np.floor(point / self.eps).astype(np.int64))
+
+    def query_all(self, return_distance: bool = False, rows: Optional[np.ndarray] = None) -> list:
+        # process one cell at a time, so that the candidates are gathered once for all of its points
+        rows = np.arange(len(self.X)) if rows is None else np.asarray(rows, dtype=np.int64)
+        result: List = [None] * len(rows)
+
+        if len(rows) == 0:
+            return result
+
+        keys, inverse = np.unique(self.cells[rows], axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.cumsum(np.bincount(inverse, minlength=len(keys)))[:-1]
+
+        for cell, pos in zip(keys, np.split(order, bounds)):
+            candidates = np.sort(self._adjacent(cell))
+            C = self.X[candidates]
+            # bound the size of the block of distances computed at once
+            step = max(1, BLOCK_SIZE // len(C))
+
+            for start in range(0, len(pos), step):
+                block = pos[start: start + step]
+                D = np.sqrt(np.sum((self.X[rows[block]][:, None, :] - C[None, :, :]) ** 2, axis=2))
+
+                for d, j in zip(D, block):
+                    mask = d <= self.eps
+                    result[j] = (candidates[mask], d[mask]) if return_distance is True else candidates[mask]
+
+        return result
+
+
+class KDTreeIndex(NeighborIndex):
+    """Index backed by scipy's cKDTree."""
+
+    def __init__(self, X: np.ndarray, eps: float):
+        super().__init__(X, eps)
+        self.tree = cKDTree(self.X)
+
+    def _candidates(self, point: np.ndarray) -> np.ndarray:
+        # the radius is slightly enlarged, the exact check against eps is performed by query
+        return np.asarray(self.tree.query_ball_point(point, self.eps * (1 + 1e-9)), dtype=np.int64)
+
+    def query_all(self, return_distance: bool = False, rows: Optional[np.ndarray] = None) -> list:
+        points = self.X if rows is None else self.X[np.asarray(rows, dtype=np.int64)]
+
+        return _filter_candidates(self.X, points, self.eps,
+                                  self.tree.query_ball_point(points, self.eps * (1 + 1e-9)), return_distance)
+
+
+class BallTreeIndex(NeighborIndex):
+    """Index backed by scikit-learn's BallTree."""
+
+    def __init__(self, X: np.ndarray, eps: float, leaf_size: int = 40):
+        from sklearn.neighbors import BallTree
+
+        super().__init__(X, eps)
+        self.tree = BallTree(self.X, leaf_size=leaf_size)
+
+    def _candidates(self, point: np.ndarray) -> np.ndarray:
+        return self.tree.query_radius(point.reshape(1, -1), r=self.eps * (1 + 1e-9))[0].astype(np.int64)
+
+    def query_all(self, return_distance: bool = False, rows: Optional[np.ndarray] = None) -> list:
+        points = self.X if rows is None else self.X[np.asarray(rows, dtype=np.int64)]
+
+        return _filter_candidates(self.X, points, self.eps,
+                                  self.tree.query_radius(points, r=self.eps * (1 + 1e-9)), return_distance)
+
+
+NEIGHBOR_INDEXES: Dict[str, Type[NeighborIndex]] = {
+    "brute": BruteForceIndex,
+    "grid": GridIndex,
+    "kdtree": KDTreeIndex,
+    "balltree": BallTreeIndex,
+}
+
+
+def build_neighbor_index(X: np.ndarray, eps: float, method: Optional[str] = "kdtree") -> NeighborIndex:
+    """
+    Build the eps-neighborhood index of the input array.
+
+    :param X: input array.
+    :param eps: radius of search.
+    :param method: kind of index; can be brute, grid, kdtree or balltree.
+    :return: neighborhood index.
+    """
+    if method not in NEIGHBOR_INDEXES:
+        raise ValueError(f'Input neighbor index {method} is invalid. '
+                         f'Possible neighbor indexes: {", ".join(NEIGHBOR_INDEXES)}')
+
+    return NEIGHBOR_INDEXES[method](X, eps)
+
+
+class RadiusGraph:
+    """
+    Sparse eps-neighborhood graph in CSR form: the neighbors of point i (itself included) are
+    indices[indptr[i]:indptr[i + 1]], sorted by index, at distances distances[indptr[i]:indptr[i + 1]].
+    The graph is built once with radius_graph, can be saved and loaded, and can be queried
+    with any radius not greater than the one it has been built with.
+
+    :param indptr: row pointers, of length n + 1.
+    :param indices: column indices of the neighbors.
+    :param distances: distances of the neighbors.
+    :param eps: radius used to build the graph.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, distances: np.ndarray, eps: float):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.distances = np.asarray(distances, dtype=float)
+        self.eps = float(eps)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def check_eps(self, eps: float) -> None:
+        """Raise an error if the graph cannot answer queries of radius eps."""
+        if eps > self.eps:
+            raise ValueError(f"eps: {eps} must be less than or equal to the eps of the graph: {self.eps}")
+
+    def neighbors(self, i: int, eps: Optional[float] = None, return_distance: bool = False
+                  ) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Neighborhood of a point.
+
+        :param i: index of the point.
+        :param eps: radius of search, by default the eps of the graph.
+        :param return_distance: if True, the distances of the neighbors are returned as well.
+        :return: sorted indices of the neighborhood points (and their distances).
+        """
+        start, end = self.indptr[i], self.indptr[i + 1]
+        idx = self.indices[start:end]
+        d = self.distances[start:end]
+
+        if eps is not None and eps < self.eps:
+            mask = d <= eps
+            idx, d = idx[mask], d[mask]
+
+        if return_distance is True:
+            return idx, d
+
+        return idx
+
+    def degrees(self, eps: Optional[float] = None) -> np.ndarray:
+        """Number of points in the eps-neighborhood of each point, itself included."""
+        if eps is None or eps >= self.eps:
+            return np.diff(self.indptr)
+
+        within = np.concatenate([[0], np.cumsum(self.distances <= eps)])
+
+        return within[self.indptr[1:]] - within[self.indptr[:-1]]
+
+    def to_csr(self):
+        """Return the graph as a scipy.sparse.csr_matrix of distances; zero distances are kept as explicit entries."""
+        from scipy.sparse import csr_matrix
+
+        return csr_matrix((self.distances, self.indices, self.indptr), shape=(len(self), len(self)))
+
+    def save(self, path: str) -> None:
+        """Save the graph to a .npz file."""
+        np.savez(path, indptr=self.indptr, indices=self.indices, distances=self.distances, eps=self.eps)
+
+    @classmethod
+    def load(cls, path: str) -> "RadiusGraph":
+        """Load a graph saved with save."""
+        with np.load(path) as f:
+            return cls(f["indptr"], f["indices"], f["distances"], f["eps"])
+
+
+def _neighborhoods_to_graph(neighborhoods: list, eps: float) -> RadiusGraph:
+    """Build the radius graph from the output of query_all with return_distance=True, for every point."""
+    indptr = np.zeros(len(neighborhoods) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(idx) for idx, _ in neighborhoods])
+
+    if len(neighborhoods) == 0:
+        return RadiusGraph(indptr, np.empty(0), np.empty(0), eps)
+
+    indices = np.concatenate([idx for idx, _ in neighborhoods])
+    distances = np.concatenate([d for _, d in neighborhoods])
+
+    return RadiusGraph(indptr, indices, distances, eps)
+
+
+# state of the worker processes of radius_graph: shared memory blocks, input array, query order and index
+_WORKER: Dict[str, object] = {}
+
+
+def _init_worker(x_name: str, shape: Tuple[int, ...], order_name: str, eps: float, neighbor_index: str) -> None:
+    """Attach a worker process to the shared input array and query order, and build its index once."""
+    from multiprocessing import shared_memory
+
+    x_shm = shared_memory.SharedMemory(name=x_name)
+    order_shm = shared_memory.SharedMemory(name=order_name)
+    X = np.ndarray(shape, dtype=float, buffer=x_shm.buf)
+
+    _WORKER.update(
+        x_shm=x_shm,
+        order_shm=order_shm,
+        order=np.ndarray(shape[:1], dtype=np.int64, buffer=order_shm.buf),
+        index=build_neighbor_index(X, eps, method=neighbor_index),
+    )
+
+
+def _query_chunk(bounds: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Neighborhoods of the points order[start:end], as neighbor counts, indices and distances."""
+    start, end = bounds
+    neighborhoods = _WORKER["index"].query_all(return_distance=True, rows=_WORKER["order"][start:end])
+
+    counts = np.array([len(idx) for idx, _ in neighborhoods], dtype=np.int64)
+    indices = np.concatenate([idx for idx, _ in neighborhoods] + [np.empty(0, dtype=np.int64)])
+    distances = np.concatenate([d for _, d in neighborhoods] + [np.empty(0)])
+
+    return counts, indices.astype(np.int32), distances
+
+
+def _radius_graph_parallel(X: np.ndarray, eps: float, neighbor_index: str, n_jobs: int,
+                           chunks_per_job: int = 4) -> RadiusGraph:
+    """
+    Parallel radius_graph: the input array and the query order are placed in shared memory, every worker
+    builds its own index on them, and the tasks only carry the bounds of a range of the query order.
+    Points are queried in grid order, so that every range covers a compact region of the space.
+    """
+    # shared_memory requires python 3.8, only the parallel construction depends on it
+    from multiprocessing import shared_memory
+
+    n = len(X)
+    order = np.lexsort(np.floor(X / eps).T[::-1]).astype(np.int64)
+
+    x_shm = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+    order_shm = shared_memory.SharedMemory(create=True, size=max(order.nbytes, 1))
+
+    try:
+        np.ndarray(X.shape, dtype=float, buffer=x_shm.buf)[:] = X
+        np.ndarray(order.shape, dtype=np.int64, buffer=order_shm.buf)[:] = order
+
+        bounds = np.linspace(0, n, n_jobs * chunks_per_job + 1).astype(np.int64)
+        tasks = [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+        with multiprocessing.Pool(n_jobs, initializer=_init_worker,
+                                  initargs=(x_shm.name, X.shape, order_shm.name, eps, neighbor_index)) as pool:
+            chunks = pool.map(_query_chunk, tasks)
+
+    finally:
+        x_shm.close()
+        x_shm.unlink()
+        order_shm.close()
+        order_shm.unlink()
+
+    # the neighborhoods come in query order: sort them back by point, keeping each of them sorted by index
+    counts = np.concatenate([c for c, _, _ in chunks])
+    indices = np.concatenate([i for _, i, _ in chunks])
+    distances = np.concatenate([d for _, _, d in chunks])
+    perm = np.argsort(np.repeat(order, counts), kind="stable")
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(order, weights=counts, minlength=n).astype(np.int64))
+
+    return RadiusGraph(indptr, indices[perm], distances[perm], eps)
+
+
+def radius_graph(X: np.ndarray, eps: float, neighbor_index: str = "kdtree", n_jobs: Optional[int] = None
+                 ) -> RadiusGraph:
+    """
+    Build the eps-neighborhood graph of the input array, shared by DBSCAN and OPTICS.
+
+    :param X: input array.
+    :param eps: radius of search; the graph can be queried with any radius <= eps.
+    :param neighbor_index: kind of neighborhood index used to build the graph.
+    :param n_jobs: number of worker processes among which the neighborhood queries are split; -1 means
+                   all the CPUs (requires python >= 3.8). By default the queries are performed in the calling
+                   process.
+    :return: radius graph.
+    """
+    X = np.asarray(X, dtype=float)
+
+    n_jobs = _effective_n_jobs(n_jobs)
+
+    if n_jobs is None or n_jobs == 1 or len(X) == 0:
+        neighborhoods = build_neighbor_index(X, eps, method=neighbor_index).query_all(return_distance=True)
+        return _neighborhoods_to_graph(neighborhoods, eps)
+
+    if neighbor_index not in NEIGHBOR_INDEXES:
+        raise ValueError(f'Input neighbor index {neighbor_index} is invalid. '
+                         f'Possible neighbor indexes: {", ".join(NEIGHBOR_INDEXES)}')
+
+    return _radius_graph_parallel(X, eps, neighbor_index, n_jobs)
+
+
+class MemmapGridIndex:
+    """
+    Out-of-core version of GridIndex, for inputs that do not fit in memory: the points are read from a
+    numpy.memmap (or a .npy file opened as such) tile by tile to sort them by cell, and only the
+    coordinates of the most recently used cells are kept in memory afterwards. Besides the input,
+    it takes about 16 bytes per point.
+
+    :param X: input array, numpy.memmap or path to a .npy file.
+    :param eps: radius of search, side of the cells.
+    :param tile_size: number of points read at once when building the index.
+    :param cache_cells: maximum number of cells whose coordinates are kept in memory.
+    """
+
+    def __init__(self, X: Union[np.ndarray, str, os.PathLike], eps: float, tile_size: int = 1_000_000,
+                 cache_cells: int = 4096):
+        if isinstance(X, (str, os.PathLike)):
+            X = np.load(X, mmap_mode="r")
+
+        if eps <= 0:
+            raise ValueError(f"eps: {eps} must be positive")
+
+        self.X = X
+        self.eps = eps
+        self.cache_cells = cache_cells
+        self._cache: OrderedDict = OrderedDict()
+
+        n, dim = X.shape
+
+        # first pass: range of the cells
+        lo = np.full(dim, np.iinfo(np.int64).max)
+        hi = np.full(dim, np.iinfo(np.int64).min)
+        for start in range(0, n, tile_size):
+            cells = np.floor(np.asarray(X[start: start + tile_size], dtype=float) / eps).astype(np.int64)
+            lo = np.minimum(lo, cells.min(axis=0))
+            hi = np.maximum(hi, cells.max(axis=0))
+
+        # cells are numbered in row-major order, with a border of empty cells all around
+        self._lo = lo - 1
+        self._shape = tuple((hi - lo + 3).tolist()) if n > 0 else (1,) * dim
+        if np.prod(np.array(self._shape, dtype=float)) >= 2 ** 62:
+            raise ValueError(f"eps: {eps} is too small for the range of the input data")
+
+        strides = np.cumprod((self._shape[1:] + (1,))[::-1])[::-1]
+        self._offsets = np.array(list(itertools.product([-1, 0, 1], repeat=dim))) @ strides
+
+        # second pass: cell of each point
+        keys = np.empty(n, dtype=np.int64)
+        for start in range(0, n, tile_size):
+            keys[start: start + tile_size] = self._cell_keys(X[start: start + tile_size])
+
+        self.order = np.argsort(keys, kind="stable")
+        keys = keys[self.order]
+        self.cell_keys, self.cell_starts = np.unique(keys, return_index=True)
+        self.cell_ends = np.append(self.cell_starts[1:], n)
+
+    def _cell_keys(self, points: np.ndarray) -> np.ndarray:
+        cells = np.floor(np.asarray(points, dtype=float) / self.eps).astype(np.int64) - self._lo
+        return np.ravel_multi_index(cells.T, self._shape)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    @property
+    def n_cells(self) -> int:
+        """Number of non-empty cells."""
+        return len(self.cell_keys)
+
+    def cell_points(self, c: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Points of a non-empty cell, read through the cache.
+
+        :param c: position of the cell, between 0 and n_cells - 1.
+        :return: sorted indices of the points of the cell and their coordinates.
+        """
+        if c in self._cache:
+            self._cache.move_to_end(c)
+            return self._cache[c]
+
+        ids = self.order[self.cell_starts[c]: self.cell_ends[c]]
+        self._cache[c] = (ids, np.asarray(self.X[ids], dtype=float))
+
+        if len(self._cache) > self.cache_cells:
+            self._cache.popitem(last=False)
+
+        return self._cache[c]
+
+    def adjacent_cells(self, key: int) -> np.ndarray:
+        """Positions of the non-empty cells among the cell with the given key and the ones surrounding it."""
+        keys = key + self._offsets
+        pos = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+
+        return pos[self.cell_keys[pos] == keys]
+
+    def candidates(self, c: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Points of a non-empty cell and of the cells surrounding it, the only ones that can lie within eps
+        from the points of the cell.
+
+        :param c: position of the cell, between 0 and n_cells - 1.
+        :return: indices of the points and their coordinates.
+        """
+        blocks = [self.cell_points(a) for a in self.adjacent_cells(self.cell_keys[c])]
+
+        return np.concatenate([b[0] for b in blocks]), np.concatenate([b[1] for b in blocks])
+
+    def query(self, i: int, return_distance: bool = False) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Neighborhood of a point of the input data.
+
+        :param i: index of the point.
+        :param return_distance: if True, the distances of the neighbors are returned as well.
+        :return: sorted indices of the neighborhood points (and their distances).
+        """
+        point = np.asarray(self.X[i], dtype=float)
+        c = np.searchsorted(self.cell_keys, self._cell_keys(point[None, :])[0])
+        ids, C = self.candidates(c)
+
+        order = np.argsort(ids)
+        ids, C = ids[order], C[order]
+        d = _point_distances(C, point)
+        mask = d <= self.eps
+
+        if return_distance is True:
+            return ids[mask], d[mask]
+
+        return ids[mask]
+
+    def cell_distances(self, c: int) -> Tuple[np.ndarray, np.ndarray, Iterable[np.ndarray]]:
+        """
+        Distances between the points of a cell and their candidate neighbors, computed in bounded blocks.
+
+        :param c: position of the cell, between 0 and n_cells - 1.
+        :return: indices of the points of the cell, indices of the candidates, and generator of
+                 (rows, distances) blocks, where rows are positions within the points of the cell.
+        """
+        ids, P = self.cell_points(c)
+        cand_ids, C = self.candidates(c)
+        step = max(1, BLOCK_SIZE // len(C))
+
+        def blocks():
+            for start in range(0, len(ids), step):
+                rows = np.arange(start, min(start + step, len(ids)))
+                yield rows, np.sqrt(np.sum((P[rows][:, None, :] - C[None, :, :]) ** 2, axis=2))
+
+        return ids, cand_ids, blocks()
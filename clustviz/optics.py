@@ -1,12 +1,64 @@
+import heapq
+import itertools
+import os
 import random
 from typing import Dict, Optional, Iterable, List, Any, Union, Tuple
 
 import numpy as np
-import matplotlib.pyplot as plt
 from collections import OrderedDict
 import pandas as pd
+from scipy.spatial import cKDTree
 
-from clustviz.utils import dist1, dist2, DBSCAN_COLOR_DICT, annotate_points
+from clustviz.utils import plt, is_headless, dist1, dist2, DBSCAN_COLOR_DICT, annotate_points
+from clustviz.neighbors import RadiusGraph, MemmapGridIndex
+
+
+class SeedQueue:
+    """
+    Priority queue of the seeds of OPTICS, ordered by reachability distance: a binary heap with
+    lazy deletion, where lowering the reachability of a seed (decrease-key) pushes a new entry and
+    leaves the old one to be discarded when it surfaces. Seeds with equal reachability are popped in
+    order of first insertion, as min(Seed, key=Seed.get) does on a dictionary.
+    Push and pop cost O(log n).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._reach = {}
+        self._order = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._reach)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._reach
+
+    def __getitem__(self, key: str) -> float:
+        return self._reach[key]
+
+    def push(self, key: str, reach: float) -> None:
+        """Insert a seed, or lower its reachability distance if it is already in the queue."""
+        if key in self._reach:
+            if reach >= self._reach[key]:
+                return
+        else:
+            self._order[key] = next(self._counter)
+
+        self._reach[key] = reach
+        heapq.heappush(self._heap, (reach, self._order[key], key))
+
+    def pop(self) -> Tuple[str, float]:
+        """Remove and return the seed with the minimum reachability distance, along with it."""
+        while True:
+            reach, _, key = heapq.heappop(self._heap)
+
+            # skip the entries left behind by decrease-key
+            if self._reach.get(key) == reach:
+                del self._reach[key]
+                del self._order[key]
+
+                return key, reach
 
 
 def point_plot(X: np.ndarray, X_dict: Dict[str, np.ndarray], o: str,
@@ -99,7 +151,23 @@ def scan_neigh2(data: Dict[str, np.ndarray], point: np.ndarray, eps: float) -> L
     return d_sorted
 
 
-def minPTSdist(data: Dict[str, np.ndarray], o: str, minPTS: int, eps: float) -> Union[float, Any]:
+def scan_neigh_graph(graph: RadiusGraph, o: str, eps: float) -> List[Tuple[str, float]]:
+    """
+    Variation of scan_neigh2 that reads the neighborhood of a point from a precomputed radius graph.
+
+    :param graph: radius graph built with a radius >= eps.
+    :param o: key of point of interest.
+    :param eps: radius of search.
+    :return: keys of dictionary of neighborhood points, ordered by distance.
+    """
+    idx, d = graph.neighbors(int(o), eps, return_distance=True)
+    mask = d != 0
+
+    return sorted(zip([str(i) for i in idx[mask]], d[mask].tolist()), key=lambda x: x[1])
+
+
+def minPTSdist(data: Dict[str, np.ndarray], o: str, minPTS: int, eps: float,
+               S: Optional[List[Tuple[str, float]]] = None) -> Union[float, Any]:
     """
     Return the minPTS-distance of a point if it is a core point, else it returns np.inf.
 
@@ -107,9 +175,11 @@ def minPTSdist(data: Dict[str, np.ndarray], o: str, minPTS: int, eps: float) ->
     :param o: key of point of interest.
     :param minPTS: minimum number of neighbors for a point to be considered a core point.
     :param eps: radius of a point within which to search for minPTS points.
+    :param S: neighborhood of the point as returned by scan_neigh2, if already available.
     :return: minPTS-distance of data[o] or np.inf.
     """
-    S = scan_neigh2(data, data[o], eps)
+    if S is None:
+        S = scan_neigh2(data, data[o], eps)
 
     if len(S) >= minPTS - 1:
 
@@ -120,7 +190,91 @@ def minPTSdist(data: Dict[str, np.ndarray], o: str, minPTS: int, eps: float) ->
         return np.inf
 
 
-def reach_dist(data: Dict[str, np.ndarray], x: str, y: str, minPTS: int, eps: float) -> Union[float, Any]:
+def core_distances(X: Union[np.ndarray, RadiusGraph], minPTS: int, eps: float) -> np.ndarray:
+    """
+    Compute the minPTS-distance (core distance) of every point at once, with the same definition as
+    minPTSdist: the distance of the (minPTS - 1)-th closest point at a non-zero distance within eps,
+    np.inf if there are fewer such points. With minPTS <= 1 every point is a core point, and the core
+    distance of points without neighbors is 0.
+
+    :param X: input array, or radius graph built with a radius >= eps.
+    :param minPTS: minimum number of neighbors for a point to be considered a core point.
+    :param eps: radius of a point within which to search for minPTS points.
+    :return: array of core distances.
+    """
+    if isinstance(X, RadiusGraph):
+        X.check_eps(eps)
+        return _core_distances_graph(X, minPTS, eps)
+
+    X = np.asarray(X, dtype=float)
+    n = len(X)
+    k = minPTS - 1
+    core = np.full(n, np.inf)
+
+    if n == 0:
+        return core
+
+    tree = cKDTree(X)
+
+    if k >= 1 and n > k:
+        # the k + 1 nearest points include the point itself, at distance 0
+        _, idx = tree.query(X, k=k + 1)
+        idx = idx.reshape(n, -1)
+        # recompute the distances as dist1 does, so that they match the ones of scan_neigh2
+        d = np.sort(np.sqrt(np.sum((X[idx] - X[:, None, :]) ** 2, axis=2)), axis=1)
+        core = np.where(d[:, k] <= eps, d[:, k], np.inf)
+        # duplicated points are not counted as neighbors: they are solved exactly below
+        exact = np.flatnonzero(d[:, 1] == 0)
+    elif k >= 1:
+        exact = np.empty(0, dtype=np.int64)
+    else:
+        exact = np.arange(n)
+
+    for i, cand in zip(exact, tree.query_ball_point(X[exact], eps * (1 + 1e-9))):
+        d = np.sqrt(np.sum((X[cand] - X[i]) ** 2, axis=1))
+        d = np.sort(d[(d != 0) & (d <= eps)])
+        core[i] = _core_rule(d, k)
+
+    return core
+
+
+def _core_distances_graph(graph: RadiusGraph, minPTS: int, eps: float) -> np.ndarray:
+    """Vectorized core_distances on a radius graph."""
+    n = len(graph)
+    k = minPTS - 1
+    rows = np.repeat(np.arange(n), np.diff(graph.indptr))
+    mask = (graph.distances != 0) & (graph.distances <= eps)
+    rows, d = rows[mask], graph.distances[mask]
+
+    # sort the distances row by row
+    order = np.lexsort((d, rows))
+    d = d[order]
+    counts = np.bincount(rows, minlength=n)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    core = np.full(n, np.inf)
+
+    if k >= 1:
+        valid = counts >= k
+        core[valid] = d[starts[valid] + k - 1]
+    else:
+        core[:] = 0.0
+        nonempty = counts > 0
+        core[nonempty] = d[starts[nonempty] + counts[nonempty] - 1]
+
+    return core
+
+
+def _core_rule(d: np.ndarray, k: int) -> float:
+    """Core distance from the sorted non-zero distances of the neighborhood, see minPTSdist."""
+    if k >= 1:
+        return d[k - 1] if len(d) >= k else np.inf
+
+    return d[-1] if len(d) > 0 else 0.0
+
+
+def reach_dist(data: Dict[str, np.ndarray], x: str, y: str, minPTS: int, eps: float,
+               core_dist: Optional[float] = None) -> Union[float, Any]:
     """
     Reachability distance (even if it is not a distance because it isn't symmetrical).
 
@@ -129,10 +283,15 @@ def reach_dist(data: Dict[str, np.ndarray], x: str, y: str, minPTS: int, eps: fl
     :param y: second point.
     :param minPTS: minimum number of neighbors for a point to be considered a core point.
     :param eps: radius of a point within which to search for minPTS points.
+    :param core_dist: core distance of y, if already known (see core_distances); otherwise it is
+                      computed with minPTSdist.
     :return: reachability distance of x and y.
 
     """
-    return max(dist2(data, x, y), minPTSdist(data, y, minPTS, eps))
+    if core_dist is None:
+        core_dist = minPTSdist(data, y, minPTS, eps)
+
+    return max(dist2(data, x, y), core_dist)
 
 
 def reach_plot(data: Dict[str, np.ndarray], ClustDist: Dict[str, float], eps: float) -> None:
@@ -184,50 +343,76 @@ def reach_plot(data: Dict[str, np.ndarray], ClustDist: Dict[str, float], eps: fl
     plt.show()
 
 
-def OPTICS(X: np.ndarray, eps: float, minPTS: int, plot: bool = True,
-           plot_reach: bool = False) -> Tuple[Dict[str, float], Dict[str, float]]:
+def OPTICS(X: Union[np.ndarray, RadiusGraph], eps: float, minPTS: int, plot: bool = True,
+           plot_reach: bool = False, core_array: bool = False
+           ) -> Tuple[Dict[str, float], Union[Dict[str, float], np.ndarray]]:
     """
     Execute the OPTICS algorithm. Similar to DBSCAN, but uses a priority queue.
 
-    :param X: input array.
+    :param X: input array, or precomputed radius graph (see clustviz.neighbors.radius_graph) built with
+              a radius >= eps; plots are not available for the latter.
     :param eps: radius of a point within which to search for minPTS points.
     :param minPTS: minimum number of neighbors for a point to be considered a core point.
     :param plot: if True, the scatter plot of the function point_plot is displayed at each step.
     :param plot_reach: if True, the reachability plot is displayed at each step.
+    :param core_array: if True, CoreDist is returned as the array of core distances computed by core_distances.
     :return: ClustDist, a dictionary of the form point_index:reach_dist, and
              CoreDist, a dictionary of the form point_index:core_dist.
     """
+    plot, plot_reach = (False, False) if is_headless() else (plot, plot_reach)
     ClustDist = {}
     CoreDist = {}
-    Seed = {}
-    processed = []
+    Seed = SeedQueue()
+    processed = set()
 
-    # create dictionary
-    X_dict = dict(zip([str(i) for i in range(len(X))], X))
+    if isinstance(X, RadiusGraph):
+        if plot is True:
+            raise ValueError("Plotting is only available with raw coordinates.")
+
+        X.check_eps(eps)
+        graph = X
+        X_dict = dict.fromkeys([str(i) for i in range(len(graph))])
+
+    else:
+        graph = None
+        # create dictionary
+        X_dict = dict(zip([str(i) for i in range(len(X))], X))
+
+    # core distances of all points, computed once
+    core = core_distances(X, minPTS, eps)
+
+    # random order in which the starting points are picked, when the queue is empty
+    start_order = list(X_dict.keys())
+    random.shuffle(start_order)
+    start_pos = 0
 
     # until all points have been processed
-    while len(processed) != len(X):
+    while len(processed) != len(X_dict):
 
-        # if queue is empty take a random point
+        # if queue is empty take a random unprocessed point
         if len(Seed) == 0:
 
-            unprocessed = list(set(list(X_dict.keys())) - set(processed))
+            while start_order[start_pos] in processed:
+                start_pos += 1
 
-            (o, r) = (random.choice(unprocessed), np.inf)
+            (o, r) = (start_order[start_pos], np.inf)
 
         # else take the minimum and delete it from the queue
         else:
 
-            (o, r) = (min(Seed, key=Seed.get), Seed[min(Seed, key=Seed.get)])
-
-            del Seed[o]
+            (o, r) = Seed.pop()
 
         # scan the neighborhood of the point
-        N = scan_neigh1(X_dict, X_dict[o], eps)
+        if graph is None:
+            N = scan_neigh1(X_dict, X_dict[o], eps)
+        else:
+            N = dict(sorted(scan_neigh_graph(graph, o, eps), key=lambda x: int(x[0])))
+
+        core_dist = core[int(o)]
         # update the cluster dictionary and the core distance dictionary
         ClustDist.update({o: r})
 
-        CoreDist.update({o: minPTSdist(X_dict, o, minPTS, eps)})
+        CoreDist.update({o: core_dist})
 
         if plot is True:
 
@@ -237,7 +422,7 @@ def OPTICS(X: np.ndarray, eps: float, minPTS: int, plot: bool = True,
                 reach_plot(X_dict, ClustDist, eps)
 
         # mark o as processed
-        processed.append(o)
+        processed.add(o)
 
         # if the point is core
         if len(N) >= minPTS - 1:
@@ -250,26 +435,103 @@ def OPTICS(X: np.ndarray, eps: float, minPTS: int, plot: bool = True,
 
                 else:
                     # compute its reach_dist from o
-                    p = reach_dist(X_dict, n, o, minPTS, eps)
-                    # if it is in Seed, update its reach_dist if it is lower
-                    if n in Seed:
-
-                        if p < Seed[n]:
-                            Seed[n] = p
-                    # else, insert it into the Seed
+                    if graph is None:
+                        p = reach_dist(X_dict, n, o, minPTS, eps, core_dist=core_dist)
                     else:
+                        p = max(N[n], core_dist)
+                    # insert it into the Seed, or update its reach_dist if it is lower
+                    Seed.push(n, p)
 
-                        Seed.update({n: p})
+    if core_array is True:
+        return ClustDist, core
 
     return ClustDist, CoreDist
 
 
-def ExtractDBSCANclust(ClustDist: Dict[str, float], CoreDist: Dict[str, float], eps_db: float) -> Dict[str, int]:
+def optics_memmap(data: Union[np.ndarray, str, os.PathLike, MemmapGridIndex], eps: float, minPTS: int,
+                  tile_size: int = 1_000_000, cache_cells: int = 4096
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Out-of-core OPTICS, for inputs that do not fit in memory: the points are read from a numpy.memmap
+    (or a .npy file) through a MemmapGridIndex, that keeps in memory only the coordinates of the active
+    cells. The core distances are computed in a sweep over the cells, then the points are processed as
+    in OPTICS, with the starting points taken in cell order instead of at random. The output is in the
+    array form of clustviz.optics_extraction.
+
+    :param data: input array, numpy.memmap, path to a .npy file, or MemmapGridIndex built with eps.
+    :param eps: radius of a point within which to search for minPTS points.
+    :param minPTS: minimum number of neighbors for a point to be considered a core point.
+    :param tile_size: number of points read at once when building the index.
+    :param cache_cells: maximum number of cells whose coordinates are kept in memory.
+    :return: ordering, the point indices in processing order; reachability, the reachability distances
+             in processing order; core, the core distances indexed by point.
+    """
+    if isinstance(data, MemmapGridIndex):
+        index = data
+        if index.eps != eps:
+            raise ValueError(f"eps: {eps} must be equal to the eps of the index: {index.eps}")
+    else:
+        index = MemmapGridIndex(data, eps, tile_size=tile_size, cache_cells=cache_cells)
+
+    n = len(index)
+    k = minPTS - 1
+
+    # core distances, with the same definition as core_distances
+    core = np.full(n, np.inf)
+    for c in range(index.n_cells):
+        ids, _, blocks = index.cell_distances(c)
+        for rows, D in blocks:
+            mask = (D != 0) & (D <= eps)
+            if k >= 1:
+                if D.shape[1] >= k:
+                    d = np.partition(np.where(mask, D, np.inf), k - 1, axis=1)[:, k - 1]
+                    core[ids[rows]] = d
+            else:
+                core[ids[rows]] = np.where(mask, D, 0.0).max(axis=1)
+
+    ordering = np.empty(n, dtype=np.int64)
+    reachability = np.empty(n)
+    processed = np.zeros(n, dtype=bool)
+    Seed = SeedQueue()
+    start_pos = 0
+
+    for step in range(n):
+
+        # if queue is empty take the next unprocessed point in cell order
+        if len(Seed) == 0:
+
+            while processed[index.order[start_pos]]:
+                start_pos += 1
+
+            (o, r) = (int(index.order[start_pos]), np.inf)
+
+        else:
+
+            (o, r) = Seed.pop()
+
+        ordering[step] = o
+        reachability[step] = r
+        processed[o] = True
+
+        # if the point is core, update the reachability of its unprocessed neighbors
+        if core[o] < np.inf:
+            idx, d = index.query(o, return_distance=True)
+            mask = (d != 0) & ~processed[idx]
+
+            for q, p in zip(idx[mask].tolist(), np.maximum(d[mask], core[o]).tolist()):
+                Seed.push(q, p)
+
+    return ordering, reachability, core
+
+
+def ExtractDBSCANclust(ClustDist: Dict[str, float], CoreDist: Union[Dict[str, float], np.ndarray],
+                       eps_db: float) -> Dict[str, int]:
     """
     Extracts cluster in a DBSCAN fashion; one can use any eps_db <= eps of OPTICS.
 
     :param ClustDist: ClustDist of OPTICS, a dictionary of the form point_index:reach_dist.
-    :param CoreDist: CoreDist of OPTICS, a dictionary of the form point_index:core_dist.
+    :param CoreDist: CoreDist of OPTICS, a dictionary of the form point_index:core_dist, or
+                     the array of core distances (see core_distances).
     :param eps_db: the eps to choose for DBSCAN.
     :return: dictionary of clusters, of the form point_index:cluster_label.
     """
@@ -279,6 +541,9 @@ def ExtractDBSCANclust(ClustDist: Dict[str, float], CoreDist: Dict[str, float],
 
     clust_id = -1
 
+    if isinstance(CoreDist, np.ndarray):
+        CoreDist = dict(zip([str(i) for i in range(len(CoreDist))], CoreDist))
+
     for key, value in ClustDist.items():
         # new cluster
         if value > eps_db:
@@ -0,0 +1,114 @@
+from typing import Dict, Iterable, Tuple, Union
+
+import numpy as np
+from sklearn.cluster import cluster_optics_xi
+
+
+def optics_arrays(ClustDist: Dict[str, float], CoreDist: Union[Dict[str, float], np.ndarray]
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert the output of OPTICS to arrays.
+
+    :param ClustDist: ClustDist of OPTICS, a dictionary of the form point_index:reach_dist, in processing order.
+    :param CoreDist: CoreDist of OPTICS, a dictionary of the form point_index:core_dist, or the array of
+                     core distances.
+    :return: ordering, the point indices in processing order; reachability, the reachability distances
+             in processing order (the reachability plot); core, the core distances indexed by point.
+    """
+    ordering = np.array([int(k) for k in ClustDist.keys()], dtype=np.int64)
+    reachability = np.array(list(ClustDist.values()), dtype=float)
+
+    if isinstance(CoreDist, np.ndarray):
+        core = CoreDist.astype(float)
+    else:
+        core = np.full(len(ordering), np.inf)
+        core[[int(k) for k in CoreDist.keys()]] = list(CoreDist.values())
+
+    return ordering, reachability, core
+
+
+def extract_dbscan(ordering: np.ndarray, reachability: np.ndarray, core: np.ndarray,
+                   eps_values: Union[float, Iterable[float]]) -> np.ndarray:
+    """
+    Extract clusters in a DBSCAN fashion for many eps_db values in one vectorized pass, with the same rule
+    as ExtractDBSCANclust: a point whose reachability is above eps_db starts a new cluster if it is a
+    core point and is noise otherwise, any other point belongs to the current cluster.
+
+    :param ordering: point indices in processing order.
+    :param reachability: reachability distances in processing order.
+    :param core: core distances, indexed by point.
+    :param eps_values: the eps_db values, each of them <= eps of OPTICS.
+    :return: array of cluster labels of shape (len(eps_values), n), indexed by point, -1 denoting noise;
+             a 1-dimensional array if eps_values is a scalar.
+    """
+    eps = np.asarray(eps_values, dtype=float)
+    eps_2d = eps.reshape(-1, 1)
+
+    new_cluster = reachability[None, :] > eps_2d
+    is_core = core[ordering][None, :] <= eps_2d
+
+    clust_id = np.cumsum(new_cluster & is_core, axis=1) - 1
+    labels_ordered = np.where(new_cluster & ~is_core, -1, clust_id)
+
+    labels = np.empty_like(labels_ordered)
+    labels[:, ordering] = labels_ordered
+
+    if eps.ndim == 0:
+        return labels[0]
+
+    return labels
+
+
+def _by_point(ordering: np.ndarray, reachability: np.ndarray) -> np.ndarray:
+    """Reachability distances indexed by point, as the reachability_ of sklearn.cluster.OPTICS."""
+    res = np.empty(len(ordering))
+    res[ordering] = reachability
+
+    return res
+
+
+def _xi(ordering: np.ndarray, reachability: np.ndarray, xi: float, min_samples: int,
+        min_cluster_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Labels and hierarchical clusters of sklearn.cluster.cluster_optics_xi, without predecessor correction."""
+    if not 0 < xi < 1:
+        raise ValueError(f"xi: {xi} must be between 0 and 1")
+
+    labels, clusters = cluster_optics_xi(reachability=_by_point(ordering, reachability),
+                                         predecessor=np.full(len(ordering), -1), ordering=ordering,
+                                         min_samples=min_samples, min_cluster_size=min_cluster_size, xi=xi,
+                                         predecessor_correction=False)
+
+    return labels.astype(np.int64), np.asarray(clusters, dtype=np.int64).reshape(-1, 2)
+
+
+def xi_clusters(reachability: np.ndarray, xi: float, min_samples: int, min_cluster_size: int = 2) -> np.ndarray:
+    """
+    Find the hierarchical clusters of the reachability plot with the xi-steep areas method of OPTICS, with
+    sklearn.cluster.cluster_optics_xi: a cluster starts in a steep down area and ends in a steep up area,
+    where a point is steep if the reachability of the next point is at least a factor 1 - xi lower (or higher).
+
+    :param reachability: reachability distances in processing order.
+    :param xi: 0 < xi < 1, the minimum steepness.
+    :param min_samples: maximum number of consecutive non-steep points in a steep area; minPTS of OPTICS.
+    :param min_cluster_size: minimum number of points of a cluster.
+    :return: array of the [start, end] positions (inclusive, in processing order) of the clusters, where
+             every cluster comes after the clusters it contains.
+    """
+    return _xi(np.arange(len(reachability)), reachability, xi, min_samples, min_cluster_size)[1]
+
+
+def extract_xi(ordering: np.ndarray, reachability: np.ndarray, xi: float, min_samples: int,
+               min_cluster_size: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extract clusters from the reachability plot with the xi-steep areas method, with
+    sklearn.cluster.cluster_optics_xi; the flat labels are given by the leaf clusters of the hierarchy.
+
+    :param ordering: point indices in processing order.
+    :param reachability: reachability distances in processing order.
+    :param xi: 0 < xi < 1, the minimum steepness.
+    :param min_samples: maximum number of consecutive non-steep points in a steep area; minPTS of OPTICS.
+    :param min_cluster_size: minimum number of points of a cluster.
+    :return: array of cluster labels indexed by point, -1 denoting noise, and array of the hierarchical
+             clusters as [start, end] positions in processing order (see xi_clusters).
+    """
+    return _xi(np.asarray(ordering), reachability, xi, min_samples, min_cluster_size)
@@ -5,10 +5,9 @@ from typing import Optional
 from scipy.sparse import csr_matrix
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import random
 import pprint
-from clustviz.utils import COLOR_DICT, annotate_points
+from clustviz.utils import plt, COLOR_DICT, annotate_points, is_headless, report
 
 
 class KMedoids:
@@ -50,23 +49,25 @@ class KMedoids:
         self.__random_state = random_state
 
     def fit(self, data):
-        print("fitting")
+        report("kmedoids.fit", "fitting")
         self.__data = data
         self.__set_data_type()
         self.__start_algo()
 
     def __start_algo(self):
-        print("starting algo")
+        report("kmedoids.start", "starting algo")
         self.__initialize_medoids()  # choosing initial medoids
         # computing clusters and cluster_distances
         self.clusters, self.cluster_distances = self.__calculate_clusters(
             self.medoids
         )
+        report("kmedoids.clusters", clusters=self.clusters, cluster_distances=self.cluster_distances)
         # print cluster and cluster_distances
-        print("clusters: ")
-        pprint.PrettyPrinter(indent=2, compact=True).pprint(self.clusters)
-        print("clusters_distances: ", self.cluster_distances)
-        plot_pam(self.__data, self.clusters)
+        if not is_headless():
+            print("clusters: ")
+            pprint.PrettyPrinter(indent=2, compact=True).pprint(self.clusters)
+            print("clusters_distances: ", self.cluster_distances)
+            plot_pam(self.__data, self.clusters)
 
         self.__update_clusters()
 
@@ -74,8 +75,7 @@ class KMedoids:
         for i in range(
             self.max_iter
         ):  # to stop if convergence isn't reached whithin max_iter iterations
-            print("\n")
-            print("iteration n°: ", i)
+            report("kmedoids.iteration", "\n\niteration n°: ", i, iteration=i)
             # compute distance obtained by swapping medoids in the clusters
             cluster_dist_with_new_medoids = (self.__swap_and_recalculate_clusters())
             # if the new sum of cluster_distances is smaller than the old one
@@ -83,21 +83,23 @@ class KMedoids:
                 self.__is_new_cluster_dist_small(cluster_dist_with_new_medoids)
                 is True
             ):
-                print("new is smaller")
+                report("kmedoids.improvement", "new is smaller")
                 # compute clusters and cluster_distance with new medoids
                 (
                     self.clusters,
                     self.cluster_distances,
                 ) = self.__calculate_clusters(self.medoids)
-                print("clusters: ")
-                pprint.PrettyPrinter(indent=2, compact=True).pprint(
-                    self.clusters
-                )
-                plot_pam(self.__data, self.clusters)
+                report("kmedoids.clusters", clusters=self.clusters, cluster_distances=self.cluster_distances)
+                if not is_headless():
+                    print("clusters: ")
+                    pprint.PrettyPrinter(indent=2, compact=True).pprint(
+                        self.clusters
+                    )
+                    plot_pam(self.__data, self.clusters)
                 # print("clusters_distances: ", self.cluster_distances)
             else:
                 # if the sum of cluster_distances doesn't improve, terminate the algorithm
-                print("termination")
+                report("kmedoids.termination", "termination", iteration=i)
                 break
 
     def __is_new_cluster_dist_small(self, cluster_dist_with_new_medoids):
@@ -110,12 +112,12 @@ class KMedoids:
         """
         # compute the existing sum of cluster_distances
         existance_dist = self.calculate_distance_of_clusters()
-        print("present dist: ", existance_dist)
+        report("kmedoids.present_distance", "present dist: ", existance_dist, distance=existance_dist)
         # computes the new sum of cluster_distances
         new_dist = self.calculate_distance_of_clusters(
             cluster_dist_with_new_medoids
         )
-        print("new dist: ", new_dist)
+        report("kmedoids.new_distance", "new dist: ", new_dist, distance=new_dist)
 
         # if it is better, substitute the old medoids with the new ones and return True, else return False
         if (
@@ -145,7 +147,7 @@ class KMedoids:
     def __swap_and_recalculate_clusters(self):
         # http://www.math.le.ac.uk/people/ag153/homepage/KmeansKmedoids/Kmeans_Kmedoids.html
         """Return dictionary of new cluster_distances obtained by swapping medoids in each cluster."""
-        print("swap and recompute")
+        report("kmedoids.swap", "swap and recompute")
         cluster_dist = {}
         for medoid in self.medoids:  # for each medoid
             is_shortest_medoid_found = False
@@ -165,15 +167,15 @@ class KMedoids:
                     )
                     # if this new distance is smaller than the previous one
                     if new_distance < self.cluster_distances[medoid]:
-                        print("new better medoid: ", data_index)
+                        report("kmedoids.better_medoid", "new better medoid: ", data_index, medoid=data_index)
                         cluster_dist[data_index] = new_distance
                         is_shortest_medoid_found = True
                         break  # exit for loop for this medoid, since a better one has been found
             # if no better medoid has been found, keep the current one
             if is_shortest_medoid_found is False:
-                print("no better medoids found, keep: ", medoid)
+                report("kmedoids.keep_medoid", "no better medoids found, keep: ", medoid, medoid=medoid)
                 cluster_dist[medoid] = self.cluster_distances[medoid]
-        print("cluster_dist: ", cluster_dist)
+        report("kmedoids.cluster_distances", "cluster_dist: ", cluster_dist, cluster_distances=cluster_dist)
         return cluster_dist
 
     def calculate_inter_cluster_distance(self, medoid, cluster_list):
@@ -231,7 +233,7 @@ class KMedoids:
 
     def __initialize_medoids(self):
         """Kmeans++ initialisation."""
-        print("initializing medoids with kmeans++")
+        report("kmedoids.initialization", "initializing medoids with kmeans++")
         random.seed(self.__random_state)
 
         self.medoids.append(
@@ -292,7 +294,7 @@ class KMedoids:
 
     def __set_data_type(self):
         """To check whether the given input is of type list or csr."""
-        print("setting data type")
+        report("kmedoids.data_type", "setting data type")
         if isinstance(self.__data, csr_matrix):
             self.__is_csr = True
             self.__rows = self.__data.shape[0]
@@ -1,11 +1,11 @@
+import importlib
 import math
-from typing import Dict, Tuple, Iterable, Optional
+import os
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Tuple, Iterable, Optional
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib import colors
-from matplotlib.patches import Rectangle
 from scipy.spatial import ConvexHull
 
 FONTSIZE_NORMAL = 10
@@ -72,6 +72,102 @@ CURE_REPS_COLORS = [
 ]
 
 
+class _LazyPyplot:
+    """
+    Stand-in for matplotlib.pyplot, which is imported, and set to the ggplot style, only the first time
+    one of its attributes is used: computations which never plot do not pay for importing matplotlib.
+    """
+    _module = None
+
+    def __getattr__(self, name: str) -> Any:
+        if _LazyPyplot._module is None:
+            pyplot = importlib.import_module("matplotlib.pyplot")
+            pyplot.style.use("ggplot")
+            _LazyPyplot._module = pyplot
+
+        return getattr(_LazyPyplot._module, name)
+
+
+plt = _LazyPyplot()
+
+# headless mode: no plots and no printing, progress events are only sent to the callback
+_HEADLESS = False
+_PROGRESS_CALLBACK = None
+
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+"""
+Callback receiving the progress events of the algorithms, as the name of the event, e.g. ``"kmedoids.iteration"``,
+and a dictionary of its data, e.g. ``{"iteration": 3}``.
+"""
+
+
+def set_headless(headless: bool = True, callback: Optional[ProgressCallback] = None) -> None:
+    """
+    Turn the headless mode on or off for the whole package: in headless mode the algorithms neither plot
+    nor print, whatever their plotting parameters.
+
+    :param headless: if True, turn the headless mode on.
+    :param callback: if not None, function receiving every progress event (see ProgressCallback), also
+                     outside of the headless mode.
+    """
+    global _HEADLESS, _PROGRESS_CALLBACK
+    _HEADLESS = headless
+    _PROGRESS_CALLBACK = callback
+
+
+def is_headless() -> bool:
+    """Return True if the headless mode is on."""
+    return _HEADLESS
+
+
+@contextmanager
+def headless(callback: Optional[ProgressCallback] = None) -> Iterator[None]:
+    """
+    Context manager running its block in headless mode, e.g. ``with headless(): KMedoids(3).fit(data)``;
+    the previous mode is restored on exit.
+
+    :param callback: if not None, function receiving every progress event (see ProgressCallback).
+    """
+    previous = (_HEADLESS, _PROGRESS_CALLBACK)
+    set_headless(True, callback)
+    try:
+        yield
+    finally:
+        set_headless(*previous)
+
+
+def report(event: str, *message, **data) -> None:
+    """
+    Emit a progress event: it is sent to the callback set by set_headless, if any, and the message is
+    printed unless in headless mode.
+
+    :param event: name of the event.
+    :param message: objects printed as by print, outside of the headless mode.
+    :param data: data of the event, passed to the callback.
+    """
+    if _PROGRESS_CALLBACK is not None:
+        _PROGRESS_CALLBACK(event, data)
+
+    if not _HEADLESS and len(message) > 0:
+        print(*message)
+
+
+def _effective_n_jobs(n_jobs: Optional[int]) -> Optional[int]:
+    """
+    Validate a number of worker processes, resolving -1 to the number of CPUs.
+
+    :param n_jobs: number of worker processes, -1 for all the CPUs, or None.
+    :return: the number of worker processes, or None if n_jobs is None.
+    """
+    if n_jobs == -1:
+        return os.cpu_count() or 1
+
+    if n_jobs is not None and n_jobs < 1:
+        raise ValueError(f"n_jobs: {n_jobs} must be a positive integer or -1")
+
+    return n_jobs
+
+
 def flatten_list(input_list: list) -> list:
     return [item for sublist in input_list for item in sublist]
 
@@ -86,10 +182,12 @@ def encircle(x, y, ax, **kwargs) -> None:
 
 def convert_colors(dict_colors: Dict[int, str], alpha: float = 0.5) -> Dict[int, Tuple[float, ...]]:
     """Modify the transparency of each color of a dictionary of colors to the desired alpha."""
+    from matplotlib.colors import to_rgb
+
     new_dict_colors = {}
 
     for i, col in enumerate(dict_colors.values()):
-        new_dict_colors[i] = tuple(list(colors.to_rgb(col)) + [alpha])
+        new_dict_colors[i] = tuple(list(to_rgb(col)) + [alpha])
 
     return new_dict_colors
 
@@ -125,10 +223,12 @@ def chernoffBounds(u_min: int, f: float, N: int, d: float, k: int) -> float:
     res = (
             f * N + N / u_min * l + N / u_min * np.sqrt(l ** 2 + 2 * f * u_min * l)
     )
-    print(
+    report(
+        "chernoff_bounds",
         "If the sample size is {0}, the probability of selecting fewer "
         "than {1} points from".format(math.ceil(res), round(f * u_min))
-        + " any one of the clusters is less than {0}".format(k * d)
+        + " any one of the clusters is less than {0}".format(k * d),
+        sample_size=res
     )
 
     return res
@@ -198,6 +298,122 @@ def build_initial_matrices(X: np.ndarray, partial_index: Optional[list] = None)
     return df, df_nonan
 
 
+class ClusterMembership:
+    """
+    Membership of the points in the clusters of an agglomeration, as a union-find (parent array) with
+    size counters: merging two clusters and finding the cluster of a point take almost constant time.
+    Every merge creates a node of the hierarchy, numbered n + k at step k as in the linkage matrix of
+    scipy.cluster.hierarchy, and the names of the form ((a)-(b))-(c) are only built when requested.
+
+    :param n: number of points.
+    :param names: names of the points, by default their indices as strings.
+    """
+
+    def __init__(self, n: int, names: Optional[Iterable[str]] = None):
+        self.n = n
+        self.parent = np.arange(n)
+        self.size = np.ones(n, dtype=np.int64)
+        # node of the hierarchy currently represented by each root, and step at which it was created
+        self.node = np.arange(n)
+        self.created = np.full(n, -1, dtype=np.int64)
+        self.children = np.empty((max(n - 1, 0), 2), dtype=np.int64)
+        self.n_merges = 0
+        self._names: Dict[int, str] = dict(enumerate(names if names is not None else map(str, range(n))))
+
+    def __len__(self) -> int:
+        """Current number of clusters."""
+        return self.n - self.n_merges
+
+    def find(self, i: int) -> int:
+        """Root (representative point) of the cluster of point i, compressing the path."""
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return int(root)
+
+    def union(self, i: int, j: int) -> int:
+        """
+        Merge the clusters of the points i and j.
+
+        :param i: point of the first cluster.
+        :param j: point of the second cluster.
+        :return: root of the merged cluster.
+        """
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i == root_j:
+            raise ValueError(f"points {i} and {j} already belong to the same cluster")
+
+        self.children[self.n_merges] = (self.node[root_i], self.node[root_j])
+
+        # the smaller tree is attached to the larger one
+        if self.size[root_i] < self.size[root_j]:
+            root_i, root_j = root_j, root_i
+
+        self.parent[root_j] = root_i
+        self.size[root_i] += self.size[root_j]
+        self.node[root_i] = self.n + self.n_merges
+        self.created[root_i] = self.n_merges
+        self.n_merges += 1
+
+        return root_i
+
+    def labels(self) -> np.ndarray:
+        """Root of the cluster of every point, computed for all the points at once."""
+        roots = self.parent.copy()
+        while True:
+            up = roots[roots]
+            if np.array_equal(up, roots):
+                break
+            roots = up
+        self.parent = roots
+
+        return roots
+
+    def members(self, i: int) -> np.ndarray:
+        """Points of the cluster of point i."""
+        return np.flatnonzero(self.labels() == self.find(i))
+
+    def roots(self) -> np.ndarray:
+        """
+        Roots of the current clusters, in the order of the rows of the dataframe of agg_clust: the
+        single points first, in their order, then the merged clusters from the oldest to the newest.
+        """
+        roots = np.flatnonzero(self.parent == np.arange(self.n))
+        singles = roots[self.created[roots] == -1]
+        merged = roots[self.created[roots] >= 0]
+
+        return np.concatenate([singles, merged[np.argsort(self.created[merged])]])
+
+    def name(self, i: int) -> str:
+        """Name of the cluster of point i, e.g. ((a)-(b))-(c), built from the hierarchy."""
+        node = int(self.node[self.find(i)])
+        stack = [node]
+
+        # names of the nodes are built from the leaves up, and cached
+        while len(stack) > 0:
+            current = stack[-1]
+            if current in self._names:
+                stack.pop()
+                continue
+
+            left, right = self.children[current - self.n]
+            missing = [c for c in (left, right) if c not in self._names]
+            if len(missing) > 0:
+                stack.extend(int(c) for c in missing)
+                continue
+
+            self._names[current] = "(" + self._names[left] + ")-(" + self._names[right] + ")"
+            stack.pop()
+
+        return self._names[node]
+
+    def frame(self) -> pd.DataFrame:
+        """Dataframe whose index lists the names of the current clusters, as used by the plots of agg_clust."""
+        return pd.DataFrame(index=[self.name(r) for r in self.roots()])
+
+
 def draw_rectangle_or_encircle(X: np.ndarray, points: list, X_clust: list,
                                Y_clust: list, ax, ind: int) -> None:
     """
@@ -226,7 +442,7 @@ def draw_rectangle_or_encircle(X: np.ndarray, points: list, X_clust: list,
     if len(X_clust) <= 2:
 
         ax.add_patch(
-            Rectangle(
+            plt.Rectangle(
                 (rect_min[0] - xwidth * 0.02, rect_min[1] - ywidth * 0.04),
                 rect_diff[0] + xwidth * 0.04,
                 rect_diff[1] + ywidth * 0.08,
@@ -7,12 +7,29 @@ from clustviz.agglomerative import (
     avg_dist,
     cl_dist,
     agg_clust,
-    point_plot_mod
+    point_plot_mod,
+    condensed_dist,
+    condensed_to_square,
+    linkage_dist,
+    lance_williams_update,
+    lance_williams_merges,
+    linkage_matrix,
+    merges_to_linkage,
+    ward_merges,
+    cut_at_k,
+    cut_at_height,
+    condensed_index,
+    condensed_pair,
+    distance_storage,
 )
 
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import clustviz.agglomerative
+import pytest
+from scipy.spatial.distance import pdist, squareform
+from scipy.cluster.hierarchy import linkage as scipy_linkage, fcluster
 
 
 def test_dist_mat_gen():
@@ -135,3 +152,223 @@ def test_plot_fn(monkeypatch):
 
     monkeypatch.setattr(plt, "show", lambda: None)
     point_plot_mod(X, a, 2.57)
+
+
+def test_condensed_dist():
+    X = np.random.RandomState(0).uniform(0, 5, (30, 3))
+
+    d = condensed_dist(X)
+
+    assert d.dtype == np.float64
+    assert np.allclose(d, pdist(X))
+    square = condensed_to_square(d, 30)
+    off_diagonal = ~np.eye(30, dtype=bool)
+
+    assert np.isinf(square.diagonal()).all()
+    assert np.array_equal(square[off_diagonal], squareform(d)[off_diagonal])
+    assert np.isinf(condensed_to_square(d, 30, symmetric=False)[np.tril_indices(30)]).all()
+
+
+def test_linkage_dist():
+    clusters = [np.array([[3, 1], [1, 7], [2, 1]]), np.array([[1, 1], [3, 6], [1, 3]]), np.array([[0, 0]])]
+
+    for linkage, fn in [("single", sl_dist), ("complete", cl_dist), ("average", avg_dist)]:
+        expected = [fn(clusters[0], clusters[1]), fn(clusters[0], clusters[2]), fn(clusters[1], clusters[2])]
+
+        assert list(linkage_dist(clusters, linkage)) == expected
+
+    with pytest.raises(ValueError):
+        linkage_dist(clusters, "median")
+
+
+def test_dist_mat_condensed():
+    df_for_dist_mat = pd.DataFrame([[0, 0], [0, 2], [3, 2]])
+
+    assert list(dist_mat(df_for_dist_mat, "single", as_frame=False)) == [2, np.sqrt(13), 3]
+    assert list(dist_mat_gen(df_for_dist_mat, as_frame=False)) == [2, np.sqrt(13), 3]
+
+
+def test_lance_williams_update():
+    D = np.array([[np.inf, 1, 4], [1, np.inf, 2], [4, 2, np.inf]])
+    sizes = np.array([1, 1, 1])
+    active = np.array([True, True, True])
+
+    lance_williams_update(D, sizes, active, 0, 1, "average")
+
+    assert D[0, 2] == D[2, 0] == 3
+    assert np.isinf(D[1]).all() and np.isinf(D[:, 1]).all()
+    assert list(sizes) == [2, 1, 1]
+    assert list(active) == [True, False, True]
+
+
+def test_lance_williams_update_invalid_linkage():
+    D = np.array([[np.inf, 1, 4], [1, np.inf, 2], [4, 2, np.inf]])
+    sizes = np.array([1, 1, 1])
+    active = np.array([True, True, True])
+
+    with pytest.raises(ValueError):
+        lance_williams_update(D, sizes, active, 0, 1, "weighted")
+
+    # nothing is changed by an invalid linkage
+    assert list(active) == [True, True, True]
+    assert list(sizes) == [1, 1, 1]
+    assert D[0, 1] == 1
+
+
+@pytest.mark.parametrize("linkage", ["single", "complete", "average", "ward", "centroid", "median"])
+def test_lance_williams_merges(linkage):
+    X = np.random.RandomState(1).uniform(0, 10, (40, 2))
+
+    heights = [d for _, _, d in lance_williams_merges(X, linkage)]
+
+    assert np.allclose(heights, scipy_linkage(X, linkage)[:, 2])
+
+
+def test_agg_clust_centroid():
+    X = np.array([[1, 2], [3, 2], [0, 0], [1, 1]])
+
+    agg_clust(X, linkage="centroid", plotting=False)
+
+    with pytest.raises(ValueError):
+        agg_clust(X, linkage="weighted", plotting=False)
+
+
+@pytest.mark.parametrize(
+    "linkage, engine",
+    [("single", None), ("single", "mst"), ("single", "nn_chain"), ("single", "lance_williams"),
+     ("complete", None), ("complete", "lance_williams"), ("average", None), ("average", "lance_williams"),
+     ("ward", None), ("ward", "nn_chain"), ("ward", "lance_williams"), ("centroid", None), ("median", None)],
+)
+def test_linkage_matrix(linkage, engine):
+    X = np.random.RandomState(2).uniform(0, 10, (80, 2))
+
+    Z = linkage_matrix(X, linkage, engine=engine)
+    expected = scipy_linkage(X, linkage)
+
+    assert np.allclose(Z[:, 2], expected[:, 2])
+    assert np.array_equal(Z[:, [0, 1, 3]], expected[:, [0, 1, 3]])
+
+
+def test_linkage_matrix_invalid():
+    X = np.array([[1, 2], [3, 2], [0, 0], [1, 1]])
+
+    with pytest.raises(ValueError):
+        linkage_matrix(X, "ward", engine="mst")
+
+    with pytest.raises(ValueError):
+        linkage_matrix(X, "single", engine="prim")
+
+
+def test_merges_to_linkage():
+    Z = merges_to_linkage([(2, 3, 2.0), (0, 1, 1.0), (1, 3, 5.0)], 4)
+
+    assert Z.tolist() == [[0, 1, 1, 2], [2, 3, 2, 2], [4, 5, 5, 4]]
+
+
+def test_ward_merges():
+    X = np.array([[1, 2], [3, 2], [0, 0], [1, 1], [1, 1]])
+
+    merges = list(ward_merges(X))
+
+    assert merges[:2] == [(3, 4, 0.0), (0, 3, 2 / 3)]
+    assert np.isclose(sum(cost for _, _, cost in merges), np.sum((X - X.mean(axis=0)) ** 2))
+
+
+def test_compute_ward_ij_clusters():
+    X = [[1, 2], [3, 2], [0, 0], [1, 1]]
+    b = pd.DataFrame(index=["(0)-(3)", "1", "2"])
+
+    (i, j), new_summ, par_var = compute_ward_ij(X, b)
+
+    assert (i, j) == ("(0)-(3)", "2")
+    assert np.isclose(par_var, 2 / 3 * 3.25)
+    assert np.isclose(new_summ, 0.5 + par_var)
+
+
+@pytest.mark.parametrize("linkage", ["single", "average", "ward", "centroid"])
+def test_agg_clust_linkage_matrix(monkeypatch, linkage):
+    X = np.random.RandomState(3).uniform(0, 10, (12, 2))
+    expected = scipy_linkage(X, linkage)
+
+    Z = agg_clust(X, linkage=linkage, plotting=False)
+    assert np.allclose(Z, expected)
+
+    # the step by step path returns the same hierarchy
+    monkeypatch.setattr(clustviz.agglomerative, "point_plot_mod", lambda *args: None)
+    assert np.allclose(agg_clust(X, linkage=linkage, plotting=True), expected)
+
+
+def test_cut_at_k():
+    X = np.random.RandomState(4).uniform(0, 10, (50, 2))
+    Z = linkage_matrix(X, "average")
+
+    labels = cut_at_k(Z, [1, 3, 7, 50])
+
+    assert labels.shape == (4, 50)
+    assert (labels[0] == 0).all()
+    assert list(labels[3]) == list(range(50))
+
+    for k, lab in zip([3, 7], labels[1:3]):
+        expected = fcluster(Z, k, criterion="maxclust")
+        assert len(set(zip(lab, expected))) == len(set(lab)) == len(set(expected)) == k
+        assert lab[0] == 0 and np.all(np.diff(np.unique(lab, return_index=True)[1]) > 0)
+
+    assert np.array_equal(cut_at_k(Z, 3), labels[1])
+
+    with pytest.raises(ValueError):
+        cut_at_k(Z, 0)
+
+
+def test_cut_at_height():
+    X = np.random.RandomState(5).uniform(0, 10, (50, 2))
+    Z = linkage_matrix(X, "single")
+
+    labels = cut_at_height(Z, [0.5, 1.5, 100])
+
+    for h, lab in zip([0.5, 1.5], labels[:2]):
+        expected = fcluster(Z, h, criterion="distance")
+        assert len(set(zip(lab, expected))) == len(set(lab)) == len(set(expected))
+
+    assert (labels[2] == 0).all()
+    assert np.array_equal(cut_at_height(Z, 1.5), labels[1])
+
+
+def test_condensed_index():
+    n = 7
+    X = np.random.RandomState(6).uniform(0, 10, (n, 2))
+    d = pdist(X)
+    i, j = np.triu_indices(n, 1)
+
+    assert np.array_equal(condensed_index(n, i, j), np.arange(len(d)))
+    assert np.array_equal(condensed_index(n, j, i), np.arange(len(d)))
+    assert np.array_equal(np.array(condensed_pair(n, np.arange(len(d)))), np.array([i, j]))
+    assert condensed_pair(n, condensed_index(n, 5, 2)) == (2, 5)
+
+
+@pytest.mark.parametrize(
+    "linkage, engine",
+    [("single", "lance_williams"), ("complete", "nn_chain"), ("average", "nn_chain"),
+     ("ward", "nn_chain"), ("centroid", "lance_williams"), ("median", "lance_williams")],
+)
+def test_linkage_matrix_condensed(tmp_path, linkage, engine):
+    X = np.random.RandomState(2).uniform(0, 10, (80, 2))
+    expected = scipy_linkage(X, linkage)
+
+    for path in [None, str(tmp_path / "dist.mm")]:
+        Z = linkage_matrix(X, linkage, engine=engine, storage="condensed", path=path)
+
+        assert np.allclose(Z[:, 2], expected[:, 2], rtol=1e-5)
+        assert np.array_equal(Z[:, [0, 1, 3]], expected[:, [0, 1, 3]])
+
+
+def test_distance_storage(tmp_path):
+    X = np.random.RandomState(7).uniform(0, 10, (20, 2))
+
+    D = distance_storage(X, "condensed", path=str(tmp_path / "dist.mm"))
+    assert isinstance(D, np.memmap)
+    assert D.dtype == np.float32
+    assert np.allclose(D, pdist(X))
+    assert np.array_equal(distance_storage(X), squareform(pdist(X)) + np.diag(np.full(20, np.inf)))
+
+    with pytest.raises(ValueError):
+        distance_storage(X, "sparse")
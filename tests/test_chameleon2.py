@@ -4,9 +4,11 @@ from clustviz.chameleon.graphtools import (
     plot2d_graph,
     plot2d_data,
 )
-from clustviz.chameleon.chameleon2 import cluster2, connected_components, prepro_edge
+from clustviz.chameleon.chameleon2 import cluster2, connected_components, prepro_edge, flood_fill
 from clustviz.chameleon.chameleon import merge_best
+from clustviz.utils import headless
 
+import networkx as nx
 import pandas as pd
 from sklearn.datasets import make_blobs
 
@@ -38,6 +40,24 @@ def test_connected_components():
     assert condition0 & condition1
 
 
+def test_flood_fill_headless(capsys):
+    # a single cluster made of two connected components, 0-1 and 2-3
+    graph = nx.Graph()
+    graph.add_nodes_from(range(4), cluster=0)
+    knn = nx.Graph([(0, 1), (2, 3)])
+    df = pd.DataFrame({"x": [0, 1, 5, 6], "y": [0, 0, 0, 0]})
+    events = []
+
+    with headless(callback=lambda event, info: events.append((event, info))):
+        graph, m = flood_fill(graph, knn, df)
+
+    assert capsys.readouterr().out == ""
+    assert events == [("chameleon.flood_fill", {"cluster": 0, "n_components": 2}),
+                      ("chameleon.new_component", {"index": 1})]
+    assert m == 2
+    assert list(df["cluster"]) == [0, 0, 1, 1]
+
+
 def test_plot2d_graph():
     df = pd.DataFrame([[1, 1], [6, 5], [6, 6], [0, 0], [1, 2], [2, 1], [5, 5], [7, 6]])
 
@@ -7,11 +7,17 @@ from clustviz.cure import (
     dist_mat_gen_cure,
     cure_sample_part,
     cure,
+    heap_merges,
+    RepresentativeIndex,
+    shrunk_representatives,
+    assign_labels,
 )
 from clustviz.agglomerative import dist_mat_gen
+from clustviz.kernels import cdist
 
 import numpy as np
 import pandas as pd
+import pytest
 
 
 def test_dist_clust_cure():
@@ -76,6 +82,17 @@ def test_sel_rep_fast():
     assert (res[0] == np.array([0.0, 0.25])).all()
 
 
+def test_shrunk_representatives():
+    X = np.array([[0, 0], [4, 0], [0, 3], [1, 1], [4, 3]])
+    com = X.mean(axis=0)
+
+    res = shrunk_representatives(X, com, 3, 0.5)
+
+    assert np.allclose(res, (X[[4, 0, 1]] + com) / 2)
+    assert np.allclose(shrunk_representatives(X, com, 5, 0), X)
+    assert np.allclose(sel_rep({"a": list(X)}, "a", 3, 0.5), res)
+
+
 def test_Chernoff_Bounds():
     u_min = 1
     f = 0.01
@@ -148,6 +165,40 @@ def test_cure_sample_part_3():
     assert res[2].equals(exp_df)
 
 
+def test_cure_sample_part_labels():
+    X = np.array([[0, 0], [0, 1], [0, 2], [1, 2], [1, 3]])
+
+    res = cure_sample_part(X, 2, plotting=False, return_labels=True)
+
+    # point 3 is not sampled, and its nearest representative is [0.85, 2.7]
+    assert list(res[3]) == [1, 0, 1, 0, 0]
+
+
+def test_assign_labels():
+    X = np.array([[0, 0], [0, 1], [5, 5], [5, 6], [0.2, 0.4], [4, 4], [6, 6]])
+    clusters = {"(0)-(1)": [X[0], X[1]], "(2)-(3)": [X[2], X[3]]}
+    rep = {"(0)-(1)": [np.array([0, 0.1]), np.array([0, 0.9])], "(2)-(3)": [np.array([5, 5.1]), np.array([5, 5.9])]}
+
+    assert list(assign_labels(X, clusters, rep)) == [0, 0, 1, 1, 0, 1, 1]
+    assert list(assign_labels(X, clusters, rep, n_rep=1, chunk_size=2)) == [0, 0, 1, 1, 0, 1, 1]
+
+
+def test_cure_sample_part_n_jobs():
+    X = np.round(np.random.RandomState(0).normal(size=(200, 2)), 1)
+
+    res = cure_sample_part(X, 3, plotting=False)
+    res_parallel = cure_sample_part(X, 3, plotting=False, n_jobs=2)
+
+    assert list(res_parallel[0]) == list(res[0])
+    for name in res[0]:
+        assert np.array_equal(res_parallel[0][name], res[0][name])
+        assert np.array_equal(res_parallel[1][name], res[1][name])
+    assert res_parallel[2].equals(res[2])
+
+    with pytest.raises(ValueError):
+        cure_sample_part(X, 3, plotting=False, n_jobs=0)
+
+
 def test_cure_1():
     X = np.array([[0, 0], [0, 1], [0, 2], [1, 2], [1, 3]])
 
@@ -213,3 +264,64 @@ def test_cure_3():
     )
 
     assert res[2].equals(exp_df)
+
+
+@pytest.mark.parametrize("engine", ["heap", "kdtree"])
+@pytest.mark.parametrize("k, c", [(1, 3), (3, 2), (4, 5)])
+def test_cure_heap_engine(engine, k, c):
+    X = np.round(np.random.RandomState(0).normal(size=(40, 2)), 1)
+
+    res_matrix = cure(X, k, c, alpha=0.2, plotting=False, engine="matrix")
+    res_heap = cure(X, k, c, alpha=0.2, plotting=False, engine=engine)
+
+    assert list(res_heap[0]) == list(res_matrix[0])
+    for name in res_matrix[0]:
+        assert np.array_equal(res_heap[0][name], res_matrix[0][name])
+        assert np.array_equal(res_heap[1][name], res_matrix[1][name])
+    assert res_heap[2].equals(res_matrix[2])
+
+
+def test_heap_merges():
+    X = np.array([[0, 0], [0, 1], [0, 2], [1, 2], [1, 3]])
+    D = cdist(X, X)
+    np.fill_diagonal(D, np.inf)
+    points = list(X)
+    reps = [[p] for p in X]
+
+    merges = heap_merges(points, reps, k=2, c=3, alpha=0.1, D=D)
+
+    assert [(u, v) for u, v, _ in merges] == [(0, 1), (2, 3), (4, 2)]
+    assert np.allclose([dist for _, _, dist in merges], [1, 1, np.sqrt(1 + 0.05 ** 2)])
+    assert points[1] is None and points[2] is None
+    assert len(points[4]) == 3
+
+
+def test_representative_index():
+    R = np.full((4, 2, 2), np.inf)
+    R[0] = [[0, 0], [0, 1]]
+    R[1, 0] = [0, 3]
+    R[2] = [[3, 0], [0, 2.5]]
+    R[3, 0] = [0, 1.5]
+    count = np.array([2, 1, 2, 1])
+    active = np.array([True, True, True, False])
+    position = np.arange(4)
+
+    index = RepresentativeIndex(R, count, active)
+
+    assert index.closest(0, position) == (2, 1.5)
+    assert index.closest(1, position) == (2, 0.5)
+    assert list(np.sort(index.within(0, 2))) == [1, 2]
+
+    # the new representatives of cluster 3 are not in the tree, but are compared anyway
+    active[3] = True
+    index.update(3)
+
+    assert index.closest(0, position) == (3, 0.5)
+    assert index.closest(1, position) == (2, 0.5)
+
+
+def test_cure_engine_invalid():
+    X = np.array([[0, 0], [0, 1], [0, 2]])
+
+    with pytest.raises(ValueError):
+        cure(X, 2, plotting=False, engine="tree")
@@ -1,5 +1,8 @@
-from clustviz.dbscan import scan_neigh1_mod, DBSCAN
+from clustviz.dbscan import scan_neigh1_mod, DBSCAN, dbscan_labels, labels_to_dict, dbscan_sweep, dbscan_memmap, \
+    IncrementalDBSCAN
+from clustviz.neighbors import radius_graph
 import numpy as np
+import pytest
 
 
 def test_scan_neigh1_mod():
@@ -30,3 +33,165 @@ def test_DBSCAN():
     minPTS = 1
 
     assert DBSCAN(data, eps, minPTS) == {"0": 0, "1": 0, "2": 1, "3": 1}
+
+
+def test_DBSCAN_neighbor_index():
+    rng = np.random.RandomState(42)
+    data = np.vstack([rng.normal(0, 0.3, (30, 2)), rng.normal(3, 0.3, (30, 2)), rng.uniform(-2, 5, (10, 2))])
+
+    expected = DBSCAN(data, 0.5, 4)
+
+    for method in ["grid", "kdtree", "balltree"]:
+        assert DBSCAN(data, 0.5, 4, neighbor_index=method) == expected
+
+
+def test_dbscan_labels():
+    data = np.array([[0, 1], [0, 2], [0, 4], [0, 5], [3, 3]])
+
+    labels = dbscan_labels(data, 1, 2)
+
+    assert labels.dtype == np.int32
+    assert list(labels) == [0, 0, 1, 1, -1]
+
+
+def test_dbscan_labels_high_dimensional():
+    rng = np.random.RandomState(7)
+    data = np.vstack([rng.normal(0, 0.5, (100, 10)), rng.normal(4, 0.5, (100, 10)), rng.uniform(-2, 6, (20, 10))])
+
+    labels = dbscan_labels(data, 2.0, 5)
+
+    assert list(labels) == list(dbscan_labels(data, 2.0, 5, neighbor_index="brute"))
+    assert DBSCAN(data, 2.0, 5, engine="array") == labels_to_dict(labels)
+
+
+def test_DBSCAN_array_engine():
+    rng = np.random.RandomState(0)
+    data = np.vstack([rng.normal(0, 0.3, (40, 2)), rng.normal(2, 0.3, (40, 2)), rng.uniform(-2, 4, (20, 2))])
+
+    assert DBSCAN(data, 0.4, 5, engine="array") == DBSCAN(data, 0.4, 5)
+    assert labels_to_dict(np.array([1, -1])) == {"0": 1, "1": -1}
+
+
+def test_DBSCAN_radius_graph():
+    rng = np.random.RandomState(1)
+    data = np.vstack([rng.normal(0, 0.3, (40, 2)), rng.normal(2, 0.3, (40, 2)), rng.uniform(-2, 4, (20, 2))])
+
+    graph = radius_graph(data, 0.6)
+
+    for minPTS in [3, 5, 8]:
+        assert DBSCAN(graph, 0.4, minPTS) == DBSCAN(data, 0.4, minPTS)
+
+
+def test_dbscan_sweep():
+    rng = np.random.RandomState(3)
+    data = np.vstack([rng.normal(0, 0.4, (50, 2)), rng.normal(2, 0.4, (50, 2)), rng.uniform(-2, 4, (30, 2))])
+
+    labels, summary = dbscan_sweep(data, [0.2, 0.35, 0.5], [2, 4, 8])
+
+    assert len(summary) == 9
+    assert list(summary.columns) == ["eps", "minPTS", "n_core", "noise_fraction", "n_clusters"]
+
+    for (eps, minPTS), res in labels.items():
+        expected = dbscan_labels(data, eps, minPTS)
+        row = summary[(summary.eps == eps) & (summary.minPTS == minPTS)].iloc[0]
+
+        assert np.array_equal(res, expected)
+        assert row.n_clusters == expected.max() + 1
+        assert row.noise_fraction == (expected == -1).mean()
+
+
+def test_dbscan_sweep_empty_values():
+    data = np.array([[0, 1], [0, 2], [0, 4]])
+
+    with pytest.raises(ValueError, match="eps_values"):
+        dbscan_sweep(data, [], [2])
+
+    with pytest.raises(ValueError, match="minpts_values"):
+        dbscan_sweep(data, [1.0], [])
+
+
+def test_dbscan_memmap(tmp_path):
+    rng = np.random.RandomState(5)
+    data = np.vstack([rng.normal(0, 0.4, (80, 2)), rng.normal(2, 0.4, (80, 2)), rng.uniform(-2, 4, (40, 2)),
+                      [[0, 0], [0, 0]]])
+    np.save(tmp_path / "data.npy", data)
+
+    for eps, minPTS in [(0.2, 3), (0.35, 5), (0.5, 1)]:
+        expected = dbscan_labels(data, eps, minPTS)
+
+        assert np.array_equal(dbscan_memmap(tmp_path / "data.npy", eps, minPTS, tile_size=32, cache_cells=8),
+                              expected)
+
+    labels = dbscan_memmap(data, 0.35, 5, out=tmp_path / "labels.npy")
+
+    assert np.array_equal(np.load(tmp_path / "labels.npy"), labels)
+
+
+def test_dbscan_memmap_chain():
+    # points on a line, each within eps only from the previous and the next one: a single long cluster
+    data = np.column_stack([np.arange(20_000) * 0.5, np.zeros(20_000)])
+
+    labels = dbscan_memmap(data, 0.6, 3)
+
+    assert (labels == 0).all()
+    assert np.array_equal(dbscan_memmap(data[::-1].copy(), 0.6, 3), labels)
+
+
+def test_dbscan_labels_n_jobs():
+    rng = np.random.RandomState(7)
+    data = np.vstack([rng.normal(0, 0.4, (100, 2)), rng.normal(2, 0.4, (100, 2)), rng.uniform(-2, 4, (50, 2))])
+
+    timings = {}
+    labels = dbscan_labels(data, 0.3, 5, n_jobs=2, timings=timings)
+
+    assert np.array_equal(labels, dbscan_labels(data, 0.3, 5))
+    assert set(timings) == {"neighbors", "expansion"}
+
+
+def test_IncrementalDBSCAN():
+    rng = np.random.RandomState(8)
+    data = np.vstack([rng.normal(0, 0.3, (60, 2)), rng.normal(1.5, 0.3, (60, 2)), rng.uniform(-1, 3, (30, 2))])
+    bridge = np.column_stack([np.linspace(0, 1.5, 12), np.linspace(0, 1.5, 12)])
+
+    model = IncrementalDBSCAN(0.3, 4)
+    ids = model.insert(data)
+
+    assert list(ids) == list(range(150))
+    assert np.array_equal(model.labels(), dbscan_labels(data, 0.3, 4))
+
+    # the bridge merges the two blobs, deleting it splits them again
+    bridge_ids = model.insert(bridge)
+    assert np.array_equal(model.labels(), dbscan_labels(np.vstack([data, bridge]), 0.3, 4))
+
+    model.delete(bridge_ids)
+    assert np.array_equal(model.labels(), dbscan_labels(data, 0.3, 4))
+
+    model.delete(range(0, 150, 3))
+    assert len(model) == 100
+    assert np.array_equal(model.labels(), dbscan_labels(data[model.ids], 0.3, 4))
+
+    with pytest.raises(ValueError):
+        model.delete([0])
+
+
+def test_IncrementalDBSCAN_sliding_window():
+    rng = np.random.RandomState(3)
+    stream = np.vstack([rng.normal(0, 0.3, (400, 2)), rng.normal(1.5, 0.3, (400, 2))])
+    rng.shuffle(stream)
+
+    model = IncrementalDBSCAN(0.3, 4)
+    window = list(model.insert(stream[:200]))
+
+    for start in range(200, 800, 50):
+        model.delete(window[:50])
+        window = window[50:] + list(model.insert(stream[start: start + 50]))
+
+        assert list(model.ids) == window
+        assert np.array_equal(model.labels(), dbscan_labels(stream[start + 50 - 200: start + 50], 0.3, 4))
+
+    # ids are not reused, while the slots of the deleted points are dropped
+    assert window[-1] == 799
+    assert model._n_slots <= 2 * len(model)
+
+    with pytest.raises(ValueError):
+        model.delete([0])
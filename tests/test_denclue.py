@@ -1,4 +1,5 @@
 from clustviz.denclue import (
+    gaussian_influence,
     gaussian_density,
     gradient_gaussian_density,
     square_wave_density,
@@ -15,6 +16,7 @@ from clustviz.denclue import (
 )
 
 import numpy as np
+import pytest
 from sklearn.datasets import make_blobs
 
 
@@ -25,6 +27,17 @@ def test_gaussian_density():
     assert round(res, 2) == 1.74
 
 
+def test_gaussian_influence_dist():
+    x, y = np.array([0, 0]), np.array([3, 4])
+
+    assert np.isclose(gaussian_influence(x, y, 1, dist="euclidean"), np.exp(-12.5))
+    assert np.isclose(gaussian_influence(x, y, 1, dist="sqeuclidean"), np.exp(-12.5))
+    assert np.isclose(gaussian_influence(x, y, 1, dist="manhattan"), np.exp(-24.5))
+
+    with pytest.raises(ValueError):
+        gaussian_influence(x, y, 1, dist="cosine")
+
+
 def test_gradient_gaussian_density():
     D = np.array([[1, 0], [0, 2]])
     point = np.array([0, 0])
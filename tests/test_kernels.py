@@ -0,0 +1,70 @@
+from clustviz.kernels import cdist, cdist_blocks, one_to_many, min_dist, farthest_points
+from clustviz.utils import dist1
+
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist as scipy_cdist
+
+
+@pytest.mark.parametrize(
+    "metric, scipy_metric",
+    [("euclidean", "euclidean"), ("sqeuclidean", "sqeuclidean"), ("manhattan", "cityblock"), ("cosine", "cosine")],
+)
+def test_cdist(metric, scipy_metric):
+    rng = np.random.RandomState(0)
+    XA = rng.uniform(-5, 5, (30, 3))
+    XB = rng.uniform(-5, 5, (17, 3))
+
+    expected = scipy_cdist(XA, XB, scipy_metric)
+
+    assert np.allclose(cdist(XA, XB, metric), expected)
+    assert np.allclose(cdist(XA, XB, metric, block_size=20), expected)
+    assert np.allclose(cdist(XA, XB, metric, dtype=np.float32), expected, rtol=1e-4, atol=1e-5)
+    assert cdist(XA, XB, metric, dtype=np.float32).dtype == np.float32
+
+
+def test_cdist_dist1():
+    rng = np.random.RandomState(1)
+    XA = rng.uniform(-5, 5, (10, 2))
+    XB = rng.uniform(-5, 5, (12, 2))
+
+    D = cdist(XA, XB, block_size=7)
+
+    assert all(D[i, j] == dist1(XA[i], XB[j]) for i in range(10) for j in range(12))
+
+
+def test_cdist_blocks():
+    X = np.random.RandomState(2).uniform(0, 1, (25, 2))
+
+    blocks = list(cdist_blocks(X, X, block_size=50))
+
+    assert [(start, end) for start, end, _ in blocks] == [(0, 2), (2, 4)] + [(i, i + 2) for i in range(4, 24, 2)] + [(24, 25)]
+    assert np.array_equal(np.vstack([block for _, _, block in blocks]), cdist(X, X))
+
+
+def test_one_to_many_min_dist():
+    X = np.array([[0, 0], [3, 4], [6, 8]])
+
+    assert np.array_equal(one_to_many([0, 0], X), [0, 5, 10])
+    assert np.array_equal(one_to_many([0, 0], X, "manhattan"), [0, 7, 14])
+    assert min_dist([[0, 1], [6, 9]], X, block_size=2) == 1
+    assert min_dist(np.empty((0, 2)), X) == np.inf
+
+
+def test_cdist_invalid():
+    with pytest.raises(ValueError):
+        cdist([[0, 0]], [[1, 1]], "chebyshev")
+
+
+def test_farthest_points():
+    X = np.array([[0, 0], [4, 0], [0, 3], [1, 1], [4, 3]])
+
+    # farthest from the origin, then farthest by sum and by minimum of the distances from the picked points
+    assert list(farthest_points(X, 3, [0, 0])) == [4, 0, 1]
+    assert list(farthest_points(X, 3, [0, 0], criterion="min")) == [4, 0, 1]
+    assert list(farthest_points(X, 3, [4, 3], criterion="min")) == [0, 4, 1]
+    assert list(farthest_points(X, 10, [0, 0])) == [4, 0, 1, 2, 3]
+    assert len(farthest_points(X, 0, [0, 0])) == 0
+
+    with pytest.raises(ValueError):
+        farthest_points(X, 2, [0, 0], criterion="max")
@@ -0,0 +1,103 @@
+from clustviz.neighbors import build_neighbor_index, radius_graph, RadiusGraph, MemmapGridIndex, NEIGHBOR_INDEXES
+
+import numpy as np
+import pytest
+
+
+def test_build_neighbor_index_invalid():
+    with pytest.raises(ValueError):
+        build_neighbor_index(np.zeros((3, 2)), 1, method="octree")
+
+
+@pytest.mark.parametrize("eps", [0, -1])
+def test_grid_index_invalid_eps(eps):
+    with pytest.raises(ValueError):
+        build_neighbor_index(np.zeros((3, 2)), eps, method="grid")
+
+    with pytest.raises(ValueError):
+        MemmapGridIndex(np.zeros((3, 2)), eps)
+
+
+@pytest.mark.parametrize("method", list(NEIGHBOR_INDEXES))
+def test_query(method):
+    X = np.array([[0, 1], [0, 2], [0, 4], [0, 5], [3, 3]])
+
+    index = build_neighbor_index(X, 1, method=method)
+
+    assert list(index.query(X[1])) == [0, 1]
+    assert list(index.query(X[4])) == [4]
+
+
+@pytest.mark.parametrize("method", list(NEIGHBOR_INDEXES))
+def test_query_all(method):
+    rng = np.random.RandomState(0)
+    X = rng.uniform(0, 10, size=(200, 2))
+
+    brute = build_neighbor_index(X, 0.8, method="brute").query_all(return_distance=True)
+    res = build_neighbor_index(X, 0.8, method=method).query_all(return_distance=True)
+
+    assert all(np.array_equal(b[0], r[0]) for b, r in zip(brute, res))
+    assert all(np.allclose(b[1], r[1]) for b, r in zip(brute, res))
+
+
+def test_radius_graph(tmp_path):
+    X = np.array([[0, 1], [0, 2], [0, 4], [0, 5], [3, 3]])
+
+    graph = radius_graph(X, 2)
+
+    assert list(graph.indptr) == [0, 2, 5, 8, 10, 11]
+    assert list(graph.neighbors(1)) == [0, 1, 2]
+    assert list(graph.neighbors(1, eps=1)) == [0, 1]
+    assert list(graph.degrees(eps=1)) == [2, 2, 2, 2, 1]
+    assert graph.to_csr().shape == (5, 5)
+
+    graph.save(tmp_path / "graph.npz")
+    loaded = RadiusGraph.load(tmp_path / "graph.npz")
+
+    assert loaded.eps == 2
+    assert np.array_equal(loaded.indices, graph.indices)
+    assert np.array_equal(loaded.distances, graph.distances)
+
+    with pytest.raises(ValueError):
+        graph.check_eps(3)
+
+
+def test_memmap_grid_index(tmp_path):
+    rng = np.random.RandomState(2)
+    X = rng.uniform(-3, 3, (200, 3))
+    np.save(tmp_path / "X.npy", X)
+
+    index = MemmapGridIndex(tmp_path / "X.npy", 0.7, tile_size=50, cache_cells=3)
+    expected = build_neighbor_index(X, 0.7, method="brute").query_all(return_distance=True)
+
+    assert len(index) == 200
+    assert sorted(np.concatenate([index.cell_points(c)[0] for c in range(index.n_cells)])) == list(range(200))
+
+    for i in range(len(X)):
+        idx, d = index.query(i, return_distance=True)
+
+        assert np.array_equal(idx, expected[i][0])
+        assert np.array_equal(d, expected[i][1])
+
+
+@pytest.mark.parametrize("method", ["grid", "kdtree"])
+def test_radius_graph_n_jobs(method):
+    X = np.random.RandomState(3).uniform(0, 10, (500, 2))
+
+    expected = radius_graph(X, 0.8, neighbor_index=method)
+    graph = radius_graph(X, 0.8, neighbor_index=method, n_jobs=2)
+
+    assert np.array_equal(graph.indptr, expected.indptr)
+    assert np.array_equal(graph.indices, expected.indices)
+    assert np.array_equal(graph.distances, expected.distances)
+
+
+def test_query_all_rows():
+    X = np.random.RandomState(4).uniform(0, 5, (100, 2))
+    rows = np.array([7, 3, 99, 3])
+
+    for method in NEIGHBOR_INDEXES:
+        index = build_neighbor_index(X, 0.6, method=method)
+        expected = index.query_all()
+
+        assert all(np.array_equal(a, expected[i]) for a, i in zip(index.query_all(rows=rows), rows))
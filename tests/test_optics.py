@@ -4,8 +4,15 @@ from clustviz.optics import (
     minPTSdist,
     OPTICS,
     ExtractDBSCANclust,
+    SeedQueue,
+    core_distances,
+    optics_memmap,
 )
+from clustviz.neighbors import radius_graph
+from clustviz.dbscan import dbscan_labels
+from clustviz.optics_extraction import extract_dbscan
 
+import random
 import numpy as np
 
 
@@ -96,3 +103,77 @@ def test_OPTICS():
     condition1 = sorted(list(expected1.values())) == sorted(list(res[1].values()))
 
     assert condition1 & condition0
+
+
+def test_OPTICS_radius_graph():
+    rng = np.random.RandomState(2)
+    D = np.vstack([rng.normal(0, 0.3, (30, 2)), rng.normal(2, 0.3, (30, 2))])
+
+    graph = radius_graph(D, 1.5)
+
+    random.seed(0)
+    expected = OPTICS(D, 1, 4, plot=False)
+    random.seed(0)
+    res = OPTICS(graph, 1, 4, plot=False)
+
+    assert list(res[0].items()) == list(expected[0].items())
+    assert res[1] == expected[1]
+
+
+def test_SeedQueue():
+    Seed = SeedQueue()
+
+    Seed.push("a", 3.0)
+    Seed.push("b", 2.0)
+    Seed.push("c", 2.0)
+    Seed.push("a", 1.0)
+    Seed.push("b", 5.0)
+
+    assert len(Seed) == 3
+    assert "a" in Seed
+    assert Seed["b"] == 2.0
+    assert [Seed.pop() for _ in range(3)] == [("a", 1.0), ("b", 2.0), ("c", 2.0)]
+    assert len(Seed) == 0
+
+
+def test_core_distances():
+    rng = np.random.RandomState(4)
+    D = np.vstack([rng.randint(0, 6, (40, 2)), [[0, 0], [0, 0], [9, 9]]]).astype(float)
+    data = dict(zip([str(i) for i in range(len(D))], D))
+
+    for minPTS in [1, 2, 4, 7]:
+        expected = [minPTSdist(data, str(i), minPTS, 2) if len(scan_neigh2(data, D[i], 2)) > 0 or minPTS > 1
+                    else 0.0 for i in range(len(D))]
+
+        assert list(core_distances(D, minPTS, 2)) == expected
+        assert list(core_distances(radius_graph(D, 3), minPTS, 2)) == expected
+
+
+def test_OPTICS_core_array():
+    D = np.array([[0, 0], [0, 1], [1, 0], [3, 3], [3, 4], [3, 5]])
+
+    random.seed(0)
+    ClustDist, CoreDist = OPTICS(D, 1.5, 2, plot=False, core_array=True)
+
+    assert list(CoreDist) == [1, 1, 1, 1, 1, 1]
+    assert sorted(ExtractDBSCANclust(ClustDist, CoreDist, 1).values()) == [0, 0, 0, 1, 1, 1]
+
+
+def test_optics_memmap(tmp_path):
+    rng = np.random.RandomState(6)
+    D = np.vstack([rng.normal(0, 0.4, (60, 2)), rng.normal(3, 0.4, (60, 2)), rng.uniform(-2, 5, (30, 2)),
+                   [[0, 0], [0, 0]]])
+    np.save(tmp_path / "data.npy", D)
+
+    ordering, reachability, core = optics_memmap(tmp_path / "data.npy", 0.8, 5, tile_size=40, cache_cells=4)
+
+    assert sorted(ordering) == list(range(len(D)))
+    assert np.array_equal(core, core_distances(D, 5, 0.8))
+
+    # the core points are clustered as by DBSCAN, which counts the point itself among its neighbors
+    labels = extract_dbscan(ordering, reachability, core, 0.5)
+    expected = dbscan_labels(D, 0.5, 6)
+    is_core = core <= 0.5
+    pairs = set(zip(labels[is_core], expected[is_core]))
+
+    assert len(pairs) == len({a for a, _ in pairs}) == len({b for _, b in pairs})
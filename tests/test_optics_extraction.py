@@ -0,0 +1,53 @@
+from clustviz.optics import OPTICS, ExtractDBSCANclust
+from clustviz.optics_extraction import optics_arrays, extract_dbscan, xi_clusters, extract_xi
+
+import random
+import numpy as np
+import pytest
+
+
+def test_optics_arrays():
+    ClustDist = {"2": np.inf, "0": 1.0, "1": 0.5}
+    CoreDist = {"0": 1.0, "1": np.inf, "2": 0.5}
+
+    ordering, reachability, core = optics_arrays(ClustDist, CoreDist)
+
+    assert list(ordering) == [2, 0, 1]
+    assert list(reachability) == [np.inf, 1.0, 0.5]
+    assert list(core) == [1.0, np.inf, 0.5]
+
+
+def test_extract_dbscan():
+    rng = np.random.RandomState(0)
+    D = np.vstack([rng.normal(0, 0.3, (30, 2)), rng.normal(2, 0.3, (30, 2)), rng.uniform(-1, 3, (10, 2))])
+
+    random.seed(0)
+    ClustDist, CoreDist = OPTICS(D, 1, 4, plot=False)
+    ordering, reachability, core = optics_arrays(ClustDist, CoreDist)
+
+    eps_values = [0.1, 0.2, 0.3, 0.5, 1]
+    labels = extract_dbscan(ordering, reachability, core, eps_values)
+
+    assert labels.shape == (5, 70)
+
+    for eps_db, res in zip(eps_values, labels):
+        expected = ExtractDBSCANclust(ClustDist, CoreDist, eps_db)
+        assert all(res[int(k)] == v for k, v in expected.items())
+
+    assert np.array_equal(extract_dbscan(ordering, reachability, core, 0.3), labels[2])
+
+
+def test_xi_clusters_invalid():
+    with pytest.raises(ValueError):
+        xi_clusters(np.array([np.inf, 1, 1]), 1.5, 2)
+
+
+def test_extract_xi():
+    # two valleys separated by a peak
+    reachability = np.array([np.inf, 1, 1, 1, 1, 10, 1, 1, 1, 1])
+    ordering = np.arange(10)[::-1]
+
+    labels, clusters = extract_xi(ordering, reachability, 0.1, 2)
+
+    assert clusters.tolist() == [[0, 4], [5, 9], [0, 9]]
+    assert list(labels) == [1] * 5 + [0] * 5
@@ -1,4 +1,10 @@
-from clustviz.utils import flatten_list, encircle, convert_colors
+from clustviz.utils import flatten_list, encircle, convert_colors, ClusterMembership, headless, is_headless, \
+    report, set_headless, _effective_n_jobs
+from clustviz.pam import KMedoids
+import clustviz.pam
+import numpy as np
+import os
+import pytest
 import matplotlib.pyplot as plt
 
 
@@ -28,3 +34,71 @@ def test_convert_colors():
     color_dict_rect = convert_colors(color_dict, alpha=0.3)
 
     assert color_dict_rect == {0: (1.0, 0.0, 0.0, 0.3), 1: (0.0, 0.0, 1.0, 0.3)}
+
+
+def test_ClusterMembership():
+    membership = ClusterMembership(5)
+
+    membership.union(0, 1)
+    membership.union(3, 4)
+    membership.union(2, 0)
+
+    assert len(membership) == 2
+    assert list(membership.members(1)) == [0, 1, 2]
+    assert membership.name(2) == "(2)-((0)-(1))"
+    assert list(membership.frame().index) == ["(3)-(4)", "(2)-((0)-(1))"]
+    assert membership.children[:3].tolist() == [[0, 1], [3, 4], [2, 5]]
+
+    labels = membership.labels()
+    assert labels[0] == labels[1] == labels[2] != labels[3] == labels[4]
+
+    with pytest.raises(ValueError):
+        membership.union(1, 2)
+
+
+def test_report(capsys):
+    events = []
+
+    report("step", "message", 1, value=1)
+    assert capsys.readouterr().out == "message 1\n"
+
+    with headless(callback=lambda event, data: events.append((event, data))):
+        assert is_headless()
+        report("step", "message", 2, value=2)
+
+    assert not is_headless()
+    assert capsys.readouterr().out == ""
+    assert events == [("step", {"value": 2})]
+
+    set_headless(False, callback=lambda event, data: events.append((event, data)))
+    report("step", "message", 3, value=3)
+    set_headless(False)
+    assert capsys.readouterr().out == "message 3\n"
+    assert events[-1] == ("step", {"value": 3})
+
+
+def test_kmedoids_headless(monkeypatch, capsys):
+    def fail(*args, **kwargs):
+        raise AssertionError("plot_pam called in headless mode")
+
+    monkeypatch.setattr(clustviz.pam, "plot_pam", fail)
+    data = np.random.RandomState(0).uniform(0, 10, (30, 2)).tolist()
+    events = []
+
+    with headless(callback=lambda event, info: events.append(event)):
+        model = KMedoids(n_cluster=3)
+        model.fit(data)
+
+    assert capsys.readouterr().out == ""
+    assert events[0] == "kmedoids.fit"
+    assert "kmedoids.clusters" in events
+    assert sorted(sum(model.clusters.values(), [])) == list(range(30))
+
+
+def test_effective_n_jobs():
+    assert _effective_n_jobs(None) is None
+    assert _effective_n_jobs(3) == 3
+    assert _effective_n_jobs(-1) == (os.cpu_count() or 1)
+
+    with pytest.raises(ValueError, match="n_jobs"):
+        _effective_n_jobs(0)